@@ -0,0 +1,153 @@
+"""
+Benchmark API throughput at high concurrency: sync handlers on the threadpool vs. async handlers
+with their sessions on the database threads
+
+Usage (from the server directory):
+    python -m benchmarks.bench_async_api [--requests 5000] [--concurrency 500] [--videos 50000]
+
+Seeds an on-disk SQLite database and sends concurrent requests for a page of
+a section's videos to the app in-process, with no network in between. A
+probe task measures how late the event loop wakes up while the requests run.
+- before: a sync def handler with a blocking Session, as the routes were;
+  FastAPI runs each request on its threadpool
+- after: the async /api/videos/load-more route, which runs the same query
+  with run_in_session: one hop to the database threads per request, where
+  the threadpool path makes three (dependency setup, handler, teardown)
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+TMP_DIR = tempfile.mkdtemp()
+# Both handlers use the application's engines
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(TMP_DIR, 'bench.db')}"
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy.orm import Session
+from database.db import Base, SessionLocal, engine, get_db
+from models.models import Channel
+from routes.api import router
+from services.repository import get_paginated_videos, update_videos_for_channel
+
+CHANNELS = 20
+SECTIONS = ["theory", "history", "economics", "current"]
+
+def seed(videos: int):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    for n in range(CHANNELS):
+        db.add(Channel(id=f"channel_{n}", title=f"Channel {n}", section=SECTIONS[n % len(SECTIONS)], uploads_playlist_id=f"uploads_{n}"))
+    db.commit()
+    for start in range(0, videos, 5000):
+        update_videos_for_channel(db, None, [
+            {
+                "id": f"video_{i:07d}",
+                "title": f"Video {i}",
+                "description": "Lorem ipsum " * 20,
+                "channel_id": f"channel_{i % CHANNELS}",
+                "published_at": datetime(2024, 1, 1) + timedelta(minutes=i),
+                "thumbnail_url": f"https://i.ytimg.com/vi/video_{i:07d}/hqdefault.jpg"
+            }
+            for i in range(start, min(start + 5000, videos))
+        ])
+    db.close()
+
+def sync_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/videos/load-more")
+    def load_more_videos(section: Optional[str] = None, cursor: Optional[str] = None, db: Session = Depends(get_db)):
+        videos_data = get_paginated_videos(db, section, cursor, 10)
+        return {
+            "videos": [
+                {
+                    "id": video.id,
+                    "title": video.title,
+                    "description": video.description,
+                    "published_at": video.published_at,
+                    "thumbnail_url": video.thumbnail_url,
+                    "duration": video.duration,
+                    "view_count": video.view_count,
+                    "live_status": video.live_status,
+                    "channel_title": channel_title,
+                    "section": section
+                }
+                for video, channel_title, section in videos_data["videos"]
+            ],
+            "nextCursor": videos_data["next_cursor"]
+        }
+
+    return app
+
+def async_app() -> FastAPI:
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    return app
+
+async def load(app: FastAPI, requests: int, concurrency: int):
+    latencies = []
+    lags = []
+    done = asyncio.Event()
+
+    async def probe():
+        # How late a 10 ms sleep wakes up shows how long the loop was blocked
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.01)
+            lags.append(time.perf_counter() - started - 0.01)
+
+    limit = asyncio.Semaphore(concurrency)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def request(n: int):
+            async with limit:
+                started = time.perf_counter()
+                response = await client.get("/api/videos/load-more", params={"section": SECTIONS[n % len(SECTIONS)]})
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+
+        # Warm up the connection pools outside the timed run
+        await asyncio.gather(*(request(n) for n in range(min(concurrency, 50))))
+        latencies.clear()
+
+        probe_task = asyncio.create_task(probe())
+        started = time.perf_counter()
+        await asyncio.gather(*(request(n) for n in range(requests)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await probe_task
+
+    return elapsed, sorted(latencies), sorted(lags)
+
+def run(label: str, app: FastAPI, args):
+    elapsed, latencies, lags = asyncio.run(load(app, args.requests, args.concurrency))
+    p50 = statistics.median(latencies) * 1000
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000
+    print(f"{label:<7} {args.requests / elapsed:>7.0f} req/s  p50 {p50:>8.1f} ms  p99 {p99:>8.1f} ms  "
+          f"loop lag p99 {lags[int(len(lags) * 0.99)] * 1000:>6.1f} ms  max {lags[-1] * 1000:>6.1f} ms")
+    return args.requests / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--videos", type=int, default=50000)
+    args = parser.parse_args()
+
+    seed(args.videos)
+    print(f"{args.requests} requests, {args.concurrency} concurrent, {args.videos} videos, {os.cpu_count()} CPUs")
+    before = run("before", sync_app(), args)
+    after = run("after", async_app(), args)
+    print(f"{'':<7} {after / before:>7.2f}x")
+    engine.dispose()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Benchmark feed parsing: feedparser in threads of the API process vs. the process pool
+
+Usage (from the server directory):
+    python -m benchmarks.bench_feed_parse [--feeds 24] [--entries 100] [--workers 1 2 4]
+
+Writes a corpus of large feeds with full HTML content to a temporary directory
+and parses all of them concurrently.
+- before: feedparser.parse in the default thread pool, returning FeedParserDicts,
+  as the RSS update did; the GIL keeps this to one core
+- after: parse_feed in a process pool of each worker count, returning compact tuples
+The pickled size of one result shows what crosses the process boundary.
+Speedup is bounded by the number of cores.
+"""
+import argparse
+import asyncio
+import os
+import pickle
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import feedparser
+from services.feed_parser import parse_feed
+
+PARAGRAPH = "<p>Lorem ipsum <a href='https://example.org'>dolor</a> sit amet, <em>consectetur</em> adipiscing elit.</p>"
+
+def write_corpus(directory: str, feeds: int, entries: int):
+    paths = []
+    for n in range(feeds):
+        items = "".join(
+            f"<item><title>Article {n}-{i}</title><link>https://example.org/{n}/{i}</link>"
+            f"<guid>article-{n}-{i}</guid><author>author@example.org</author>"
+            f"<pubDate>Mon, 01 Jan 2024 00:{i % 60:02d}:00 GMT</pubDate>"
+            f"<description><![CDATA[{PARAGRAPH * 3}]]></description>"
+            f"<content:encoded><![CDATA[{PARAGRAPH * 40}]]></content:encoded></item>"
+            for i in range(entries)
+        )
+        path = os.path.join(directory, f"feed{n}.xml")
+        with open(path, "w") as file:
+            file.write(
+                '<?xml version="1.0"?><rss version="2.0" xmlns:content="http://purl.org/rss/1.0/modules/content/">'
+                f"<channel><title>Feed {n}</title>{items}</channel></rss>"
+            )
+        paths.append(path)
+    return paths
+
+async def parse_all(executor, func, documents):
+    loop = asyncio.get_running_loop()
+    return await asyncio.gather(*(loop.run_in_executor(executor, func, document) for document in documents))
+
+def run(label, executor, func, documents):
+    started = time.perf_counter()
+    results = asyncio.run(parse_all(executor, func, documents))
+    elapsed = time.perf_counter() - started
+    result_size = len(pickle.dumps(results[0]))
+    print(f"{label:<28} {elapsed * 1000:>9.1f} ms  {len(documents) / elapsed:>7.1f} feeds/s  "
+          f"{result_size / 1024:>8.1f} KB per result")
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--feeds", type=int, default=24)
+    parser.add_argument("--entries", type=int, default=100)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        documents = []
+        for path in write_corpus(tmp, args.feeds, args.entries):
+            with open(path, "rb") as file:
+                documents.append(file.read())
+
+        size = sum(len(document) for document in documents) / 1024 / 1024
+        print(f"{args.feeds} feeds x {args.entries} entries ({size:.1f} MB), {os.cpu_count()} CPUs")
+
+        before = run("before: threads", None, feedparser.parse, documents)
+        for workers in args.workers:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                # Start the workers outside the timed run
+                list(pool.map(abs, range(workers)))
+                after = run(f"after:  {workers} processes", pool, parse_feed, documents)
+            print(f"{'':<28} {before / after:>8.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Benchmark RSS ingestion: per-feed fetch/parse/commit loop vs. the staged pipeline with a single writer
+
+Usage (from the server directory):
+    python -m benchmarks.bench_ingest_pipeline [--feeds 200] [--entries 50] [--repeat 5]
+
+Feeds are served from a local HTTP server, and every run starts from empty
+tables in an on-disk SQLite database, so fsync and lock waits are included.
+Each run ingests the feeds (cold) and then polls them again unchanged
+(repoll), which is what most scheduled polls find. Both variants run
+--repeat times, interleaved, and the median run is reported.
+- before: every feed is fetched, parsed and committed in its own session,
+  concurrently, as the per-feed scheduler jobs did
+- after: rss_pipeline, whose writes are coalesced by the shared DB writer
+"""
+import argparse
+import asyncio
+import contextlib
+import functools
+import http.server
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+TMP_DIR = tempfile.mkdtemp()
+# The pipeline writes through the application's engine
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(TMP_DIR, 'bench.db')}"
+
+import feedparser
+from sqlalchemy import event
+from database.db import Base, SessionLocal, engine
+from models.models import RssArticle, RssFeed
+from services.feed_fetcher import fetch_feed
+from services.http_client import close_http_client
+from services.pipeline import db_writer
+from services.rss_service import fetch_and_update_rss_feeds, insert_new_articles, sanitize_id
+
+class QuietHandler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+def write_feeds(directory: str, feeds: int, entries: int):
+    for n in range(feeds):
+        items = "".join(
+            f"<item><title>Article {n}-{i}</title><link>https://example.org/{n}/{i}</link>"
+            f"<guid>article-{n}-{i}</guid><description>{'Lorem ipsum ' * 30}</description>"
+            f"<pubDate>Mon, 01 Jan 2024 00:{i % 60:02d}:00 GMT</pubDate></item>"
+            for i in range(entries)
+        )
+        with open(os.path.join(directory, f"feed{n}.xml"), "w") as file:
+            file.write(f'<?xml version="1.0"?><rss version="2.0"><channel><title>Feed {n}</title>{items}</channel></rss>')
+
+async def legacy_update_feed(feed_config):
+    """The previous per-feed path: its own session, parse, insert and commit"""
+    db = SessionLocal()
+    try:
+        fetched = await fetch_feed(feed_config["url"])
+        loop = asyncio.get_running_loop()
+        parsed_feed = await loop.run_in_executor(None, feedparser.parse, fetched["content"])
+        feed = db.get(RssFeed, sanitize_id(feed_config["title"]))
+        if feed is None:
+            feed = RssFeed(id=sanitize_id(feed_config["title"]), title=feed_config["title"], url=feed_config["url"], section="bench")
+            db.add(feed)
+            db.flush()
+        new_articles = insert_new_articles(db, feed.id, parsed_feed.entries)
+        db.commit()
+        return new_articles
+    except Exception as e:
+        print(f"Error updating {feed_config['url']}: {e}")
+        db.rollback()
+        return 0
+    finally:
+        db.close()
+
+async def legacy_update(feeds_config):
+    return sum(await asyncio.gather(*(legacy_update_feed(feed_config) for feed_config in feeds_config)))
+
+async def run_update(update, feeds_config):
+    # Each run has its own event loop, whose pooled connections close with it
+    try:
+        return await update(feeds_config)
+    finally:
+        await close_http_client()
+
+def timed_update(update, feeds_config, commits):
+    """Run one update; returns (seconds, commits, new articles, stored articles)"""
+    commits.clear()
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        new_articles = asyncio.run(run_update(update, feeds_config))
+    elapsed = time.perf_counter() - started
+
+    db = SessionLocal()
+    stored = db.query(RssArticle).count()
+    db.close()
+
+    return elapsed, len(commits), new_articles, stored
+
+def run(update, feeds_config, commits):
+    """Ingest into empty tables, then poll the same feeds again; returns both measurements"""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    return timed_update(update, feeds_config, commits), timed_update(update, feeds_config, commits)
+
+def report(label, runs, feeds):
+    elapsed, commits, new_articles, stored = sorted(runs)[len(runs) // 2]
+    spread = f"{min(run[0] for run in runs) * 1000:.0f}-{max(run[0] for run in runs) * 1000:.0f} ms"
+    print(f"{label:<15} {elapsed * 1000:>9.1f} ms  {feeds / elapsed:>7.1f} feeds/s  {new_articles / elapsed:>7.0f} articles/s  "
+          f"{commits:>4} commits  ({new_articles} new, {stored} stored)  range {spread}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--feeds", type=int, default=200)
+    parser.add_argument("--entries", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    www = os.path.join(TMP_DIR, "www")
+    os.makedirs(www)
+    write_feeds(www, args.feeds, args.entries)
+    server = http.server.ThreadingHTTPServer(("0.0.0.0", 0), functools.partial(QuietHandler, directory=www))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+
+    # Spread the feeds over loopback addresses so the per-host download limit is not the bottleneck
+    feeds_config = [
+        {"title": f"Feed {n}", "url": f"http://127.0.0.{n % 50 + 1}:{port}/feed{n}.xml", "section": "bench"}
+        for n in range(args.feeds)
+    ]
+
+    commits = []
+    event.listen(engine, "commit", lambda conn: commits.append(1))
+
+    print(f"{args.feeds} feeds x {args.entries} entries, median of {args.repeat} runs")
+    variants = {"before": legacy_update, "after": fetch_and_update_rss_feeds}
+    runs = {label: [] for label in variants}
+    for _ in range(max(1, args.repeat)):
+        for label, update in variants.items():
+            runs[label].append(run(update, feeds_config, commits))
+    for phase, name in enumerate(("cold", "repoll")):
+        for label in variants:
+            report(f"{label} {name}", [result[phase] for result in runs[label]], args.feeds)
+    print(f"writer: {db_writer.status()['writes_per_transaction']} feeds per transaction")
+
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
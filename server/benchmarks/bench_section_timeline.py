@@ -0,0 +1,114 @@
+"""
+Benchmark section timelines: joining the feeds table vs. the section copied onto articles
+
+Usage (from the server directory):
+    python -m benchmarks.bench_section_timeline [--articles 1000000] [--feeds 200] [--sections 5]
+
+Seeds a temporary database with articles spread over feeds and sections, one
+of which is small, then reads the first page and a page deep in the timeline
+of each section.
+- before: the query joined rss_feeds to filter and label by section; SQLite
+  reads one index range per feed of the section and merges them
+- after: get_rss_articles reads the (section, published_at, id) index range
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+from database.db import Base, create_db_engine
+from models.models import RssFeed, RssArticle
+from services.rss_service import get_rss_articles, insert_article_rows
+
+PAGE_SIZE = 20
+START = datetime(2020, 1, 1)
+
+def legacy_get_rss_articles(db, section, cursor, limit):
+    """The join the list endpoint used before the section was copied onto articles"""
+    query = db.query(
+        RssArticle,
+        RssFeed.title.label("feed_title"),
+        RssFeed.section
+    ).join(RssFeed).filter(RssFeed.section == section)
+    if cursor:
+        query = query.filter(RssArticle.published_at < datetime.fromisoformat(cursor))
+    return query.order_by(RssArticle.published_at.desc()).limit(limit + 1).all()
+
+def seed(db, args):
+    sections = [f"section_{n}" for n in range(args.sections)]
+    for n in range(args.feeds):
+        # The last section gets a single feed
+        section = sections[-1] if n == 0 else sections[n % (args.sections - 1)]
+        db.add(RssFeed(id=f"feed_{n}", title=f"Feed {n}", url=f"https://example.org/{n}", section=section))
+    db.commit()
+
+    generator = random.Random(0)
+    for start in range(0, args.articles, 10000):
+        rows = []
+        for i in range(start, min(start + 10000, args.articles)):
+            # The small section's feed publishes one article in 500
+            feed = 0 if i % 500 == 0 else generator.randrange(1, args.feeds)
+            rows.append({
+                "id": f"article_{i:08d}",
+                "feed_id": f"feed_{feed}",
+                "title": f"Article {i}",
+                "link": f"https://example.org/articles/{i}",
+                "author": "",
+                "published_at": START + timedelta(minutes=i),
+                "summary": "Lorem ipsum " * 10,
+                "content": "",
+                "image_url": ""
+            })
+        insert_article_rows(db, rows)
+        db.commit()
+    db.execute(text("ANALYZE"))
+    db.commit()
+    return sections
+
+def timed(func, runs: int) -> float:
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--articles", type=int, default=1000000)
+    parser.add_argument("--feeds", type=int, default=200)
+    parser.add_argument("--sections", type=int, default=5)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+
+        started = time.perf_counter()
+        sections = seed(db, args)
+        print(f"{args.articles} articles, {args.feeds} feeds, {args.sections} sections "
+              f"(seeded in {time.perf_counter() - started:.0f}s)")
+
+        # A cursor 90% of the way back in the timeline
+        deep_cursor = (START + timedelta(minutes=args.articles // 10)).isoformat()
+        for section in (sections[0], sections[-1]):
+            for page, cursor in (("first page", None), ("deep page", deep_cursor)):
+                before = timed(lambda: legacy_get_rss_articles(db, section, cursor, PAGE_SIZE), args.runs)
+                after = timed(lambda: get_rss_articles(db, section=section, cursor=cursor, limit=PAGE_SIZE), args.runs)
+                print(f"{section:<10} {page:<11} before {before:>8.2f} ms  after {after:>8.2f} ms  {before / after:>6.1f}x")
+
+        db.close()
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Benchmark API read latency while ingestion writes: default SQLite settings vs. the tuned engine profile
+
+Usage (from the server directory):
+    python -m benchmarks.bench_sqlite_profile [--seconds 10] [--readers 8] [--videos 20000]
+
+Each profile gets a fresh on-disk database seeded with videos. Reader threads
+page through the video timeline, as the API does, while a writer thread
+upserts batches of videos and commits, as ingestion does.
+- before: create_engine with only check_same_thread=False (rollback journal)
+- after: create_db_engine with the SQLITE_* pragmas and pool settings
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from database.db import Base, create_db_engine
+from models.models import Channel
+from services.repository import get_paginated_videos, update_videos_for_channel
+
+CHANNELS = 20
+SECTIONS = ["theory", "history", "economics", "current"]
+
+def make_videos(start: int, count: int):
+    return [
+        {
+            "id": f"video_{i:07d}",
+            "title": f"Video {i}",
+            "description": "Lorem ipsum " * 20,
+            "channel_id": f"channel_{i % CHANNELS}",
+            "published_at": datetime(2024, 1, i % 28 + 1, 0, i // 60 % 60, i % 60),
+            "thumbnail_url": f"https://i.ytimg.com/vi/video_{i:07d}/hqdefault.jpg"
+        }
+        for i in range(start, start + count)
+    ]
+
+def seed(Session, videos: int):
+    db = Session()
+    for n in range(CHANNELS):
+        db.add(Channel(id=f"channel_{n}", title=f"Channel {n}", section=SECTIONS[n % len(SECTIONS)], uploads_playlist_id=f"uploads_{n}"))
+    db.commit()
+    for start in range(0, videos, 5000):
+        update_videos_for_channel(db, None, make_videos(start, min(5000, videos - start)))
+    db.close()
+
+def run(label, engine, args):
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    seed(Session, args.videos)
+
+    stop = threading.Event()
+    latencies = []
+    read_errors = []
+    writes = [0, 0]
+
+    def reader(index: int):
+        section = SECTIONS[index % len(SECTIONS)]
+        while not stop.is_set():
+            db = Session()
+            started = time.perf_counter()
+            try:
+                get_paginated_videos(db, section=section, limit=20)
+                latencies.append(time.perf_counter() - started)
+            except OperationalError as e:
+                read_errors.append(str(e.orig))
+            finally:
+                db.close()
+
+    def writer():
+        next_id = args.videos
+        while not stop.is_set():
+            db = Session()
+            try:
+                # New videos plus updates to recent ones, as a sync page does
+                update_videos_for_channel(db, None, make_videos(next_id - 250, 500))
+                next_id += 250
+                writes[0] += 1
+            except OperationalError:
+                db.rollback()
+                writes[1] += 1
+            finally:
+                db.close()
+
+    threads = [threading.Thread(target=reader, args=(index,)) for index in range(args.readers)]
+    threads.append(threading.Thread(target=writer))
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+
+    latencies.sort()
+    p50 = statistics.median(latencies) * 1000 if latencies else float("nan")
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000 if latencies else float("nan")
+    print(f"{label:<7} reads {len(latencies):>6}  p50 {p50:>7.2f} ms  p99 {p99:>8.2f} ms  "
+          f"max {latencies[-1] * 1000 if latencies else float('nan'):>8.1f} ms  "
+          f"read errors {len(read_errors):>4}  write batches {writes[0]:>4} (failed {writes[1]})")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--videos", type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        before = create_engine(f"sqlite:///{os.path.join(tmp, 'before.db')}", connect_args={"check_same_thread": False})
+        run("before", before, args)
+
+        after = create_db_engine(f"sqlite:///{os.path.join(tmp, 'after.db')}")
+        run("after", after, args)
+
+if __name__ == "__main__":
+    main()
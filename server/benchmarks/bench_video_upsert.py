@@ -0,0 +1,87 @@
+"""
+Benchmark YouTube video ingestion: per-row SELECT/commit vs. set-based upsert
+
+Usage (from the server directory):
+    python -m benchmarks.bench_video_upsert [--videos 2000] [--page-size 50]
+
+Each run uses a fresh on-disk SQLite database so commit/fsync costs are included.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from database.db import Base
+from models.models import Channel, Video
+from services.repository import update_videos_for_channel
+
+def make_videos(count: int, channel_id: str):
+    return [
+        {
+            "id": f"video_{i:06d}",
+            "title": f"Video {i}",
+            "description": "Lorem ipsum " * 20,
+            "channel_id": channel_id,
+            "published_at": datetime(2024, 1, 1, 0, i // 60 % 60, i % 60),
+            "thumbnail_url": f"https://i.ytimg.com/vi/video_{i:06d}/hqdefault.jpg"
+        }
+        for i in range(count)
+    ]
+
+def legacy_update_videos_for_channel(db, channel_id, videos_data):
+    """The original implementation: one SELECT per video and one commit per new video"""
+    for video_data in videos_data:
+        db_video = db.query(Video).filter(Video.id == video_data["id"]).first()
+        if db_video:
+            db_video.title = video_data["title"]
+            db_video.description = video_data["description"]
+            db_video.published_at = video_data["published_at"]
+            db_video.thumbnail_url = video_data["thumbnail_url"]
+        else:
+            db_video = Video(**video_data)
+            db.add(db_video)
+            db.commit()
+            db.refresh(db_video)
+    db.commit()
+
+def run(label, update, videos, page_size):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        db = sessionmaker(bind=engine)()
+        db.add(Channel(id="channel", title="Channel", section="bench", uploads_playlist_id="uploads"))
+        db.commit()
+
+        results = []
+        # First pass inserts everything, second pass updates everything
+        for phase in ("insert", "update"):
+            start = time.perf_counter()
+            for offset in range(0, len(videos), page_size):
+                update(db, "channel", videos[offset:offset + page_size])
+            elapsed = time.perf_counter() - start
+            results.append((phase, elapsed))
+
+        db.close()
+        engine.dispose()
+
+    for phase, elapsed in results:
+        print(f"{label:<8} {phase:<7} {len(videos) / elapsed:>10.0f} rows/sec  ({elapsed:.2f}s)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--videos", type=int, default=2000)
+    parser.add_argument("--page-size", type=int, default=50)
+    args = parser.parse_args()
+
+    videos = make_videos(args.videos, "channel")
+    run("before", legacy_update_videos_for_channel, videos, args.page_size)
+    run("after", update_videos_for_channel, videos, args.page_size)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark API process cold start: eager full-discovery YouTube client vs. lazy pruned client
+
+Usage (from the server directory):
+    python -m benchmarks.bench_youtube_client [--runs 15]
+
+Every measurement runs in a fresh interpreter so module imports and document
+parsing are paid each time, as they are when a worker process starts.
+- before: build("youtube", "v3") from the full bundled discovery document three
+  times, as the eagerly constructed clients in main, routes and background did
+- after: importing main builds no client and skips googleapiclient.discovery;
+  the shared client is built once, on first use, from the pruned on-disk document
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+SERVER_DIR = os.path.join(os.path.dirname(__file__), "..")
+
+# Each snippet prints the time spent importing main, then the time spent building clients
+BEFORE = """
+import time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+from googleapiclient.discovery import build
+for _ in range(3):
+    build("youtube", "v3", developerKey="bench")
+print(imported - start, time.perf_counter() - imported)
+"""
+
+AFTER = """
+import time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+from services.youtube_service import get_youtube_service
+get_youtube_service().service.service.youtube
+print(imported - start, time.perf_counter() - imported)
+"""
+
+def run_once(code: str, env):
+    """Import and client build times from a fresh interpreter"""
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=SERVER_DIR, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    import_time, build_time = map(float, output.strip().splitlines()[-1].split())
+    return import_time, build_time
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=15)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            "YOUTUBE_API_KEY": "bench",
+            "DATABASE_URL": f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+            "YOUTUBE_DISCOVERY_CACHE_DIR": tmp,
+            "PYTHONWARNINGS": "ignore"
+        }
+
+        # Create the tables and write the discovery cache outside the timed runs
+        run_once(AFTER, env)
+
+        # Alternate the variants so drift in machine load affects both equally
+        before, after = [], []
+        for _ in range(args.runs):
+            before.append(sum(run_once(BEFORE, env)))
+            after.append(run_once(AFTER, env))
+
+    # Before, every client was built while the process started; now startup
+    # ends after the import and the client is built on the first API call
+    rows = [
+        ("before: startup (3 eager clients)", before),
+        ("after:  startup (lazy client)", [import_time for import_time, _ in after]),
+        ("after:  first API call builds client", [build_time for _, build_time in after])
+    ]
+    for label, timings in rows:
+        print(f"{label:<36} median {statistics.median(timings) * 1000:>8.1f} ms   min {min(timings) * 1000:>8.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,9 @@
-from sqlalchemy import create_engine, Column, String, ForeignKey
+from sqlalchemy import create_engine, event, Column, String, ForeignKey, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import functools
 import os
 from dotenv import load_dotenv
 
@@ -10,8 +13,69 @@ load_dotenv()
 # Get database URL from environment or use default
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///videos.db")
 
+# Connections kept open, and extra connections allowed under load
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+# Seconds to wait for a free connection before failing
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Threads that run the sessions of async code (API handlers, ingestion reads)
+# SQLite reads hold the GIL while rows are turned into objects, so more
+# threads mostly slow down the event loop unless there are several cores
+DB_EXECUTOR_WORKERS = int(os.getenv("DB_EXECUTOR_WORKERS", "1"))
+
+# Pragmas applied to every SQLite connection; an empty value leaves SQLite's default
+# WAL lets API reads run while ingestion writes, and NORMAL sync is safe under WAL
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    # Bytes of the database file read through a memory map
+    "mmap_size": os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)),
+    # Page cache per connection; negative values are KiB
+    "cache_size": os.getenv("SQLITE_CACHE_SIZE", "-65536"),
+    # Milliseconds a connection waits for a lock before "database is locked"
+    "busy_timeout": os.getenv("SQLITE_BUSY_TIMEOUT", "5000"),
+    "temp_store": os.getenv("SQLITE_TEMP_STORE", "MEMORY")
+}
+
+def _is_file_database(database_url: str) -> bool:
+    return ":memory:" not in database_url and database_url.split("?", 1)[0] not in ("sqlite://", "sqlite:///")
+
+def _apply_sqlite_pragmas(sync_engine, sqlite_pragmas: dict):
+    pragmas = [(name, value) for name, value in sqlite_pragmas.items() if value]
+    if pragmas:
+        @event.listens_for(sync_engine, "connect")
+        def set_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            try:
+                for name, value in pragmas:
+                    cursor.execute(f"PRAGMA {name}={value}")
+            finally:
+                cursor.close()
+
+def create_db_engine(database_url: str = DATABASE_URL, sqlite_pragmas: dict = SQLITE_PRAGMAS):
+    """
+    Create an engine with the configured pool, applying the SQLite pragmas on connect
+    """
+    if not database_url.startswith("sqlite"):
+        return create_engine(
+            database_url,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_pre_ping=True
+        )
+    
+    options = {"connect_args": {"check_same_thread": False}}
+    # In-memory databases use a single connection per thread, which takes no pool sizing
+    if _is_file_database(database_url):
+        options.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT)
+    sqlite_engine = create_engine(database_url, **options)
+    _apply_sqlite_pragmas(sqlite_engine, sqlite_pragmas)
+    
+    return sqlite_engine
+
 # Create SQLAlchemy engine
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+engine = create_db_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -22,4 +86,53 @@ def get_db():
         yield db
     finally:
         db.close()
-        
\ No newline at end of file
+
+# Async code runs its sessions here, see run_in_session
+db_executor = ThreadPoolExecutor(max_workers=DB_EXECUTOR_WORKERS, thread_name_prefix="db")
+
+def _call_with_session(func, args, kwargs):
+    db = SessionLocal(expire_on_commit=False)
+    try:
+        return func(db, *args, **kwargs)
+    finally:
+        db.close()
+
+async def run_in_session(func, *args, **kwargs):
+    """
+    Run func(db, *args, **kwargs) with its own Session on the database threads
+    and return its result, without blocking the event loop
+    The session is closed afterwards; attributes func loaded or committed on
+    the returned objects stay readable, relationships it did not load do not
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(db_executor, functools.partial(_call_with_session, func, args, kwargs))
+
+def add_missing_columns():
+    """
+    Add columns that exist on the models but not yet in the database
+    create_all() only creates missing tables, so new nullable columns on
+    existing tables are added here with ALTER TABLE, along with their server default
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+
+            existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+
+                column_type = column.type.compile(dialect=engine.dialect)
+                default = ""
+                if column.server_default is not None:
+                    # Existing rows take the default, e.g. enabled flags start out true
+                    default_value = column.server_default.arg
+                    if not isinstance(default_value, str):
+                        default_value = default_value.compile(dialect=engine.dialect)
+                    default = f" DEFAULT {default_value}"
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}{default}'))
+                print(f"Added column {table.name}.{column.name}")
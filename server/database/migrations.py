@@ -0,0 +1,199 @@
+import argparse
+import asyncio
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, List, Optional, Tuple
+from sqlalchemy import select, text
+from database.db import engine, Base, add_missing_columns
+from models.models import SchemaMigration, Video, SOURCE_LABELS, source_label_values
+
+# Rows converted per transaction by data migrations that run in batches
+MIGRATION_BATCH_SIZE = 5000
+
+# (version, description, function, transactional) in the order they are applied
+MIGRATIONS: List[Tuple[int, str, Callable, bool]] = []
+
+def migration(version: int, description: str, transactional: bool = True):
+    """
+    Register a schema migration
+    The function receives a connection inside the migration's transaction. Tables
+    and columns added to the models are created before migrations run, so
+    migrations only transform existing data and indexes.
+    - transactional: pass False for data migrations over large tables; the function
+      then receives the engine and commits in batches, so it must be safe to re-run.
+      The server applies these after startup, and the rows they have not reached
+      yet must stay readable
+    """
+    def register(func: Callable):
+        MIGRATIONS.append((version, description, func, transactional))
+        MIGRATIONS.sort(key=lambda entry: entry[0])
+        return func
+    return register
+
+def _create_indexes(conn, *names: str):
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            if index.name in names:
+                index.create(conn, checkfirst=True)
+
+@migration(1, "Composite indexes for timeline queries")
+def add_timeline_indexes(conn):
+    _create_indexes(
+        conn,
+        "ix_videos_channel_published", "ix_videos_published_channel",
+        "ix_rss_articles_feed_published", "ix_rss_articles_published_feed",
+        "ix_social_posts_account_posted", "ix_social_posts_posted_account", "ix_social_posts_platform_posted"
+    )
+
+    # Covered by the leading column of the composite indexes
+    for name in (
+        "ix_videos_published_at", "ix_rss_articles_published_at",
+        "ix_social_posts_posted_at", "ix_social_posts_platform"
+    ):
+        conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+    # Give the query planner statistics for the new indexes
+    if conn.dialect.name == "sqlite":
+        conn.execute(text("ANALYZE"))
+
+def _parse_video_timestamp(value) -> Optional[datetime]:
+    """
+    Parse the text stored in videos.published_at before it became a DateTime:
+    YouTube's ISO 8601 text, or the RFC 822 date of a WebSub push entry
+    """
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        try:
+            parsed = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+    if parsed.tzinfo:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+@migration(2, "Store videos.published_at as a DateTime", transactional=False)
+def convert_video_published_at(bind):
+    if bind.dialect.name != "sqlite":
+        with bind.begin() as conn:
+            conn.execute(text(
+                "ALTER TABLE videos ALTER COLUMN published_at TYPE TIMESTAMP "
+                "USING CAST(NULLIF(published_at, '') AS TIMESTAMPTZ) AT TIME ZONE 'UTC'"
+            ))
+        return
+
+    # SQLite stores DateTime as text, so the column keeps its type and the values
+    # are rewritten in the format SQLAlchemy reads back. Walking the rowid in short
+    # transactions keeps the write lock brief for the API and ingestion, and rows
+    # that are already converted are skipped when an interrupted run is resumed.
+    datetime_type = Video.__table__.c.published_at.type.dialect_impl(bind.dialect)
+    to_storage = datetime_type.bind_processor(bind.dialect)
+    last_rowid = 0
+    converted = 0
+    while True:
+        with bind.begin() as conn:
+            rows = conn.execute(
+                text("SELECT rowid, published_at FROM videos WHERE rowid > :last ORDER BY rowid LIMIT :limit"),
+                {"last": last_rowid, "limit": MIGRATION_BATCH_SIZE}
+            ).all()
+            if not rows:
+                break
+            last_rowid = rows[-1][0]
+
+            updates = []
+            for rowid, value in rows:
+                stored = to_storage(_parse_video_timestamp(value))
+                if stored != value:
+                    updates.append({"row": rowid, "value": stored})
+            if updates:
+                conn.execute(text("UPDATE videos SET published_at = :value WHERE rowid = :row"), updates)
+            converted += len(updates)
+
+    print(f"Converted published_at for {converted} videos")
+
+@migration(3, "Copy source section and title onto content rows", transactional=False)
+def backfill_source_labels(bind):
+    # One short transaction per source, through its per-source index
+    for source_model, content_model, foreign_key, labels in SOURCE_LABELS:
+        with bind.connect() as conn:
+            sources = conn.execute(select(source_model.__table__)).all()
+
+        for source in sources:
+            with bind.begin() as conn:
+                conn.execute(
+                    content_model.__table__.update()
+                    .where(foreign_key == source.id)
+                    .values(**source_label_values(source, labels))
+                )
+
+    # Built after the backfill so the rows are indexed once
+    with bind.begin() as conn:
+        _create_indexes(
+            conn, "ix_videos_section_published", "ix_rss_articles_section_published", "ix_social_posts_section_posted"
+        )
+        if conn.dialect.name == "sqlite":
+            conn.execute(text("ANALYZE"))
+
+async def run_batched_migrations():
+    """
+    Apply the migrations deferred at startup on a worker thread, while the server runs
+    Batched migrations commit in short transactions, so requests and ingestion continue
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        await loop.run_in_executor(None, run_migrations)
+    except Exception as e:
+        print(f"Error applying migrations: {e}")
+
+def applied_versions(bind=engine) -> set:
+    with bind.connect() as conn:
+        return set(conn.execute(select(SchemaMigration.version)).scalars())
+
+def run_migrations(bind=engine, defer_batched: bool = False) -> List[int]:
+    """
+    Apply pending migrations, each in its own transaction
+    - defer_batched: stop at the first batched data migration, so the server can
+      start and apply it and the ones after it in the background
+    Returns the versions that were applied
+    """
+    SchemaMigration.__table__.create(bind, checkfirst=True)
+    applied = applied_versions(bind)
+
+    newly_applied = []
+    for version, description, func, transactional in MIGRATIONS:
+        if version in applied:
+            continue
+        if defer_batched and not transactional:
+            print(f"Deferring migration {version} and later ones until after startup: {description}")
+            break
+
+        print(f"Applying migration {version}: {description}")
+        if not transactional:
+            func(bind)
+        with bind.begin() as conn:
+            if transactional:
+                func(conn)
+            conn.execute(SchemaMigration.__table__.insert().values(
+                version=version, description=description, applied_at=datetime.utcnow()
+            ))
+        newly_applied.append(version)
+
+    return newly_applied
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Apply pending schema migrations to DATABASE_URL")
+    parser.add_argument("--list", action="store_true", help="show migrations and whether they are applied, without applying them")
+    args = parser.parse_args()
+
+    if args.list:
+        SchemaMigration.__table__.create(engine, checkfirst=True)
+        applied = applied_versions()
+        for version, description, _, _ in MIGRATIONS:
+            print(f"{version:>4}  {'applied' if version in applied else 'pending':<8} {description}")
+    else:
+        Base.metadata.create_all(bind=engine)
+        add_missing_columns()
+        versions = run_migrations()
+        print(f"Applied {len(versions)} migrations" if versions else "Database is up to date")
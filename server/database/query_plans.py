@@ -0,0 +1,247 @@
+"""
+EXPLAIN QUERY PLAN check for the timeline queries behind the list endpoints
+
+Usage (from the server directory):
+    python -m database.query_plans [--rows 20000] [--live]
+
+Creates a temporary SQLite database with the application's schema and
+migrations, seeds it with a known distribution and runs ANALYZE, then runs
+every timeline query against it and prints its plan:
+- every content table gets --rows rows, published one minute apart
+- four sections: "large" holds about 70% of the rows over many sources,
+  "small" a single source with one row in 200
+- a quarter of the videos are Shorts and a tenth are not enriched yet
+- nine social posts in ten are on mastodon, the rest on bluesky
+Each query runs for the large and the small section, whose statistics lead
+the planner to different choices. Exits with status 1 if any of them scans
+a content table without an index, sorts its results in a temporary B-tree,
+joins a source table, or reads another index than the one meant for it.
+Content rows carry their source's section and title, so every timeline is
+one index range read in date order.
+--live checks the database at DATABASE_URL instead, with its own data.
+"""
+import argparse
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional, Tuple
+from sqlalchemy import bindparam, event, text, update
+from sqlalchemy.orm import sessionmaker
+from database.db import Base, SessionLocal, create_db_engine, engine
+
+CONTENT_TABLES = ("videos", "rss_articles", "social_posts")
+SOURCE_TABLES = ("channels", "rss_feeds", "social_accounts")
+
+# Seeded sections with their share of the sources; "small" gets a single source
+SEED_SECTIONS = (("large", 14), ("theory", 3), ("history", 3))
+SEED_START = datetime(2020, 1, 1)
+SEED_BATCH_SIZE = 5000
+
+def seed(db, rows: int):
+    """
+    Fill an empty database with the distribution described in the module docstring
+    """
+    # Import here to avoid circular imports
+    from models.models import Channel, RssFeed, SocialAccount, Video
+    from services.repository import update_videos_for_channel
+    from services.rss_service import insert_article_rows
+    from services.social_service import insert_social_posts
+
+    sources = [section for section, count in SEED_SECTIONS for _ in range(count)]
+    for n, section in enumerate(["small"] + sources):
+        db.add(Channel(id=f"channel_{n}", title=f"Channel {n}", section=section, uploads_playlist_id=f"uploads_{n}"))
+        db.add(RssFeed(id=f"feed_{n}", title=f"Feed {n}", url=f"https://example.org/{n}", section=section))
+        db.add(SocialAccount(id=f"account_{n}", platform="mastodon", username=f"user{n}", display_name=f"User {n}", section=section))
+    db.commit()
+
+    def source(i: int) -> int:
+        # Source 0 is the small section's only source
+        return 0 if i % 200 == 0 else 1 + i % len(sources)
+
+    for start in range(0, rows, SEED_BATCH_SIZE):
+        batch = range(start, min(start + SEED_BATCH_SIZE, rows))
+        update_videos_for_channel(db, None, [
+            {
+                "id": f"video_{i:08d}",
+                "title": f"Video {i}",
+                "description": "",
+                "channel_id": f"channel_{source(i)}",
+                "published_at": SEED_START + timedelta(minutes=i),
+                "thumbnail_url": ""
+            }
+            for i in batch
+        ], commit=False)
+        db.connection().execute(
+            update(Video).where(Video.id == bindparam("_id")).values(duration=bindparam("duration")),
+            [
+                {"_id": f"video_{i:08d}", "duration": 45 if i % 4 == 0 else 600}
+                for i in batch if i % 10 != 1
+            ]
+        )
+        insert_article_rows(db, [
+            {
+                "id": f"article_{i:08d}",
+                "feed_id": f"feed_{source(i)}",
+                "title": f"Article {i}",
+                "link": f"https://example.org/articles/{i}",
+                "author": "",
+                "published_at": SEED_START + timedelta(minutes=i),
+                "summary": "",
+                "content": "",
+                "image_url": ""
+            }
+            for i in batch
+        ])
+        insert_social_posts(db, [
+            {
+                "id": f"post_{i:08d}",
+                "account_id": f"account_{source(i)}",
+                "platform": "bluesky" if i % 10 == 0 else "mastodon",
+                "content": f"Post {i}",
+                "posted_at": SEED_START + timedelta(minutes=i),
+                "url": "",
+                "media_url": ""
+            }
+            for i in batch
+        ])
+        db.commit()
+
+    db.execute(text("ANALYZE"))
+    db.commit()
+
+def timeline_queries(db, section: str) -> List[Tuple[str, str, Callable]]:
+    """
+    (name, index the plan must read, query function) for every timeline query
+    """
+    # Import here to avoid circular imports
+    from models.models import Video
+    from services.repository import get_paginated_videos, get_videos
+    from services.rss_service import get_rss_articles
+    from services.social_service import get_social_posts
+
+    # Cursors halfway down the section's timeline
+    count = db.query(Video).filter(Video.section == section).count()
+    video_cursor = (
+        db.query(Video.id).filter(Video.section == section)
+        .order_by(Video.published_at.desc()).offset(count // 2).limit(1).scalar()
+    )
+    published_at = db.query(Video.published_at).filter(Video.id == video_cursor).scalar()
+    cursor = (published_at or datetime.utcnow()).isoformat()
+    return [
+        ("videos", "ix_videos_published_channel", lambda db: get_videos(db)),
+        ("videos by section", "ix_videos_section_published", lambda db: get_videos(db, section=section)),
+        ("videos without shorts", "ix_videos_section_published",
+         lambda db: get_paginated_videos(db, section=section, exclude_shorts=True)),
+        ("videos after cursor", "ix_videos_section_published",
+         lambda db: get_paginated_videos(db, section=section, cursor=video_cursor)),
+        ("rss articles", "ix_rss_articles_published_feed", lambda db: get_rss_articles(db)),
+        ("rss articles by section", "ix_rss_articles_section_published", lambda db: get_rss_articles(db, section=section)),
+        ("rss articles after cursor", "ix_rss_articles_section_published",
+         lambda db: get_rss_articles(db, section=section, cursor=cursor)),
+        ("social posts", "ix_social_posts_posted_account", lambda db: get_social_posts(db)),
+        ("social posts by section", "ix_social_posts_section_posted", lambda db: get_social_posts(db, section=section)),
+        ("social posts by platform", "ix_social_posts_platform_posted", lambda db: get_social_posts(db, platform="bluesky")),
+        ("social posts after cursor", "ix_social_posts_section_posted",
+         lambda db: get_social_posts(db, section=section, cursor=cursor))
+    ]
+
+def explain(db, name: str, run: Callable) -> List[str]:
+    """
+    Run a query function and return the plan of the statement it executed last
+    """
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    bind = db.get_bind()
+    event.listen(bind, "before_cursor_execute", capture)
+    try:
+        run(db)
+    finally:
+        event.remove(bind, "before_cursor_execute", capture)
+
+    statement, parameters = statements[-1]
+    rows = db.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    return [row[-1] for row in rows]
+
+def plan_problem(plan: List[str], index: str) -> str:
+    """
+    Return what is wrong with a timeline query plan, or an empty string
+    - index: the index the query is meant to read; another one means a filter
+      is applied row by row, e.g. the date index walked for a small section
+    """
+    for step in plan:
+        if any(step == f"SCAN {table}" for table in CONTENT_TABLES):
+            return "FULL SCAN"
+
+    if any("USE TEMP B-TREE" in step for step in plan):
+        return "SORTS"
+
+    if any(step.split(" ")[1:2] == [table] for step in plan for table in SOURCE_TABLES):
+        return "JOINS"
+
+    if not any(f"USING INDEX {index}" in step or f"USING COVERING INDEX {index}" in step for step in plan):
+        return "INDEX"
+
+    return ""
+
+def check_query_plans(db, sections: List[Optional[str]]) -> bool:
+    """
+    Print the plan of every timeline query for each section
+    Returns False if any of them sorts, joins, scans without an index or reads another index than expected
+    """
+    ok = True
+    for section in sections:
+        print(f"section {section}")
+        for name, index, run in timeline_queries(db, section):
+            plan = explain(db, name, run)
+            problem = plan_problem(plan, index)
+            ok = ok and not problem
+            print(f"{problem or 'ok':<9} {name}" + (f" (expected {index})" if problem == "INDEX" else ""))
+            for step in plan:
+                print(f"          {step}")
+    return ok
+
+def check_seeded_database(rows: int) -> bool:
+    # Import here to avoid circular imports
+    from database.migrations import run_migrations
+
+    with tempfile.TemporaryDirectory() as tmp:
+        seeded_engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'query_plans.db')}")
+        try:
+            Base.metadata.create_all(bind=seeded_engine)
+            run_migrations(bind=seeded_engine)
+            db = sessionmaker(bind=seeded_engine)()
+            try:
+                seed(db, rows)
+                return check_query_plans(db, ["large", "small"])
+            finally:
+                db.close()
+        finally:
+            seeded_engine.dispose()
+
+def check_live_database() -> bool:
+    # Import here to avoid circular imports
+    from models.models import Channel
+
+    db = SessionLocal()
+    try:
+        # Plans depend on the statistics for the value, so use a section that exists
+        section = db.query(Channel.section).filter(Channel.section.isnot(None)).limit(1).scalar() or "general"
+        return check_query_plans(db, [section])
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000, help="rows seeded per content table")
+    parser.add_argument("--live", action="store_true", help="check DATABASE_URL instead of a seeded database")
+    args = parser.parse_args()
+
+    if args.live:
+        if engine.dialect.name != "sqlite":
+            sys.exit("EXPLAIN QUERY PLAN output is only checked for SQLite")
+        sys.exit(0 if check_live_database() else 1)
+    sys.exit(0 if check_seeded_database(args.rows) else 1)
@@ -1,9 +1,34 @@
-from sqlalchemy import Column, String, ForeignKey, Text, Integer, DateTime, Table
+from sqlalchemy import Column, String, ForeignKey, Text, Integer, Date, DateTime, Table, Boolean, Index, true, event, inspect, update
+from sqlalchemy.types import TypeDecorator
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, Session
 from database.db import Base
 import datetime
 
+class LenientDateTime(TypeDecorator):
+    """
+    DateTime that reads text it cannot parse as NULL and offsets as naive UTC
+    videos.published_at held free text before it became a DateTime; old rows
+    are converted by a batched migration after startup and stay readable until then
+    """
+    impl = DateTime
+    cache_ok = True
+
+    def result_processor(self, dialect, coltype):
+        process = super().result_processor(dialect, coltype)
+        if process is None:
+            return None
+
+        def lenient(value):
+            try:
+                value = process(value)
+            except ValueError:
+                return None
+            if isinstance(value, datetime.datetime) and value.tzinfo:
+                value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+            return value
+        return lenient
+
 # Existing Models
 
 class Channel(Base):
@@ -13,19 +38,43 @@ class Channel(Base):
     title = Column(String, index=True)
     section = Column(String, index=True)
     uploads_playlist_id = Column(String)
+    # Higher priority channels are synced first and still synced when quota runs low
+    priority = Column(Integer, default=0)
+    # Seconds between polls; falls back to YOUTUBE_INTERVAL when empty
+    poll_interval = Column(Integer)
+    # Sources removed from the config files are disabled rather than deleted
+    enabled = Column(Boolean, default=True, server_default=true())
     
     videos = relationship("Video", back_populates="channel", cascade="all, delete-orphan")
 
 class Video(Base):
     __tablename__ = "videos"
+    __table_args__ = (
+        # Per-channel timelines and publishing cadence
+        Index("ix_videos_channel_published", "channel_id", "published_at", "id"),
+        # The timeline scans by date and filters on the channel without reading the row
+        Index("ix_videos_published_channel", "published_at", "channel_id"),
+        # Section timelines read one index range, without joining channels
+        Index("ix_videos_section_published", "section", "published_at", "id"),
+    )
 
     id = Column(String, primary_key=True, index=True)
     title = Column(String, index=True)
     description = Column(Text)
     channel_id = Column(String, ForeignKey("channels.id"))
-    published_at = Column(String, index=True)
+    published_at = Column(LenientDateTime)
     thumbnail_url = Column(String)
     
+    # Copied from the channel so timelines need no join; see SOURCE_LABELS
+    section = Column(String)
+    channel_title = Column(String)
+    
+    # Filled in by the videos.list enrichment stage
+    duration = Column(Integer)  # in seconds
+    view_count = Column(Integer)
+    live_status = Column(String)  # none, live, upcoming
+    details_updated_at = Column(DateTime, index=True)
+    
     channel = relationship("Channel", back_populates="videos")
 
 # New Models for RSS Feeds
@@ -40,21 +89,45 @@ class RssFeed(Base):
     section = Column(String, index=True)
     last_updated = Column(DateTime, default=datetime.datetime.utcnow)
     
+    # HTTP validators from the last successful fetch, used for conditional GETs
+    etag = Column(String)
+    last_modified = Column(String)
+    content_hash = Column(String)
+    
+    # Scheduling overrides; poll_interval falls back to RSS_INTERVAL when empty
+    priority = Column(Integer, default=0)
+    poll_interval = Column(Integer)
+    # Sources removed from the config files are disabled rather than deleted
+    enabled = Column(Boolean, default=True, server_default=true())
+    
+    # WebSub hub and topic advertised by the feed, if any
+    websub_hub = Column(String)
+    websub_topic = Column(String)
+    
     articles = relationship("RssArticle", back_populates="feed", cascade="all, delete-orphan")
 
 class RssArticle(Base):
     __tablename__ = "rss_articles"
+    __table_args__ = (
+        Index("ix_rss_articles_feed_published", "feed_id", "published_at", "id"),
+        Index("ix_rss_articles_published_feed", "published_at", "feed_id"),
+        Index("ix_rss_articles_section_published", "section", "published_at", "id"),
+    )
     
     id = Column(String, primary_key=True)
     feed_id = Column(String, ForeignKey("rss_feeds.id"))
     title = Column(String, index=True)
     link = Column(String)
     author = Column(String)
-    published_at = Column(DateTime, index=True)
+    published_at = Column(DateTime)
     summary = Column(Text)
     content = Column(Text)
     image_url = Column(String)
     
+    # Copied from the feed so timelines need no join; see SOURCE_LABELS
+    section = Column(String)
+    feed_title = Column(String)
+    
     feed = relationship("RssFeed", back_populates="articles")
 
 # New Models for Social Media
@@ -71,26 +144,152 @@ class SocialAccount(Base):
     section = Column(String, index=True)
     last_updated = Column(DateTime, default=datetime.datetime.utcnow)
     
+    # Platform-side account ID and the newest post ID seen, for since_id polling
+    platform_account_id = Column(String)
+    since_id = Column(String)
+    # Sources removed from the config files are disabled rather than deleted
+    enabled = Column(Boolean, default=True, server_default=true())
+    
     posts = relationship("SocialPost", back_populates="account", cascade="all, delete-orphan")
 
 class SocialPost(Base):
     __tablename__ = "social_posts"
+    __table_args__ = (
+        Index("ix_social_posts_account_posted", "account_id", "posted_at", "id"),
+        Index("ix_social_posts_posted_account", "posted_at", "account_id"),
+        Index("ix_social_posts_platform_posted", "platform", "posted_at"),
+        Index("ix_social_posts_section_posted", "section", "posted_at", "id"),
+    )
     
     id = Column(String, primary_key=True)
     account_id = Column(String, ForeignKey("social_accounts.id"))
-    platform = Column(String, index=True)
+    platform = Column(String)
     content = Column(Text)
-    posted_at = Column(DateTime, index=True)
+    posted_at = Column(DateTime)
     url = Column(String)
     media_url = Column(String)
     likes = Column(Integer, default=0)
     shares = Column(Integer, default=0)
     comments = Column(Integer, default=0)
     
+    # Copied from the account so timelines need no join; see SOURCE_LABELS
+    section = Column(String)
+    author = Column(String)
+    author_image_url = Column(String)
+    
     account = relationship("SocialAccount", back_populates="posts")
 
+# Source columns copied onto their content rows, as
+# (source model, content model, foreign key, {source attribute: content column})
+SOURCE_LABELS = [
+    (Channel, Video, Video.channel_id, {"section": "section", "title": "channel_title"}),
+    (RssFeed, RssArticle, RssArticle.feed_id, {"section": "section", "title": "feed_title"}),
+    (SocialAccount, SocialPost, SocialPost.account_id, {
+        "section": "section", "display_name": "author", "avatar_url": "author_image_url"
+    }),
+]
+
+def source_label_values(source, labels: dict) -> dict:
+    """
+    Return the content row columns for a source, e.g. {"section": ..., "channel_title": ...}
+    """
+    return {column: getattr(source, attribute) for attribute, column in labels.items()}
+
+@event.listens_for(Session, "after_flush")
+def update_source_labels(session, flush_context):
+    """
+    Rewrite the copied columns on content rows when a source's section or title changes
+    Runs in the same transaction as the change, for every session
+    """
+    for source in session.dirty:
+        for source_model, content_model, foreign_key, labels in SOURCE_LABELS:
+            if not isinstance(source, source_model):
+                continue
+
+            state = inspect(source)
+            changed = {
+                column: getattr(source, attribute) for attribute, column in labels.items()
+                if state.attrs[attribute].history.has_changes()
+            }
+            if changed:
+                session.connection().execute(
+                    update(content_model.__table__).where(foreign_key == source.id).values(**changed)
+                )
+
+# Background Scheduling
+
+class ScheduledJob(Base):
+    __tablename__ = "scheduled_jobs"
+    
+    id = Column(String, primary_key=True)  # e.g. youtube:<channel_id>, rss:<feed_id>, social
+    interval_seconds = Column(Integer)
+    next_run_at = Column(DateTime)
+    last_run_at = Column(DateTime)
+    last_status = Column(String)
+
+class YouTubeQuotaUsage(Base):
+    __tablename__ = "youtube_quota_usage"
+    
+    # One row per quota day (midnight to midnight Pacific time)
+    quota_day = Column(Date, primary_key=True)
+    used = Column(Integer, default=0)
+    # Set when the API answered quotaExceeded, whatever our own count says
+    exhausted = Column(Boolean, default=False)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+class WebSubSubscription(Base):
+    __tablename__ = "websub_subscriptions"
+    
+    id = Column(String, primary_key=True)  # <source_type>_<source_id>, also the callback path
+    source_type = Column(String, index=True)  # youtube, rss
+    source_id = Column(String)
+    topic = Column(String)
+    hub = Column(String)
+    secret = Column(String)
+    status = Column(String, default="pending")  # pending, active, denied, unsubscribed
+    # subscribe or unsubscribe while a request we sent awaits the hub's verification
+    pending_mode = Column(String)
+    lease_expires_at = Column(DateTime)
+    last_push_at = Column(DateTime)
+
+class ConfigFingerprint(Base):
+    __tablename__ = "config_fingerprints"
+    
+    # "<file>" for the whole file, "<file>:<entry key>" for a single entry
+    id = Column(String, primary_key=True)
+    file = Column(String, index=True)
+    entry_key = Column(String)
+    content_hash = Column(String)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+class SchemaMigration(Base):
+    __tablename__ = "schema_migrations"
+    
+    # Applied by database.migrations, in order
+    version = Column(Integer, primary_key=True)
+    description = Column(String)
+    applied_at = Column(DateTime, default=datetime.datetime.utcnow)
+
 # New Models for Reading List
 
+class ImportJob(Base):
+    __tablename__ = "import_jobs"
+    
+    id = Column(String, primary_key=True)
+    path = Column(String, index=True)
+    format = Column(String)  # csv or ndjson
+    status = Column(String)  # running, completed, failed
+    # Checkpoint: input rows fully processed and committed
+    rows_done = Column(Integer, default=0)
+    added = Column(Integer, default=0)
+    skipped = Column(Integer, default=0)
+    error_count = Column(Integer, default=0)
+    errors = Column(Text)  # JSON list of the first row errors
+    rows_per_second = Column(Integer)
+    started_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
 # Association table for many-to-many relationship between books and tags
 book_tags = Table(
     "book_tags",
@@ -124,6 +323,8 @@ class ReadingMaterial(Base):
     publication_year = Column(String)
     pages = Column(Integer)
     reading_time = Column(Integer)  # in minutes
+    # Materials removed from reading_list.json are hidden rather than deleted
+    enabled = Column(Boolean, default=True, server_default=true())
     
     # Relationship for many-to-many with tags
     tags = relationship("Tag", secondary=book_tags, back_populates="books")
@@ -8,12 +8,17 @@ class VideoBase(BaseModel):
     id: str
     title: str
     description: str
-    published_at: str
+    # Empty for videos whose stored date could not be read
+    published_at: Optional[datetime] = None
     thumbnail_url: str
 
 class Video(VideoBase):
-    channel_title: str
-    section: str
+    # Copied from the channel; empty until the migration that backfills them has run
+    channel_title: Optional[str] = None
+    section: Optional[str] = None
+    duration: Optional[int] = None  # in seconds
+    view_count: Optional[int] = None
+    live_status: Optional[str] = None
 
     class Config:
         orm_mode = True
@@ -150,6 +155,11 @@ class ReadingMaterial(ReadingMaterialBase):
     class Config:
         orm_mode = True
 
+class ReadingListImport(BaseModel):
+    path: str  # relative to READING_IMPORT_DIR
+    format: Optional[str] = None  # csv or ndjson; detected from the extension by default
+    restart: bool = False
+
 # Pagination Schemas
 
 class PaginatedResult(BaseModel):
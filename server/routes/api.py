@@ -1,37 +1,61 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Header, Query, Request, Response
+from fastapi.responses import PlainTextResponse
 from typing import List, Optional, Dict, Any
 import asyncio
-from models.schemas import Channel, ChannelCreate, Video
-from database.db import get_db
-from services.youtube_service import YouTubeService
+import hmac
+import os
+from models.schemas import Channel, ChannelCreate, Video, ReadingListImport
+from database.db import run_in_session
+from services.youtube_service import get_youtube_service
+from services.youtube_quota import QuotaExceededError
+from services.youtube_sync import sync_channel_videos
+from services.background import scheduler
 from services.repository import (
     get_channels, get_channel, create_channel, get_videos, 
     update_videos_for_channel, get_paginated_videos
 )
-from services.rss_service import get_rss_feeds, get_rss_articles
+from services.pipeline import pipeline_metrics
+from services.rss_service import get_rss_feeds, get_rss_articles, get_feed_cache_stats
 from services.social_service import get_social_posts
 from services.reading_list_service import get_reading_materials
+from services.reading_list_import import (
+    create_import_job, get_import_job, run_import_in_background, is_job_active, job_status
+)
+from services.websub_service import get_subscription, verify_intent, verify_signature, handle_push
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Admin endpoints require this value in the X-Admin-Token header; they are disabled when it is empty
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+# Directory that admin imports may read files from
+READING_IMPORT_DIR = os.path.abspath(
+    os.getenv("READING_IMPORT_DIR") or os.path.join(os.path.dirname(__file__), "..", "..")
+)
 
 router = APIRouter()
-youtube_service = YouTubeService()
+youtube_service = get_youtube_service()
 
 # ===== EXISTING YOUTUBE VIDEO ROUTES =====
 
 @router.get("/channels", response_model=List[Channel])
-def read_channels(db: Session = Depends(get_db)):
-    channels = get_channels(db)
+async def read_channels():
+    channels = await run_in_session(get_channels)
     return channels
 
 @router.post("/channels/add", response_model=Channel)
-async def add_channel(channel_data: ChannelCreate, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
+async def add_channel(channel_data: ChannelCreate, background_tasks: BackgroundTasks):
     # Check if channel already exists
-    db_channel = get_channel(db, channel_data.id)
+    db_channel = await run_in_session(get_channel, channel_data.id)
     if db_channel:
         return db_channel
     
     # Get channel info from YouTube
-    channel_info = youtube_service.get_channel_info(channel_data.id)
+    try:
+        channel_info = await youtube_service.get_channel_info(channel_data.id)
+    except QuotaExceededError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     if not channel_info:
         raise HTTPException(status_code=404, detail="Channel not found on YouTube")
     
@@ -39,7 +63,7 @@ async def add_channel(channel_data: ChannelCreate, background_tasks: BackgroundT
     channel_info["section"] = channel_data.section
     
     # Create channel in database
-    db_channel = create_channel(db, channel_info)
+    db_channel = await run_in_session(create_channel, channel_info)
     
     # Fetch videos in background
     background_tasks.add_task(
@@ -50,9 +74,31 @@ async def add_channel(channel_data: ChannelCreate, background_tasks: BackgroundT
     
     return db_channel
 
+@router.get("/youtube/quota")
+async def read_youtube_quota():
+    """
+    Remaining YouTube Data API quota for the current quota day
+    """
+    await youtube_service.quota.load()
+    return youtube_service.quota.status()
+
+@router.get("/scheduler/jobs")
+def read_scheduler_jobs():
+    """
+    Background jobs with their intervals and next run times
+    """
+    return scheduler.status()
+
+@router.get("/pipeline/metrics")
+def read_pipeline_metrics():
+    """
+    Throughput and queue depth of each ingestion pipeline stage and of the DB writer
+    """
+    return pipeline_metrics()
+
 @router.get("/videos", response_model=List[Video])
-def read_videos(section: Optional[str] = None, db: Session = Depends(get_db)):
-    videos_data = get_videos(db, section)
+async def read_videos(section: Optional[str] = None, exclude_shorts: bool = False):
+    videos_data = await run_in_session(get_videos, section, exclude_shorts=exclude_shorts)
     
     # Format response
     result = []
@@ -63,6 +109,9 @@ def read_videos(section: Optional[str] = None, db: Session = Depends(get_db)):
             "description": video.description,
             "published_at": video.published_at,
             "thumbnail_url": video.thumbnail_url,
+            "duration": video.duration,
+            "view_count": video.view_count,
+            "live_status": video.live_status,
             "channel_title": channel_title,
             "section": section
         }
@@ -71,18 +120,23 @@ def read_videos(section: Optional[str] = None, db: Session = Depends(get_db)):
     return result
 
 @router.get("/videos/load-more")
-def load_more_videos(section: Optional[str] = None, cursor: Optional[str] = None, db: Session = Depends(get_db)):
+async def load_more_videos(
+    section: Optional[str] = None,
+    cursor: Optional[str] = None,
+    exclude_shorts: bool = False
+):
     """
     Load more videos with pagination
     - section: Filter by section (optional)
     - cursor: Last video ID (optional)
+    - exclude_shorts: Leave out YouTube Shorts (optional)
     """
     # Default to 10 videos per page
     limit = 10
     
     try:
         # Get videos with pagination
-        videos_data = get_paginated_videos(db, section, cursor, limit)
+        videos_data = await run_in_session(get_paginated_videos, section, cursor, limit, exclude_shorts)
         
         # Format response
         result = []
@@ -93,6 +147,9 @@ def load_more_videos(section: Optional[str] = None, cursor: Optional[str] = None
                 "description": video.description,
                 "published_at": video.published_at,
                 "thumbnail_url": video.thumbnail_url,
+                "duration": video.duration,
+                "view_count": video.view_count,
+                "live_status": video.live_status,
                 "channel_title": channel_title,
                 "section": section
             }
@@ -108,8 +165,12 @@ def load_more_videos(section: Optional[str] = None, cursor: Optional[str] = None
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/channels/{channel_id}/refresh")
-async def refresh_channel(channel_id: str, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
-    db_channel = get_channel(db, channel_id)
+async def refresh_channel(channel_id: str, background_tasks: BackgroundTasks, full: bool = False):
+    """
+    Refresh a channel's videos
+    - full: reconcile the whole uploads playlist instead of only fetching new uploads (optional)
+    """
+    db_channel = await run_in_session(get_channel, channel_id)
     if not db_channel:
         raise HTTPException(status_code=404, detail="Channel not found")
     
@@ -117,7 +178,8 @@ async def refresh_channel(channel_id: str, background_tasks: BackgroundTasks, db
     background_tasks.add_task(
         fetch_and_update_videos, 
         channel_id=db_channel.id, 
-        uploads_playlist_id=db_channel.uploads_playlist_id
+        uploads_playlist_id=db_channel.uploads_playlist_id,
+        full=full
     )
     
     return {"status": "Refresh task started"}
@@ -125,19 +187,19 @@ async def refresh_channel(channel_id: str, background_tasks: BackgroundTasks, db
 # ===== NEW RSS FEED ROUTES =====
 
 @router.get("/rss")
-def read_rss_articles(section: Optional[str] = None, db: Session = Depends(get_db)):
+async def read_rss_articles(section: Optional[str] = None):
     """
     Get RSS feed articles, optionally filtered by section
     """
     try:
-        articles = get_rss_articles(db, section)
+        articles = await run_in_session(get_rss_articles, section)
         return articles
     except Exception as e:
         print(f"Error fetching RSS articles: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/rss/load-more")
-def load_more_rss_articles(section: Optional[str] = None, cursor: Optional[str] = None, db: Session = Depends(get_db)):
+async def load_more_rss_articles(section: Optional[str] = None, cursor: Optional[str] = None):
     """
     Load more RSS articles with pagination
     - section: Filter by section (optional)
@@ -148,7 +210,7 @@ def load_more_rss_articles(section: Optional[str] = None, cursor: Optional[str]
         limit = 10
         
         # This would call a function similar to get_paginated_videos but for RSS
-        articles = get_rss_feeds(db, section, cursor, limit)
+        articles = await run_in_session(get_rss_feeds, section, cursor, limit)
         
         # Return articles and next cursor for pagination
         return articles
@@ -156,28 +218,35 @@ def load_more_rss_articles(section: Optional[str] = None, cursor: Optional[str]
         print(f"Error loading more RSS articles: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/rss/cache-stats")
+def read_rss_cache_stats():
+    """
+    Conditional GET hit/miss counters for RSS feed fetches since startup
+    """
+    return get_feed_cache_stats()
+
 # ===== NEW SOCIAL MEDIA ROUTES =====
 
 @router.get("/social")
-def read_social_posts(section: Optional[str] = None, platform: Optional[str] = None, db: Session = Depends(get_db)):
+async def read_social_posts(section: Optional[str] = None, platform: Optional[str] = None):
     """
     Get social media posts, optionally filtered by section and platform
     - section: Filter by section (optional)
     - platform: Filter by platform (twitter, facebook, etc.) (optional)
     """
     try:
-        posts = get_social_posts(db, section, platform)
+        posts = await run_in_session(get_social_posts, section, platform)
         return posts
     except Exception as e:
         print(f"Error fetching social posts: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/social/load-more")
-def load_more_social_posts(
+async def load_more_social_posts(
     section: Optional[str] = None, 
     platform: Optional[str] = None,
     cursor: Optional[str] = None, 
-    db: Session = Depends(get_db)
+    
 ):
     """
     Load more social media posts with pagination
@@ -190,7 +259,7 @@ def load_more_social_posts(
         limit = 10
         
         # This would call a service function for paginated social posts
-        posts = get_social_posts(db, section, platform, cursor, limit)
+        posts = await run_in_session(get_social_posts, section, platform, cursor, limit)
         
         # Return posts and pagination info
         return posts
@@ -201,10 +270,9 @@ def load_more_social_posts(
 # ===== NEW READING LIST ROUTES =====
 
 @router.get("/reading-list")
-def read_reading_materials(
+async def read_reading_materials(
     section: Optional[str] = None, 
-    difficulty: Optional[str] = None,
-    db: Session = Depends(get_db)
+    difficulty: Optional[str] = None
 ):
     """
     Get reading materials, optionally filtered by section and difficulty
@@ -212,18 +280,18 @@ def read_reading_materials(
     - difficulty: Filter by difficulty level (beginner, intermediate, advanced) (optional)
     """
     try:
-        materials = get_reading_materials(db, section, difficulty)
+        materials = await run_in_session(get_reading_materials, section, difficulty)
         return materials
     except Exception as e:
         print(f"Error fetching reading materials: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/reading-list/load-more")
-def load_more_reading_materials(
+async def load_more_reading_materials(
     section: Optional[str] = None, 
     difficulty: Optional[str] = None,
     cursor: Optional[str] = None, 
-    db: Session = Depends(get_db)
+    
 ):
     """
     Load more reading materials with pagination
@@ -236,7 +304,7 @@ def load_more_reading_materials(
         limit = 10
         
         # This would call a service function for paginated reading materials
-        materials = get_reading_materials(db, section, difficulty, cursor, limit)
+        materials = await run_in_session(get_reading_materials, section, difficulty, cursor, limit)
         
         # Return materials and pagination info
         return materials
@@ -244,33 +312,104 @@ def load_more_reading_materials(
         print(f"Error loading more reading materials: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-# Background task to fetch and update videos (existing function)
-async def fetch_and_update_videos(channel_id: str, uploads_playlist_id: str):
-    """Fetch and update videos for a channel"""
-    # Get a new DB session (since we're in a background task)
-    db = next(get_db())
+# ===== ADMIN ROUTES =====
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+@router.post("/admin/reading-list/import", status_code=202, dependencies=[Depends(require_admin)])
+async def start_reading_list_import(
+    request: ReadingListImport,
+    background_tasks: BackgroundTasks
+):
+    """
+    Import a CSV or NDJSON file from READING_IMPORT_DIR as a background job
+    An unfinished import of the same file resumes from its checkpoint unless restart is set
+    """
+    path = os.path.abspath(os.path.join(READING_IMPORT_DIR, request.path))
+    if os.path.commonpath([path, READING_IMPORT_DIR]) != READING_IMPORT_DIR:
+        raise HTTPException(status_code=400, detail="Path is outside the import directory")
     
-    # Fetch initial batch of videos from YouTube
-    max_results = 50
-    videos, next_page_token = youtube_service.get_playlist_videos(uploads_playlist_id, max_results)
+    try:
+        job = await run_in_session(create_import_job, path, request.format, request.restart)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="File not found")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    # Update database with initial batch
-    update_videos_for_channel(db, channel_id, videos)
+    if not is_job_active(job.id):
+        background_tasks.add_task(run_import_in_background, job.id)
     
-    # If there are more videos, fetch next pages
-    while next_page_token:
-        # Fetch next page of videos
-        videos, next_page_token = youtube_service.get_playlist_videos(
-            uploads_playlist_id, 
-            max_results, 
-            next_page_token
-        )
-        
-        # Update database with next batch
-        update_videos_for_channel(db, channel_id, videos)
-        
-        # Add a small delay to avoid rate limiting
-        await asyncio.sleep(1)
+    return job_status(job)
+
+@router.get("/admin/reading-list/import/{job_id}", dependencies=[Depends(require_admin)])
+async def get_reading_list_import(job_id: str):
+    """
+    Progress of an import job: rows done, rows per second, counts and the first row errors
+    """
+    job = await run_in_session(get_import_job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    
+    return job_status(job)
+
+# ===== WEBSUB PUSH ROUTES =====
+
+@router.get("/websub/callback/{subscription_id}")
+async def websub_verify(
+    subscription_id: str,
+    mode: str = Query(..., alias="hub.mode"),
+    topic: str = Query(..., alias="hub.topic"),
+    challenge: Optional[str] = Query(None, alias="hub.challenge"),
+    lease_seconds: Optional[int] = Query(None, alias="hub.lease_seconds")
+):
+    """
+    Hub verification of a subscription request
+    Echoes the challenge back when the request matches a subscription we asked for
+    """
+    if not await run_in_session(verify_intent, subscription_id, mode, topic, lease_seconds):
+        raise HTTPException(status_code=404, detail="Unknown subscription")
+    
+    return PlainTextResponse(challenge or "")
+
+@router.post("/websub/callback/{subscription_id}", status_code=202)
+async def websub_push(
+    subscription_id: str,
+    request: Request,
+    background_tasks: BackgroundTasks
+):
+    """
+    Content distribution from a hub
+    Payloads with a missing or invalid signature are acknowledged but ignored, as the spec requires
+    """
+    sub = await run_in_session(get_subscription, subscription_id)
+    if not sub:
+        raise HTTPException(status_code=404, detail="Unknown subscription")
+    # Hubs may keep delivering after an unsubscribe or a denied subscription
+    if sub.status != "active":
+        raise HTTPException(status_code=404, detail="Subscription is not active")
+    
+    body = await request.body()
+    signature = request.headers.get("X-Hub-Signature-256") or request.headers.get("X-Hub-Signature")
+    if not verify_signature(sub.secret, body, signature):
+        print(f"Ignoring WebSub push with invalid signature for {subscription_id}")
+        return Response(status_code=202)
+    
+    background_tasks.add_task(handle_push, subscription_id, body)
+    return Response(status_code=202)
+
+# Background task to fetch and update videos (existing function)
+async def fetch_and_update_videos(channel_id: str, uploads_playlist_id: str, full: bool = True):
+    """
+    Fetch and update videos for a channel
+    - full: walk the whole uploads playlist (backfill); otherwise stop at known videos
+    """
+    try:
+        await sync_channel_videos(youtube_service, channel_id, uploads_playlist_id, full=full)
+    except Exception as e:
+        print(f"Error fetching videos for channel {channel_id}: {e}")
     
     print(f"Finished updating videos for channel {channel_id}")
-    
\ No newline at end of file
@@ -1,115 +1,266 @@
 import asyncio
+import functools
 import os
-import json
-from database.db import get_db
-from services.youtube_service import YouTubeService
-from services.repository import get_channels, update_videos_for_channel
-from services.rss_service import fetch_and_update_rss_feeds
+from database.db import run_in_session
+from models.models import Channel, RssFeed
+from services.scheduler import Job, Scheduler
+from services.cadence import adaptive_interval
+from services.video_enrichment import enrich_new_videos, refresh_video_statistics
+from services.websub_service import get_active_subscriptions, renew_subscriptions
+from services.youtube_service import get_youtube_service
+from services.youtube_sync import sync_channel_videos
+from services.youtube_quota import QuotaExceededError
+from services.rss_service import fetch_and_update_rss_feeds, update_rss_feed
 from services.social_service import fetch_social_posts
+from services.config_loader import reload_changed_config
 
-youtube_service = YouTubeService()
+# Maximum number of channels synced at the same time
+YOUTUBE_SYNC_CONCURRENCY = int(os.getenv("YOUTUBE_SYNC_CONCURRENCY", "4"))
+# Channels below this priority are skipped while the YouTube quota is low
+YOUTUBE_LOW_QUOTA_MIN_PRIORITY = int(os.getenv("YOUTUBE_LOW_QUOTA_MIN_PRIORITY", "1"))
+
+# Seconds between polls for each source type
+YOUTUBE_INTERVAL = int(os.getenv("YOUTUBE_INTERVAL", "3600"))
+RSS_INTERVAL = int(os.getenv("RSS_INTERVAL", "1800"))
+SOCIAL_INTERVAL = int(os.getenv("SOCIAL_INTERVAL", "900"))
+# Enrichment of new videos, and the slower statistics refresh
+YOUTUBE_ENRICH_INTERVAL = int(os.getenv("YOUTUBE_ENRICH_INTERVAL", "900"))
+YOUTUBE_STATS_INTERVAL = int(os.getenv("YOUTUBE_STATS_INTERVAL", "21600"))
+# Random spread applied to every interval, as a fraction of it
+SCHEDULER_JITTER = float(os.getenv("SCHEDULER_JITTER", "0.1"))
+# Maximum number of jobs running at the same time
+SCHEDULER_MAX_CONCURRENT = int(os.getenv("SCHEDULER_MAX_CONCURRENT", "4"))
+# Polling interval for sources that receive WebSub pushes, and how often leases are checked
+WEBSUB_FALLBACK_INTERVAL = int(os.getenv("WEBSUB_FALLBACK_INTERVAL", "21600"))
+WEBSUB_RENEW_INTERVAL = int(os.getenv("WEBSUB_RENEW_INTERVAL", "3600"))
+# Seconds between checks for added or removed sources
+SCHEDULER_REFRESH_INTERVAL = int(os.getenv("SCHEDULER_REFRESH_INTERVAL", "60"))
+# Seconds between checks of the config files for edits
+CONFIG_WATCH_INTERVAL = int(os.getenv("CONFIG_WATCH_INTERVAL", "10"))
+
+scheduler = Scheduler(max_concurrent=SCHEDULER_MAX_CONCURRENT)
+youtube_service = get_youtube_service()
 
 async def start_periodic_update():
-    """Start the periodic update tasks for all content types"""
-    while True:
-        try:
-            # Update YouTube videos
-            await update_all_channels()
-            
-            # Update RSS feeds
-            await update_all_rss_feeds()
-            
-            # Update social media posts
-            await update_all_social_accounts()
-            
-            # Wait before next update cycle
-            # YouTube: every 60 minutes
-            # RSS: every 30 minutes
-            # Social: every 15 minutes
-            await asyncio.sleep(900)  # 15 minutes
-        except Exception as e:
-            print(f"Error in periodic update: {e}")
-            await asyncio.sleep(300)  # Try again in 5 minutes if there's an error
+    """Start the scheduler that runs the periodic update jobs for all content types"""
+    # Units already used today, so the first syncs see a low quota after a restart
+    await youtube_service.quota.load()
+    # Stored next-run times, so a restart resumes the schedule
+    await scheduler.load_state()
+    await refresh_jobs()
+    
+    # Pick up channels and feeds added while the server is running
+    scheduler.add_job(Job("scheduler:refresh", refresh_jobs, SCHEDULER_REFRESH_INTERVAL, jitter=0, priority=100))
+    # Apply edits to the config files without a restart
+    scheduler.add_job(Job("config:watch", watch_config, CONFIG_WATCH_INTERVAL, jitter=0, priority=100))
+    
+    await scheduler.run()
 
-async def update_all_channels():
-    """Update all YouTube channels in the database"""
-    print("Starting YouTube channels update...")
-    db = next(get_db())
-    channels = get_channels(db)
+async def watch_config():
+    """
+    Apply edited config files, start ingesting the sources they added and
+    stop polling the ones they removed
+    New channels are backfilled by the config loader; new feeds and accounts
+    are fetched right away instead of waiting for their first scheduled run
+    """
+    activated = await reload_changed_config(youtube_service)
+    if not activated:
+        return
+    
+    await refresh_jobs()
+    for feed_id in activated.get("rss_feeds.json", []):
+        scheduler.trigger(f"rss:{feed_id}")
+    if activated.get("social_accounts.json"):
+        scheduler.trigger("social")
+
+def _enabled_sources(db, model):
+    return db.query(model).filter(model.enabled.is_(True)).all()
+
+def _get_source(db, model, source_id: str):
+    return db.get(model, source_id)
+
+def _load_sources(db):
+    """Enabled channels and feeds, and the job IDs of sources that receive WebSub pushes"""
+    return _enabled_sources(db, Channel), _enabled_sources(db, RssFeed), set(get_active_subscriptions(db))
+
+async def refresh_jobs():
+    """
+    Register a job per channel and per RSS feed, plus one for social accounts
+    Jobs for sources that no longer exist are removed
+    """
+    channels, feeds, pushed = await run_in_session(_load_sources)
+    
+    job_ids = {"scheduler:refresh", "config:watch"}
     
+    # Sources with a configured interval are polled at that fixed rate,
+    # sources receiving WebSub pushes fall back to slow polling,
+    # the rest adapt to how often they publish
     for channel in channels:
-        try:
-            # Get videos from YouTube API
-            videos, next_page_token = youtube_service.get_playlist_videos(channel.uploads_playlist_id)
-            
-            # Update database with videos
-            update_videos_for_channel(db, channel.id, videos)
-            print(f"Updated {len(videos)} videos for channel {channel.title}")
+        job_id = f"youtube:{channel.id}"
+        if job_id in pushed:
+            interval, adapt = WEBSUB_FALLBACK_INTERVAL, None
+        elif channel.poll_interval:
+            interval, adapt = channel.poll_interval, None
+        else:
+            interval = YOUTUBE_INTERVAL
+            adapt = functools.partial(adaptive_interval, "youtube", channel.id, YOUTUBE_INTERVAL)
+        
+        scheduler.add_job(Job(
+            job_id,
+            functools.partial(update_channel, channel.id),
+            interval,
+            jitter=SCHEDULER_JITTER,
+            priority=channel.priority or 0,
+            adapt=adapt
+        ))
+        job_ids.add(job_id)
+    
+    for feed in feeds:
+        job_id = f"rss:{feed.id}"
+        if job_id in pushed:
+            interval, adapt = WEBSUB_FALLBACK_INTERVAL, None
+        elif feed.poll_interval:
+            interval, adapt = feed.poll_interval, None
+        else:
+            interval = RSS_INTERVAL
+            adapt = functools.partial(adaptive_interval, "rss", feed.id, RSS_INTERVAL)
+        
+        scheduler.add_job(Job(
+            job_id,
+            functools.partial(update_rss_feed_by_id, feed.id),
+            interval,
+            jitter=SCHEDULER_JITTER,
+            priority=feed.priority or 0,
+            adapt=adapt
+        ))
+        job_ids.add(job_id)
+    
+    scheduler.add_job(Job("social", update_all_social_accounts, SOCIAL_INTERVAL, jitter=SCHEDULER_JITTER))
+    job_ids.add("social")
+    
+    scheduler.add_job(Job(
+        "youtube:enrich",
+        functools.partial(enrich_new_videos, youtube_service),
+        YOUTUBE_ENRICH_INTERVAL,
+        jitter=SCHEDULER_JITTER
+    ))
+    scheduler.add_job(Job(
+        "youtube:stats",
+        functools.partial(refresh_video_statistics, youtube_service),
+        YOUTUBE_STATS_INTERVAL,
+        jitter=SCHEDULER_JITTER,
+        priority=-1
+    ))
+    job_ids.update(("youtube:enrich", "youtube:stats"))
+    
+    scheduler.add_job(Job("websub:renew", renew_subscriptions, WEBSUB_RENEW_INTERVAL, jitter=SCHEDULER_JITTER))
+    job_ids.add("websub:renew")
+    
+    for job_id in list(scheduler.jobs):
+        if job_id not in job_ids:
+            scheduler.remove_job(job_id)
+
+async def update_channel(channel_id: str, full: bool = False):
+    """
+    Sync a single YouTube channel; its videos are stored by the shared DB writer
+    - full: re-walk the whole uploads playlist instead of stopping at known videos
+    Returns the number of new videos
+    """
+    channel = await run_in_session(_get_source, Channel, channel_id)
+    if not channel:
+        return 0
+    
+    if youtube_service.quota.is_low() and (channel.priority or 0) < YOUTUBE_LOW_QUOTA_MIN_PRIORITY:
+        print(f"YouTube quota low, skipping low-priority channel {channel.title}")
+        return 0
+    
+    uploads_playlist_id = channel.uploads_playlist_id
+    
+    return await sync_channel_videos(youtube_service, channel_id, uploads_playlist_id, full=full)
+
+async def update_all_channels(full: bool = False):
+    """
+    Update all YouTube channels in the database
+    Channels are synced concurrently, at most YOUTUBE_SYNC_CONCURRENCY at a time
+    - full: re-walk every uploads playlist instead of stopping at known videos
+    """
+    print("Starting YouTube channels update...")
+    channels = sorted(
+        await run_in_session(_enabled_sources, Channel),
+        key=lambda channel: channel.priority or 0,
+        reverse=True
+    )
+    
+    limit = asyncio.Semaphore(YOUTUBE_SYNC_CONCURRENCY)
+    quota_exhausted = False
+    
+    async def sync(channel):
+        nonlocal quota_exhausted
+        
+        async with limit:
+            if quota_exhausted:
+                return
             
-            # Fetch additional pages if available
-            while next_page_token:
-                additional_videos, next_page_token = youtube_service.get_playlist_videos(
-                    channel.uploads_playlist_id, 10, next_page_token
-                )
-                update_videos_for_channel(db, channel.id, additional_videos)
-                print(f"Updated {len(additional_videos)} additional videos for channel {channel.title}")
-                
-                # Add a small delay to avoid rate limiting
-                await asyncio.sleep(1)
-                
-        except Exception as e:
-            print(f"Error updating channel {channel.id}: {e}")
-            continue
+            try:
+                await update_channel(channel.id, full=full)
+            except QuotaExceededError as e:
+                print(f"Stopping YouTube channels update: {e}")
+                quota_exhausted = True
+            except Exception as e:
+                print(f"Error updating channel {channel.id}: {e}")
+    
+    # Higher priority channels are queued first
+    await asyncio.gather(*(sync(channel) for channel in channels))
     
     print("YouTube channels update completed")
 
+async def update_rss_feed_by_id(feed_id: str):
+    """
+    Fetch a single RSS feed stored in the database
+    Returns the number of new articles
+    """
+    feed = await run_in_session(_get_source, RssFeed, feed_id)
+    if not feed:
+        return 0
+    
+    feed_config = {
+        "title": feed.title,
+        "url": feed.url,
+        "section": feed.section,
+        "description": feed.description
+    }
+    
+    return await update_rss_feed(feed_config)
+
 async def update_all_rss_feeds():
-    """Update all RSS feeds"""
+    """Update all RSS feeds in the database"""
     print("Starting RSS feeds update...")
-    db = next(get_db())
+    feeds = await run_in_session(_enabled_sources, RssFeed)
+    feeds_config = [
+        {"title": feed.title, "url": feed.url, "section": feed.section, "description": feed.description}
+        for feed in feeds
+    ]
     
     try:
-        # Check if rss_feeds.json exists
-        config_path = os.path.join(os.path.dirname(__file__), "..", "..", "rss_feeds.json")
-        if os.path.exists(config_path):
-            with open(config_path, "r") as f:
-                feeds = json.load(f)
-            
-            # Update all feeds
-            await fetch_and_update_rss_feeds(db, feeds)
-            print(f"Updated {len(feeds)} RSS feeds")
-        else:
-            print("No RSS feeds configuration found")
+        new_articles = await fetch_and_update_rss_feeds(feeds_config)
+        print(f"Updated {len(feeds_config)} RSS feeds ({new_articles} new articles)")
     except Exception as e:
         print(f"Error updating RSS feeds: {e}")
     
     print("RSS feeds update completed")
 
 async def update_all_social_accounts():
-    """Update all social media accounts"""
+    """
+    Update all social media accounts
+    Returns the number of new posts
+    """
     print("Starting social media accounts update...")
-    db = next(get_db())
-    
+    new_posts = 0
     try:
-        # Import here to avoid circular imports
-        from models.models import SocialAccount
-        
-        # Get all accounts
-        accounts = db.query(SocialAccount).all()
-        
-        for account in accounts:
-            try:
-                # This would need platform-specific API implementations
-                # results = await fetch_social_posts(db, None, account.id)
-                # print(f"Updated posts for {account.platform} account: {account.username}")
-                pass
-            except Exception as e:
-                print(f"Error updating social account {account.id}: {e}")
-                continue
-        
-        print(f"Updated {len(accounts)} social media accounts")
+        new_posts = await fetch_social_posts()
+        print(f"Stored {new_posts} new social media posts")
     except Exception as e:
         print(f"Error updating social media accounts: {e}")
     
     print("Social media accounts update completed")
-        
\ No newline at end of file
+    return new_posts
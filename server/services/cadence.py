@@ -0,0 +1,85 @@
+import os
+from datetime import datetime
+from statistics import median
+from typing import List, Optional
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+from database.db import run_in_session
+from models.models import Video, RssArticle
+
+# Load environment variables
+load_dotenv()
+
+# Bounds for adaptive polling intervals, in seconds
+POLL_MIN_INTERVAL = int(os.getenv("POLL_MIN_INTERVAL", "900"))
+POLL_MAX_INTERVAL = int(os.getenv("POLL_MAX_INTERVAL", "86400"))
+# Number of recent items used to estimate how often a source publishes
+CADENCE_SAMPLE_SIZE = int(os.getenv("CADENCE_SAMPLE_SIZE", "20"))
+# Fraction of the typical gap between items to wait between polls
+CADENCE_POLL_FACTOR = float(os.getenv("CADENCE_POLL_FACTOR", "0.5"))
+
+def get_publish_times(db: Session, source_type: str, source_id: str) -> List[datetime]:
+    """
+    Return the most recent publish times for a channel or feed, newest first
+    """
+    if source_type == "youtube":
+        query = db.query(Video.published_at).filter(Video.channel_id == source_id)
+        query = query.order_by(Video.published_at.desc())
+    elif source_type == "rss":
+        query = db.query(RssArticle.published_at).filter(RssArticle.feed_id == source_id)
+        query = query.order_by(RssArticle.published_at.desc())
+    else:
+        raise ValueError(f"Unknown source type: {source_type}")
+
+    return [timestamp for (timestamp,) in query.limit(CADENCE_SAMPLE_SIZE).all() if timestamp]
+
+def compute_poll_interval(
+    publish_times: List[datetime],
+    default_interval: int,
+    min_interval: int = POLL_MIN_INTERVAL,
+    max_interval: int = POLL_MAX_INTERVAL,
+    now: Optional[datetime] = None
+) -> int:
+    """
+    Estimate a polling interval from a source's publish history
+    The interval is a fraction of the median gap between items. A source that
+    has been quiet for longer than its usual gap is polled less often, and
+    sources with too little history keep the default interval.
+    """
+    if len(publish_times) < 2:
+        return max(min_interval, min(default_interval, max_interval))
+
+    ordered = sorted(publish_times, reverse=True)
+    gaps = [
+        (newer - older).total_seconds()
+        for newer, older in zip(ordered, ordered[1:])
+        if newer > older
+    ]
+    if not gaps:
+        return max(min_interval, min(default_interval, max_interval))
+
+    typical_gap = median(gaps)
+
+    # Back off while a source stays silent past its usual cadence
+    silence = ((now or datetime.utcnow()) - ordered[0]).total_seconds()
+    if silence > typical_gap:
+        typical_gap = (typical_gap + silence) / 2
+
+    interval = int(typical_gap * CADENCE_POLL_FACTOR)
+    return max(min_interval, min(interval, max_interval))
+
+async def adaptive_interval(
+    source_type: str,
+    source_id: str,
+    default_interval: int,
+    new_items: Optional[int]
+) -> int:
+    """
+    Next polling interval for a source after a poll that found new_items
+    New items reset the source to the fastest interval
+    """
+    if new_items:
+        return POLL_MIN_INTERVAL
+
+    publish_times = await run_in_session(get_publish_times, source_type, source_id)
+    return compute_poll_interval(publish_times, default_interval)
@@ -0,0 +1,526 @@
+import asyncio
+import functools
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from database.db import run_in_session
+from models.models import Channel, ConfigFingerprint, ReadingMaterial, RssFeed, SocialAccount
+from services.pipeline import db_writer
+from services.repository import bulk_insert_ignore
+from services.rss_service import ensure_rss_feed
+from services.social_service import ensure_social_account, social_account_id
+from services.youtube_quota import QuotaExceededError
+from services.reading_list_service import (
+    bulk_add_reading_materials, update_reading_materials, reading_material_id, import_marxist_classics
+)
+
+# channels.json, rss_feeds.json, social_accounts.json and reading_list.json live in the repository root
+CONFIG_DIR = os.path.join(os.path.dirname(__file__), "..", "..")
+
+# channels.list accepts at most 50 IDs per call
+CHANNELS_LIST_BATCH_SIZE = 50
+
+# Progress of the startup configuration import, reported by the readiness endpoint
+startup_status: Dict[str, Any] = {
+    "ready": False,
+    "loaders": {},
+    "started_at": None,
+    "finished_at": None
+}
+
+def read_config_file(name: str) -> Optional[Tuple[List[Dict[str, Any]], str]]:
+    """Return the entries of a JSON config file and a hash of its content, or None if it does not exist"""
+    config_path = os.path.join(CONFIG_DIR, name)
+    if not os.path.exists(config_path):
+        return None
+
+    with open(config_path, "rb") as f:
+        content = f.read()
+
+    return json.loads(content), hashlib.sha256(content).hexdigest()
+
+def entry_hash(entry: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(entry, sort_keys=True).encode()).hexdigest()
+
+def file_unchanged(db: Session, name: str, digest: str) -> bool:
+    """True when the file was fully applied with exactly this content before"""
+    row = db.query(ConfigFingerprint).filter(ConfigFingerprint.id == name).first()
+    return bool(row and row.content_hash == digest)
+
+def diff_config(
+    db: Session,
+    name: str,
+    entries: List[Dict[str, Any]],
+    key_func: Callable[[Dict[str, Any]], Optional[str]]
+) -> Dict[str, Any]:
+    """
+    Compare config entries with the fingerprints stored for the file
+    Returns {"added": {key: entry}, "changed": {key: entry}, "removed": [key], "hashes": {key: hash}}
+    Entries without a key are reported and ignored; a repeated key keeps the last entry
+    """
+    current = {}
+    for entry in entries:
+        key = key_func(entry)
+        if not key:
+            print(f"Skipping {name} entry without an identifier: {entry}")
+            continue
+        current[key] = entry
+
+    stored = {
+        row.entry_key: row.content_hash for row in
+        db.query(ConfigFingerprint).filter(
+            ConfigFingerprint.file == name,
+            ConfigFingerprint.entry_key.isnot(None)
+        ).all()
+    }
+
+    hashes = {key: entry_hash(entry) for key, entry in current.items()}
+    return {
+        "added": {key: entry for key, entry in current.items() if key not in stored},
+        "changed": {key: entry for key, entry in current.items() if key in stored and stored[key] != hashes[key]},
+        "removed": [key for key in stored if key not in current],
+        "hashes": hashes
+    }
+
+def save_fingerprints(
+    db: Session,
+    name: str,
+    applied: Dict[str, str],
+    removed: List[str],
+    digest: Optional[str]
+):
+    """
+    Record the entries that were applied and forget the removed ones
+    - digest: file hash, stored only when every entry was applied so a failed
+      entry is retried on the next load
+    Does not commit; the loader's transaction applies the entries and their fingerprints together
+    """
+    now = datetime.utcnow()
+    rows = {
+        row.id: row for row in
+        db.query(ConfigFingerprint).filter(ConfigFingerprint.file == name).all()
+    }
+
+    for key, content_hash in applied.items():
+        row_id = f"{name}:{key}"
+        row = rows.get(row_id)
+        if not row:
+            row = ConfigFingerprint(id=row_id, file=name, entry_key=key)
+            db.add(row)
+        row.content_hash = content_hash
+        row.updated_at = now
+
+    for key in removed:
+        row = rows.get(f"{name}:{key}")
+        if row:
+            db.delete(row)
+
+    file_row = rows.get(name)
+    if digest:
+        if not file_row:
+            file_row = ConfigFingerprint(id=name, file=name)
+            db.add(file_row)
+        file_row.content_hash = digest
+        file_row.updated_at = now
+    elif file_row:
+        db.delete(file_row)
+
+def _summarize(name: str, diff: Dict[str, Any]):
+    print(f"{name}: {len(diff['added'])} added, {len(diff['changed'])} changed, {len(diff['removed'])} removed")
+
+def _update_existing_channels(db: Session, channels: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Diff channels.json and apply the settings of channels that are already stored, without committing
+    Returns the diff, the hashes applied so far, the IDs re-enabled and the IDs still to be fetched
+    """
+    diff = diff_config(db, "channels.json", channels, lambda entry: entry.get("channel_id", entry.get("id")))
+    _summarize("channels.json", diff)
+
+    pending = {**diff["added"], **diff["changed"]}
+    applied = {}
+    activated = []
+
+    # Rows that already exist, including disabled ones, only need their settings updated
+    existing = {
+        channel.id: channel for channel in
+        db.query(Channel).filter(Channel.id.in_(list(pending))).all()
+    }
+    for channel_id, channel in existing.items():
+        channel_data = pending[channel_id]
+        if not channel.enabled:
+            activated.append(channel_id)
+        channel.section = channel_data["section"]
+        channel.priority = channel_data.get("priority", 0)
+        channel.poll_interval = channel_data.get("interval")
+        channel.enabled = True
+        applied[channel_id] = diff["hashes"][channel_id]
+
+    return {
+        "diff": diff,
+        "applied": applied,
+        "activated": activated,
+        "new_ids": [channel_id for channel_id in pending if channel_id not in existing]
+    }
+
+def _store_new_channels(
+    db: Session,
+    rows: List[Dict[str, Any]],
+    removed: List[str],
+    applied: Dict[str, str],
+    digest: Optional[str]
+):
+    """
+    Insert the fetched channels in one batch, disable removed ones and record the
+    fingerprints, without committing
+    """
+    bulk_insert_ignore(db, Channel, rows)
+
+    if removed:
+        db.query(Channel).filter(Channel.id.in_(removed)).update(
+            {Channel.enabled: False}, synchronize_session=False
+        )
+
+    save_fingerprints(db, "channels.json", applied, removed, digest)
+
+async def load_channels(youtube_service) -> List[str]:
+    """
+    Apply the changes in channels.json since it was last loaded
+    New channels are fetched 50 per channels.list call, inserted in one batch and
+    backfilled in the background, changed ones get their settings updated, removed
+    ones are disabled. Database work goes through the DB writer, so no session is
+    held while the YouTube API answers
+    Returns the IDs of channels that were added or re-enabled
+    """
+    # Import here to avoid circular imports
+    from services.background import scheduler
+
+    config = read_config_file("channels.json")
+    if config is None:
+        print("No channels configuration found")
+        return []
+
+    channels, digest = config
+    if await run_in_session(file_unchanged, "channels.json", digest):
+        print("channels.json unchanged")
+        return []
+
+    state = await db_writer.submit(_update_existing_channels, channels)
+    diff = state["diff"]
+    pending = {**diff["added"], **diff["changed"]}
+    applied = state["applied"]
+    activated = state["activated"]
+
+    new_ids = state["new_ids"]
+    new_channels = []
+    for start in range(0, len(new_ids), CHANNELS_LIST_BATCH_SIZE):
+        batch = new_ids[start:start + CHANNELS_LIST_BATCH_SIZE]
+        try:
+            channels_info = await youtube_service.get_channels_info(batch)
+        except QuotaExceededError as e:
+            # The remaining channels are added by the first reload after the quota resets
+            print(f"Stopping channel import: {e}")
+            break
+        if channels_info is None:
+            continue
+
+        for channel_id in batch:
+            channel_info = channels_info.get(channel_id)
+            if not channel_info:
+                print(f"Could not find channel {channel_id}")
+                continue
+
+            # Add section, priority and polling interval from config
+            channel_data = pending[channel_id]
+            new_channels.append({
+                "id": channel_info["id"],
+                "title": channel_info["title"],
+                "section": channel_data["section"],
+                "uploads_playlist_id": channel_info["uploads_playlist_id"],
+                "priority": channel_data.get("priority", 0),
+                "poll_interval": channel_data.get("interval"),
+                "enabled": True
+            })
+            applied[channel_id] = diff["hashes"][channel_id]
+
+    complete = len(applied) == len(pending)
+    await db_writer.submit(_store_new_channels, new_channels, diff["removed"], applied, digest if complete else None)
+
+    for channel in new_channels:
+        print(f"Added channel: {channel['title']}")
+        activated.append(channel["id"])
+
+        # Newly added channels get a full backfill in the background, never
+        # at the same time as the channel's scheduled sync
+        scheduler.run_exclusive(
+            f"youtube:{channel['id']}",
+            functools.partial(backfill_channel, youtube_service, channel["id"], channel["uploads_playlist_id"])
+        )
+
+    return activated
+
+async def backfill_channel(youtube_service, channel_id: str, uploads_playlist_id: str):
+    # Import here to avoid circular imports
+    from services.youtube_sync import sync_channel_videos
+
+    try:
+        await sync_channel_videos(youtube_service, channel_id, uploads_playlist_id, full=True)
+    except Exception as e:
+        print(f"Error fetching videos for channel {channel_id}: {e}")
+
+def _apply_rss_feeds(db: Session, feeds: List[Dict[str, Any]], digest: str) -> List[str]:
+    """
+    Apply the changed rss_feeds.json entries, without committing
+    Returns the IDs of feeds that were added or re-enabled
+    """
+    diff = diff_config(db, "rss_feeds.json", feeds, lambda entry: entry.get("url"))
+    _summarize("rss_feeds.json", diff)
+
+    pending = {**diff["added"], **diff["changed"]}
+    previous = dict(
+        db.query(RssFeed.url, RssFeed.enabled)
+        .filter(RssFeed.url.in_(list(pending))).all()
+    )
+
+    activated = []
+    for url, feed_config in pending.items():
+        db_feed = ensure_rss_feed(db, feed_config)
+        if previous.get(url) is not True:
+            activated.append(db_feed.id)
+
+    if diff["removed"]:
+        db.query(RssFeed).filter(RssFeed.url.in_(diff["removed"])).update(
+            {RssFeed.enabled: False}, synchronize_session=False
+        )
+
+    save_fingerprints(
+        db, "rss_feeds.json",
+        {url: diff["hashes"][url] for url in pending}, diff["removed"], digest
+    )
+    return activated
+
+async def load_rss_feeds() -> List[str]:
+    """
+    Apply the changes in rss_feeds.json since it was last loaded
+    The background scheduler fetches the feeds; removed feeds are disabled
+    Returns the IDs of feeds that were added or re-enabled
+    """
+    config = read_config_file("rss_feeds.json")
+    if config is None:
+        print("No RSS feeds configuration found")
+        return []
+
+    feeds, digest = config
+    if await run_in_session(file_unchanged, "rss_feeds.json", digest):
+        print("rss_feeds.json unchanged")
+        return []
+
+    return await db_writer.submit(_apply_rss_feeds, feeds, digest)
+
+def _social_account_key(entry: Dict[str, Any]) -> Optional[str]:
+    return social_account_id(entry) if entry.get("platform") and entry.get("username") else None
+
+def _apply_social_accounts(db: Session, accounts: List[Dict[str, Any]], digest: str) -> List[str]:
+    """
+    Apply the changed social_accounts.json entries, without committing
+    An entry that cannot be applied is rolled back to its savepoint and retried on the next load
+    Returns the IDs of accounts that were added or re-enabled
+    """
+    diff = diff_config(db, "social_accounts.json", accounts, _social_account_key)
+    _summarize("social_accounts.json", diff)
+
+    pending = {**diff["added"], **diff["changed"]}
+    previous = dict(
+        db.query(SocialAccount.id, SocialAccount.enabled)
+        .filter(SocialAccount.id.in_(list(pending))).all()
+    )
+
+    applied = {}
+    activated = []
+    for account_id, account_data in pending.items():
+        try:
+            with db.begin_nested():
+                account = ensure_social_account(db, account_data)
+            print(f"Added social account: {account.platform} - {account.username}")
+            applied[account_id] = diff["hashes"][account_id]
+            if previous.get(account_id) is not True:
+                activated.append(account_id)
+        except Exception as e:
+            print(f"Error adding social account: {e}")
+            continue
+
+    if diff["removed"]:
+        db.query(SocialAccount).filter(SocialAccount.id.in_(diff["removed"])).update(
+            {SocialAccount.enabled: False}, synchronize_session=False
+        )
+
+    complete = len(applied) == len(pending)
+    save_fingerprints(db, "social_accounts.json", applied, diff["removed"], digest if complete else None)
+    return activated
+
+async def load_social_accounts() -> List[str]:
+    """
+    Apply the changes in social_accounts.json since it was last loaded
+    Posts are fetched by the scheduler's social job; removed accounts are disabled
+    Returns the IDs of accounts that were added or re-enabled
+    """
+    config = read_config_file("social_accounts.json")
+    if config is None:
+        print("No social accounts configuration found")
+        return []
+
+    accounts, digest = config
+    if await run_in_session(file_unchanged, "social_accounts.json", digest):
+        print("social_accounts.json unchanged")
+        return []
+
+    return await db_writer.submit(_apply_social_accounts, accounts, digest)
+
+def _import_classics_if_empty(db: Session):
+    """Import the built-in classics into an empty reading list, without committing"""
+    if not db.query(ReadingMaterial.id).first():
+        print("No reading list configuration found, importing classics...")
+        import_marxist_classics(db, commit=False)
+
+def _apply_reading_list(db: Session, materials: List[Dict[str, Any]], digest: str) -> List[str]:
+    """
+    Apply the changed reading_list.json entries, without committing
+    Returns the IDs of materials that were added or re-enabled
+    """
+    diff = diff_config(db, "reading_list.json", materials, reading_material_id)
+    _summarize("reading_list.json", diff)
+
+    pending = {**diff["added"], **diff["changed"]}
+    existing = dict(
+        db.query(ReadingMaterial.id, ReadingMaterial.enabled)
+        .filter(ReadingMaterial.id.in_(list(pending))).all()
+    )
+
+    # New materials are inserted, and entries whose material already exists overwrite it
+    to_insert = [key for key in pending if key not in existing]
+    to_update = [key for key in pending if key in existing]
+
+    result = bulk_add_reading_materials(db, [pending[key] for key in to_insert], commit=False)
+    for error in result["errors"]:
+        print(f"Error adding reading material {error['title']!r}: {error['error']}")
+
+    updated = update_reading_materials(db, [pending[key] for key in to_update], commit=False)
+    for error in updated["errors"]:
+        print(f"Error updating reading material {error['title']!r}: {error['error']}")
+
+    if to_update:
+        db.query(ReadingMaterial).filter(ReadingMaterial.id.in_(to_update)).update(
+            {ReadingMaterial.enabled: True}, synchronize_session=False
+        )
+    if diff["removed"]:
+        db.query(ReadingMaterial).filter(ReadingMaterial.id.in_(diff["removed"])).update(
+            {ReadingMaterial.enabled: False}, synchronize_session=False
+        )
+
+    failed = {to_insert[error["row"]] for error in result["errors"]}
+    failed.update(to_update[error["row"]] for error in updated["errors"])
+    applied = {key: diff["hashes"][key] for key in pending if key not in failed}
+    save_fingerprints(db, "reading_list.json", applied, diff["removed"], digest if not failed else None)
+
+    return [key for key in pending if key not in failed and existing.get(key) is not True]
+
+async def load_reading_list() -> List[str]:
+    """
+    Apply the changes in reading_list.json since it was last loaded
+    Without a reading list the built-in classics are imported into an empty table;
+    materials removed from the file are hidden
+    Returns the IDs of materials that were added or re-enabled
+    """
+    config = read_config_file("reading_list.json")
+    if config is None:
+        await db_writer.submit(_import_classics_if_empty)
+        return []
+
+    materials, digest = config
+    if await run_in_session(file_unchanged, "reading_list.json", digest):
+        print("reading_list.json unchanged")
+        return []
+
+    return await db_writer.submit(_apply_reading_list, materials, digest)
+
+# Loader and readiness name for each config file
+CONFIG_LOADERS = {
+    "channels.json": ("channels", load_channels),
+    "rss_feeds.json": ("rss_feeds", load_rss_feeds),
+    "social_accounts.json": ("social_accounts", load_social_accounts),
+    "reading_list.json": ("reading_list", load_reading_list)
+}
+
+# Modification times of the config files as last loaded successfully
+_loaded_mtimes: Dict[str, Optional[float]] = {}
+
+def _config_mtime(name: str) -> Optional[float]:
+    try:
+        return os.stat(os.path.join(CONFIG_DIR, name)).st_mtime
+    except FileNotFoundError:
+        return None
+
+async def _run_loader(name: str, loader, *args):
+    startup_status["loaders"][name] = "running"
+    try:
+        result = await loader(*args)
+        startup_status["loaders"][name] = "done"
+        return result
+    except Exception as e:
+        startup_status["loaders"][name] = "failed"
+        print(f"Error loading {name} from config: {e}")
+        return None
+
+async def _load_file(file_name: str, youtube_service) -> Optional[List[str]]:
+    """
+    Run the loader for one config file, remembering its modification time on success
+    Returns the IDs of sources that were added or re-enabled, or None if loading failed
+    """
+    name, loader = CONFIG_LOADERS[file_name]
+    # Read the time first, so a write during loading is picked up by the next check
+    mtime = _config_mtime(file_name)
+    args = (youtube_service,) if file_name == "channels.json" else ()
+
+    activated = await _run_loader(name, loader, *args)
+    if activated is not None:
+        _loaded_mtimes[file_name] = mtime
+    return activated
+
+async def load_all_config(youtube_service):
+    """
+    Load every configuration file concurrently, applying only what changed since the last load
+    The server keeps serving requests meanwhile; startup_status reports progress
+    """
+    startup_status["started_at"] = datetime.utcnow().isoformat()
+
+    await asyncio.gather(*(_load_file(file_name, youtube_service) for file_name in CONFIG_LOADERS))
+
+    startup_status["finished_at"] = datetime.utcnow().isoformat()
+    startup_status["ready"] = True
+    print("Configuration loaded")
+
+async def reload_changed_config(youtube_service) -> Dict[str, List[str]]:
+    """
+    Apply config files that were modified since they were last loaded
+    Files are compared by modification time, so unchanged files cost one stat call
+    Returns the IDs of added or re-enabled sources, keyed by the name of each reloaded file
+    """
+    # The startup load owns the files until it has finished
+    if not startup_status["ready"]:
+        return {}
+
+    changed = [
+        file_name for file_name in CONFIG_LOADERS
+        if _config_mtime(file_name) != _loaded_mtimes.get(file_name)
+    ]
+
+    activated = {}
+    for file_name in changed:
+        print(f"{file_name} changed, reloading")
+        result = await _load_file(file_name, youtube_service)
+        if result is not None:
+            activated[file_name] = result
+
+    return activated
@@ -0,0 +1,88 @@
+import asyncio
+import httpx
+import os
+from typing import List, Dict, Any, Optional
+from urllib.parse import urlparse
+from dotenv import load_dotenv
+from services.http_client import get_http_client
+
+# Load environment variables
+load_dotenv()
+
+# Maximum number of feeds downloaded at the same time
+RSS_FETCH_CONCURRENCY = int(os.getenv("RSS_FETCH_CONCURRENCY", "10"))
+# Maximum number of simultaneous requests to a single host
+RSS_FETCH_PER_HOST = int(os.getenv("RSS_FETCH_PER_HOST", "2"))
+# Total time allowed for a single feed download, in seconds
+RSS_FETCH_TIMEOUT = float(os.getenv("RSS_FETCH_TIMEOUT", "15"))
+
+_global_limit: Optional[asyncio.Semaphore] = None
+_host_limits: Dict[str, asyncio.Semaphore] = {}
+_limits_loop: Optional[asyncio.AbstractEventLoop] = None
+
+def _get_limits(url: str):
+    """
+    Return the global and per-host semaphores for a URL
+    Semaphores are bound to an event loop, so they are recreated if the loop changes
+    """
+    global _global_limit, _limits_loop
+
+    loop = asyncio.get_running_loop()
+    if _global_limit is None or _limits_loop is not loop:
+        _global_limit = asyncio.Semaphore(RSS_FETCH_CONCURRENCY)
+        _host_limits.clear()
+        _limits_loop = loop
+
+    host = urlparse(url).netloc.lower()
+    if host not in _host_limits:
+        _host_limits[host] = asyncio.Semaphore(RSS_FETCH_PER_HOST)
+
+    return _global_limit, _host_limits[host]
+
+async def fetch_feed(url: str, etag: Optional[str] = None, last_modified: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Download a single feed, respecting the global and per-host limits
+    - etag / last_modified: validators from the previous fetch, sent as a conditional GET
+    Returns a dict with the url, HTTP status, raw content, headers, validators and any error
+    A 304 Not Modified response is not an error; its content is None
+    """
+    result = {
+        "url": url, "status": None, "content": None, "headers": {},
+        "etag": None, "last_modified": None, "error": None
+    }
+    global_limit, host_limit = _get_limits(url)
+
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+
+    try:
+        async with global_limit, host_limit:
+            client = get_http_client()
+            response = await asyncio.wait_for(client.get(url, headers=headers), timeout=RSS_FETCH_TIMEOUT)
+
+        result["status"] = response.status_code
+        result["headers"] = dict(response.headers)
+
+        result["etag"] = response.headers.get("ETag")
+        result["last_modified"] = response.headers.get("Last-Modified")
+
+        if response.status_code == 200:
+            result["content"] = response.content
+        elif response.status_code != 304:
+            result["error"] = f"HTTP {response.status_code}"
+    except asyncio.TimeoutError:
+        result["error"] = f"Timed out after {RSS_FETCH_TIMEOUT}s"
+    except httpx.HTTPError as e:
+        result["error"] = str(e) or e.__class__.__name__
+
+    return result
+
+async def fetch_feeds(urls: List[str]) -> List[Dict[str, Any]]:
+    """
+    Download several feeds concurrently
+    Results are returned in the same order as the URLs
+    """
+    return await asyncio.gather(*(fetch_feed(url) for url in urls))
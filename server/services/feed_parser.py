@@ -0,0 +1,114 @@
+import asyncio
+import multiprocessing
+import os
+import feedparser
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Optional, Tuple
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Processes used to parse feeds; 0 parses in a thread of the API process instead.
+# Defaults to one per CPU, and to threads on a single CPU, where a worker process
+# cannot run alongside the API process and only adds pickling and start-up time
+CPU_COUNT = os.cpu_count() or 1
+RSS_PARSE_WORKERS = int(os.getenv("RSS_PARSE_WORKERS") or (CPU_COUNT if CPU_COUNT > 1 else 0))
+
+# Fields of the entry tuples returned by parse_feed; published_at is None when the entry has no date
+ENTRY_FIELDS = ("guid", "title", "link", "author", "published_at", "summary", "content", "image_url")
+# Fields of the feed tuple returned by parse_feed
+FEED_FIELDS = ("title", "description", "websub_hub", "websub_topic")
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+def normalize_entry(entry) -> tuple:
+    """
+    Reduce a feedparser entry to the fields stored for an article
+    """
+    # Parse published date
+    published_at = None
+    if "published_parsed" in entry and entry.published_parsed:
+        published_at = datetime(*entry.published_parsed[:6])
+
+    # Get image URL if available
+    image_url = None
+    if "media_content" in entry and entry.media_content:
+        for media in entry.media_content:
+            if "url" in media and media.get("medium", "") == "image":
+                image_url = media["url"]
+                break
+
+    return (
+        entry.get("id", entry.get("link", "")),
+        entry.get("title", "Untitled"),
+        entry.get("link", ""),
+        entry.get("author", "Unknown"),
+        published_at,
+        entry.get("summary", ""),
+        entry.get("content", [{"value": ""}])[0].get("value", "") if "content" in entry else "",
+        image_url
+    )
+
+def parse_feed(content: bytes) -> Optional[Tuple[tuple, list]]:
+    """
+    Parse a feed document into a (feed, entries) pair of plain tuples, see
+    FEED_FIELDS and ENTRY_FIELDS
+    Runs in a worker process, so only the compact result is sent back rather
+    than the full FeedParserDict
+    Returns None if the document is not a feed
+    """
+    parsed_feed = feedparser.parse(content)
+    if not parsed_feed.feed:
+        return None
+
+    hub = topic = None
+    for link in parsed_feed.feed.get("links", []):
+        if link.get("rel") == "hub":
+            hub = link.get("href")
+        elif link.get("rel") == "self":
+            topic = link.get("href")
+
+    feed = (
+        parsed_feed.feed.get("title", "Unknown Feed"),
+        parsed_feed.feed.get("description", ""),
+        hub,
+        topic
+    )
+    return feed, [normalize_entry(entry) for entry in parsed_feed.entries]
+
+def get_parse_pool() -> Optional[ProcessPoolExecutor]:
+    """
+    Return the shared parsing pool, created on first use
+    Workers are started from a fork server that only imports this module, so
+    they neither inherit the API process's threads nor re-import the app
+    """
+    global _pool
+
+    if RSS_PARSE_WORKERS <= 0:
+        return None
+
+    if _pool is None:
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context("forkserver")
+            context.set_forkserver_preload([__name__])
+        else:
+            context = multiprocessing.get_context("spawn")
+        _pool = ProcessPoolExecutor(max_workers=RSS_PARSE_WORKERS, mp_context=context)
+
+    return _pool
+
+async def parse_feed_async(content: bytes) -> Optional[Tuple[tuple, list]]:
+    """
+    Parse a feed in the process pool without blocking the event loop
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_parse_pool(), parse_feed, content)
+
+def shutdown_parse_pool():
+    global _pool
+
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
@@ -0,0 +1,77 @@
+import asyncio
+import httpx
+import os
+from typing import Optional
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Connection pool settings shared by every outbound fetch
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "10"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "20"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_USER_AGENT = os.getenv("HTTP_USER_AGENT", "MarxistSchool/1.0 (+https://marxist.com)")
+
+_client: Optional[httpx.AsyncClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+# Keep references to the tasks closing clients of earlier event loops
+_closing_tasks = set()
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Return the process-wide pooled HTTP client, creating it on first use
+    Pooled connections belong to an event loop, so a new loop gets a new client
+    """
+    global _client, _client_loop
+
+    loop = asyncio.get_running_loop()
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        if _client is not None and not _client.is_closed:
+            _close_stale_client(_client, _client_loop)
+        _client_loop = loop
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE
+            ),
+            headers={"User-Agent": HTTP_USER_AGENT},
+            follow_redirects=True
+        )
+
+    return _client
+
+def _close_stale_client(client: httpx.AsyncClient, loop: asyncio.AbstractEventLoop):
+    """
+    Close the client of an earlier event loop
+    Its connections can only be closed on that loop, so a loop still running
+    in another thread closes it; otherwise it is closed from the current loop
+    """
+    if loop.is_running():
+        asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+        return
+
+    task = asyncio.create_task(_aclose_stale_client(client))
+    _closing_tasks.add(task)
+    task.add_done_callback(_closing_tasks.discard)
+
+async def _aclose_stale_client(client: httpx.AsyncClient):
+    try:
+        await client.aclose()
+    except RuntimeError as e:
+        # The loop has ended; its sockets are released when the client is garbage collected
+        print(f"Could not close the pooled connections of an ended event loop: {e}")
+
+async def close_http_client():
+    """
+    Close the shared HTTP client and release its pooled connections
+    Call it before the event loop that used the client ends
+    """
+    global _client, _client_loop
+
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+        _client_loop = None
@@ -0,0 +1,297 @@
+import asyncio
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from dotenv import load_dotenv
+from database.db import SessionLocal
+
+# Load environment variables
+load_dotenv()
+
+# Items buffered between two stages; a full queue makes the stage before it wait
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "100"))
+# Maximum number of items parsed at the same time per pipeline run
+PIPELINE_PARSE_WORKERS = int(os.getenv("PIPELINE_PARSE_WORKERS", "4"))
+# Maximum number of writes coalesced into one transaction
+PIPELINE_WRITE_BATCH = int(os.getenv("PIPELINE_WRITE_BATCH", "50"))
+# Seconds the writer waits for more writes before committing a partial batch
+PIPELINE_WRITE_DELAY = float(os.getenv("PIPELINE_WRITE_DELAY", "0.05"))
+
+# Throughput is reported over this many recent seconds
+METRICS_WINDOW = 60
+
+class StageMetrics:
+    """
+    Counters for one pipeline stage, shared by every run of the pipeline
+    - queued: items waiting for the stage right now
+    - blocked_seconds: time the previous stage spent waiting for room in the queue
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.processed = 0
+        self.dropped = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.blocked_seconds = 0.0
+        self.queued = 0
+        self.max_queued = 0
+        self._completed = deque()
+
+    def enqueued(self, waited: float):
+        self.queued += 1
+        self.max_queued = max(self.max_queued, self.queued)
+        self.blocked_seconds += waited
+
+    def record(self, seconds: float, count: int = 1):
+        now = time.monotonic()
+        self.processed += count
+        self.busy_seconds += seconds
+        self._completed.append((now, count))
+        self._prune(now)
+
+    def _prune(self, now: float):
+        while self._completed and self._completed[0][0] < now - METRICS_WINDOW:
+            self._completed.popleft()
+
+    def status(self) -> Dict[str, Any]:
+        self._prune(time.monotonic())
+        return {
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "items_per_second": round(sum(count for _, count in self._completed) / METRICS_WINDOW, 3),
+            "avg_seconds": round(self.busy_seconds / self.processed, 4) if self.processed else None,
+            "queue_depth": self.queued,
+            "max_queue_depth": self.max_queued,
+            "blocked_seconds": round(self.blocked_seconds, 3)
+        }
+
+class Stage:
+    """
+    One step of a pipeline
+    - func: called with an item, returns the item for the next stage, or None to drop it
+    - workers: items processed at the same time per run
+    - cpu: run func in a worker thread so parsing does not block the event loop;
+      otherwise func is a coroutine function
+    """
+
+    def __init__(self, name: str, func: Callable, workers: int = 1, cpu: bool = False):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.cpu = cpu
+        self.metrics: Optional[StageMetrics] = None
+
+    async def process(self, item):
+        if self.cpu:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, self.func, item)
+        return await self.func(item)
+
+# Sentinel telling a worker that its input is exhausted
+_DONE = object()
+
+class Pipeline:
+    """
+    A chain of stages connected by bounded queues
+    Every stage runs its own workers, so fetching, parsing and writing overlap.
+    Errors are logged and counted per stage and drop only the failing item.
+    """
+
+    def __init__(self, name: str, stages: List[Stage], queue_size: int = PIPELINE_QUEUE_SIZE):
+        self.name = name
+        self.stages = stages
+        self.queue_size = queue_size
+        for stage in stages:
+            stage.metrics = StageMetrics(f"{name}.{stage.name}")
+        pipelines[name] = self
+
+    async def run(self, items: Iterable) -> List[Any]:
+        """
+        Push the items through every stage
+        Returns the outputs of the last stage, in completion order
+        """
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self.stages]
+        results = []
+
+        async def feed():
+            for item in items:
+                await self._put(queues[0], self.stages[0], item)
+            for _ in range(self.stages[0].workers):
+                await queues[0].put(_DONE)
+
+        async def run_stage(index: int, stage: Stage):
+            is_last = index == len(self.stages) - 1
+            output = None if is_last else queues[index + 1]
+            await asyncio.gather(*(
+                self._work(stage, queues[index], output, results) for _ in range(stage.workers)
+            ))
+            if not is_last:
+                for _ in range(self.stages[index + 1].workers):
+                    await output.put(_DONE)
+
+        await asyncio.gather(feed(), *(run_stage(index, stage) for index, stage in enumerate(self.stages)))
+        return results
+
+    @staticmethod
+    async def _put(queue: asyncio.Queue, stage: Stage, item):
+        started = time.perf_counter()
+        await queue.put(item)
+        stage.metrics.enqueued(time.perf_counter() - started)
+
+    async def _work(self, stage: Stage, queue: asyncio.Queue, output: Optional[asyncio.Queue], results: List[Any]):
+        next_stage = self.stages[self.stages.index(stage) + 1] if output else None
+
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                return
+            stage.metrics.queued -= 1
+
+            started = time.perf_counter()
+            try:
+                result = await stage.process(item)
+            except Exception as e:
+                stage.metrics.errors += 1
+                print(f"Error in pipeline stage {stage.metrics.name}: {e}")
+                continue
+            stage.metrics.record(time.perf_counter() - started)
+
+            if result is None:
+                stage.metrics.dropped += 1
+            elif output:
+                await self._put(output, next_stage, result)
+            else:
+                results.append(result)
+
+# Every pipeline by name, for the metrics endpoint
+pipelines: Dict[str, Pipeline] = {}
+
+class DbWriter:
+    """
+    Single writer that applies database writes from every pipeline
+    Writes are queued and coalesced into one transaction of up to batch_size
+    writes, run on a dedicated thread so SQLite sees one writer and the event
+    loop is blocked neither by database IO nor by the ORM work of flushing a
+    batch. If a batch fails, its writes are retried one per transaction so a
+    single bad write only fails its own caller.
+    Write functions receive a session and plain data, must not commit, and
+    must not touch objects loaded by another session.
+    """
+
+    def __init__(self, batch_size: int = PIPELINE_WRITE_BATCH, delay: float = PIPELINE_WRITE_DELAY,
+                 queue_size: int = PIPELINE_QUEUE_SIZE):
+        self.batch_size = max(1, batch_size)
+        self.delay = delay
+        self.queue_size = queue_size
+        self.metrics = StageMetrics("writer")
+        self.transactions = 0
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-writer")
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def submit(self, func: Callable, *args) -> Any:
+        """
+        Queue func(db, *args) and wait for the transaction that applies it
+        Returns what func returned, or raises what it raised
+        """
+        loop = asyncio.get_running_loop()
+        # Queues and the writer task are bound to an event loop
+        if self._loop is not loop:
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._loop = loop
+            self._task = None
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._run())
+
+        future = loop.create_future()
+        started = time.perf_counter()
+        await self._queue.put(((func, args), future))
+        self.metrics.enqueued(time.perf_counter() - started)
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        queue = self._queue
+
+        while True:
+            batch = [await queue.get()]
+            # Give concurrent producers a moment to add to the batch
+            if queue.qsize() < self.batch_size - 1 and self.delay > 0:
+                await asyncio.sleep(self.delay)
+            while len(batch) < self.batch_size and not queue.empty():
+                batch.append(queue.get_nowait())
+            self.metrics.queued -= len(batch)
+
+            started = time.perf_counter()
+            outcomes = await loop.run_in_executor(self.executor, self._write, [write for write, _ in batch])
+            self.metrics.record(time.perf_counter() - started, len(batch))
+
+            for (_, future), (result, error) in zip(batch, outcomes):
+                if future.cancelled():
+                    continue
+                if error:
+                    self.metrics.errors += 1
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+
+    def _write(self, writes: List[tuple]):
+        """
+        Apply a batch of (func, args) writes in one transaction, falling back to
+        one transaction per write
+        Returns a (result, error) pair per write
+        """
+        db = SessionLocal()
+        try:
+            try:
+                results = [func(db, *args) for func, args in writes]
+                db.commit()
+                self.transactions += 1
+                return [(result, None) for result in results]
+            except Exception:
+                db.rollback()
+                if len(writes) == 1:
+                    raise
+
+            outcomes = []
+            for func, args in writes:
+                try:
+                    result = func(db, *args)
+                    db.commit()
+                    outcomes.append((result, None))
+                except Exception as e:
+                    db.rollback()
+                    outcomes.append((None, e))
+                self.transactions += 1
+            return outcomes
+        except Exception as e:
+            self.transactions += 1
+            return [(None, e)]
+        finally:
+            db.close()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            **self.metrics.status(),
+            "transactions": self.transactions,
+            "writes_per_transaction": round(self.metrics.processed / self.transactions, 2) if self.transactions else None
+        }
+
+# Process-wide writer shared by every pipeline
+db_writer = DbWriter()
+
+def pipeline_metrics() -> Dict[str, Any]:
+    """Throughput and queue depth of every pipeline stage and of the writer, for the API"""
+    return {
+        "stages": {
+            stage.metrics.name: stage.metrics.status()
+            for pipeline in pipelines.values()
+            for stage in pipeline.stages
+        },
+        "writer": db_writer.status()
+    }
@@ -0,0 +1,316 @@
+import argparse
+import asyncio
+import csv
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+from database.db import SessionLocal, run_in_session
+from models.models import ImportJob
+from services.pipeline import db_writer
+from services.reading_list_service import bulk_add_reading_materials, csv_row_to_material, json_row_to_material
+
+# Load environment variables
+load_dotenv()
+
+# Rows written per transaction; memory use is bounded by one chunk
+READING_IMPORT_CHUNK_SIZE = int(os.getenv("READING_IMPORT_CHUNK_SIZE", "1000"))
+# Row errors kept on the job for inspection; the rest are only counted
+IMPORT_MAX_STORED_ERRORS = 100
+
+FORMATS = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}
+
+# Jobs currently being run by this process; the server runs imports on the event
+# loop while run_import_job may be called from other threads, so claims take the lock
+_active_jobs = set()
+_active_jobs_lock = threading.Lock()
+
+def _claim_job(job_id: str) -> bool:
+    """Mark a job as running in this process; False if it already is"""
+    with _active_jobs_lock:
+        if job_id in _active_jobs:
+            return False
+        _active_jobs.add(job_id)
+        return True
+
+def _release_job(job_id: str):
+    with _active_jobs_lock:
+        _active_jobs.discard(job_id)
+
+def detect_format(path: str) -> str:
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in FORMATS:
+        raise ValueError(f"Unsupported import file type: {extension or path}")
+    return FORMATS[extension]
+
+def iter_materials(path: str, file_format: str) -> Iterator[Tuple[Optional[Dict[str, Any]], Optional[str]]]:
+    """
+    Stream (material, error) pairs from a CSV or NDJSON file, one per data row
+    Unreadable rows yield an error instead of a material so row numbers stay stable
+    """
+    with open(path, "r", encoding="utf-8", newline="") as file:
+        if file_format == "csv":
+            for row in csv.DictReader(file):
+                yield csv_row_to_material(row), None
+        else:
+            for line in file:
+                if not line.strip():
+                    continue
+                try:
+                    material = json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield None, f"invalid JSON: {e}"
+                    continue
+
+                if isinstance(material, dict):
+                    yield json_row_to_material(material), None
+                else:
+                    yield None, "expected a JSON object"
+
+def create_import_job(db: Session, path: str, file_format: Optional[str] = None, restart: bool = False) -> ImportJob:
+    """
+    Return the unfinished import job for a file, or a new one
+    - restart: ignore any checkpoint and import the file from the first row
+    """
+    path = os.path.abspath(path)
+    file_format = file_format or detect_format(path)
+    if not os.path.isfile(path):
+        raise FileNotFoundError(path)
+
+    job = None
+    if not restart:
+        job = db.query(ImportJob).filter(
+            ImportJob.path == path,
+            ImportJob.status != "completed"
+        ).order_by(ImportJob.started_at.desc()).first()
+
+    if not job:
+        job = ImportJob(
+            id=str(uuid.uuid4()),
+            path=path,
+            format=file_format,
+            status="pending",
+            rows_done=0,
+            added=0,
+            skipped=0,
+            error_count=0,
+            errors="[]",
+            started_at=datetime.utcnow()
+        )
+        db.add(job)
+        db.commit()
+
+    return job
+
+def _set_job_status(db: Session, job_id: str, status: str):
+    """Change an import job's status, without committing"""
+    job = db.get(ImportJob, job_id)
+    job.status = status
+    job.updated_at = datetime.utcnow()
+    if status == "completed":
+        job.finished_at = job.updated_at
+
+def _store_chunk(db: Session, job_id: str, chunk: List[tuple], run_rows: int, run_started: float) -> Dict[str, int]:
+    """
+    Insert one chunk of (material, error) rows and advance the job's checkpoint, without committing
+    - run_rows, run_started: rows imported before this chunk in the current run and
+      when the run started, for the job's rows per second
+    Returns the job's updated counters
+    """
+    job = db.get(ImportJob, job_id)
+    errors = json.loads(job.errors or "[]")
+
+    first_row = job.rows_done
+    materials = []
+    positions = []
+    for offset, (material, error) in enumerate(chunk):
+        if error:
+            job.error_count += 1
+            if len(errors) < IMPORT_MAX_STORED_ERRORS:
+                errors.append({"row": first_row + offset + 1, "title": "", "error": error})
+            continue
+        materials.append(material)
+        positions.append(first_row + offset + 1)
+
+    result = bulk_add_reading_materials(db, materials, commit=False)
+    for error in result["errors"]:
+        job.error_count += 1
+        if len(errors) < IMPORT_MAX_STORED_ERRORS:
+            errors.append({**error, "row": positions[error["row"]]})
+
+    job.rows_done += len(chunk)
+    job.added += result["added"]
+    job.skipped += result["skipped"]
+    job.errors = json.dumps(errors)
+    job.rows_per_second = int((run_rows + len(chunk)) / max(time.perf_counter() - run_started, 1e-6))
+    job.updated_at = datetime.utcnow()
+
+    return {
+        "rows_done": job.rows_done,
+        "rows_per_second": job.rows_per_second,
+        "added": job.added,
+        "error_count": job.error_count
+    }
+
+def _print_progress(job_id: str, progress: Dict[str, int]):
+    print(f"Import {job_id}: {progress['rows_done']} rows done ({progress['rows_per_second']} rows/sec), "
+          f"{progress['added']} added, {progress['error_count']} errors")
+
+def run_import_job(db: Session, job: ImportJob, chunk_size: int = READING_IMPORT_CHUNK_SIZE) -> ImportJob:
+    """
+    Import a job's file in chunks, starting after its checkpoint
+    Each chunk and the updated checkpoint are committed together, so an
+    interrupted import resumes where it stopped without repeating work
+    """
+    if not _claim_job(job.id):
+        raise RuntimeError(f"Import job {job.id} is already running")
+
+    try:
+        _set_job_status(db, job.id, "running")
+        db.commit()
+
+        if job.rows_done:
+            print(f"Resuming import of {job.path} after row {job.rows_done}")
+
+        rows = islice(iter_materials(job.path, job.format), job.rows_done, None)
+        run_started = time.perf_counter()
+        run_rows = 0
+
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+
+            progress = _store_chunk(db, job.id, chunk, run_rows, run_started)
+            db.commit()
+            run_rows += len(chunk)
+            _print_progress(job.id, progress)
+
+        _set_job_status(db, job.id, "completed")
+        db.commit()
+        return job
+
+    except Exception as e:
+        print(f"Error importing {job.path} at row {job.rows_done}: {e}")
+        db.rollback()
+        _set_job_status(db, job.id, "failed")
+        db.commit()
+        raise
+    finally:
+        _release_job(job.id)
+
+def run_import(
+    db: Session,
+    path: str,
+    file_format: Optional[str] = None,
+    chunk_size: int = READING_IMPORT_CHUNK_SIZE,
+    restart: bool = False
+) -> ImportJob:
+    """
+    Import a CSV or NDJSON file of reading materials, resuming an unfinished import of the same file
+    """
+    job = create_import_job(db, path, file_format, restart)
+    return run_import_job(db, job, chunk_size)
+
+def get_import_job(db: Session, job_id: str) -> Optional[ImportJob]:
+    return db.query(ImportJob).filter(ImportJob.id == job_id).first()
+
+def _job_position(db: Session, job_id: str) -> Optional[Tuple[str, str, int]]:
+    """Return (path, format, rows_done) of an import job, or None if it does not exist"""
+    return db.query(ImportJob.path, ImportJob.format, ImportJob.rows_done).filter(ImportJob.id == job_id).first()
+
+async def run_import_in_background(job_id: str, chunk_size: int = READING_IMPORT_CHUNK_SIZE):
+    """
+    Run an import job from the server, for background tasks
+    The file is read on the default thread pool and every chunk is written
+    through the DB writer, so imports share its transactions with ingestion
+    """
+    if not _claim_job(job_id):
+        return
+
+    try:
+        position = await run_in_session(_job_position, job_id)
+        if position is None:
+            return
+
+        path, file_format, rows_done = position
+        loop = asyncio.get_running_loop()
+
+        await db_writer.submit(_set_job_status, job_id, "running")
+        if rows_done:
+            print(f"Resuming import of {path} after row {rows_done}")
+
+        rows = islice(iter_materials(path, file_format), rows_done, None)
+        run_started = time.perf_counter()
+        run_rows = 0
+
+        while True:
+            chunk = await loop.run_in_executor(None, list, islice(rows, chunk_size))
+            if not chunk:
+                break
+
+            progress = await db_writer.submit(_store_chunk, job_id, chunk, run_rows, run_started)
+            run_rows += len(chunk)
+            _print_progress(job_id, progress)
+
+        await db_writer.submit(_set_job_status, job_id, "completed")
+
+    except Exception as e:
+        print(f"Import job {job_id} failed: {e}")
+        try:
+            await db_writer.submit(_set_job_status, job_id, "failed")
+        except Exception as e:
+            print(f"Could not mark import job {job_id} as failed: {e}")
+    finally:
+        _release_job(job_id)
+
+def is_job_active(job_id: str) -> bool:
+    return job_id in _active_jobs
+
+def job_status(job: ImportJob) -> Dict[str, Any]:
+    """Progress of an import job, for the API and CLI"""
+    return {
+        "id": job.id,
+        "path": job.path,
+        "format": job.format,
+        "status": job.status,
+        "rowsDone": job.rows_done,
+        "rowsPerSecond": job.rows_per_second,
+        "added": job.added,
+        "skipped": job.skipped,
+        "errorCount": job.error_count,
+        "errors": json.loads(job.errors or "[]"),
+        "startedAt": job.started_at.isoformat() if job.started_at else None,
+        "updatedAt": job.updated_at.isoformat() if job.updated_at else None,
+        "finishedAt": job.finished_at.isoformat() if job.finished_at else None
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import reading materials from a CSV or NDJSON file")
+    parser.add_argument("path", help="CSV (.csv) or NDJSON (.ndjson, .jsonl) file")
+    parser.add_argument("--format", choices=["csv", "ndjson"], help="override the format detected from the extension")
+    parser.add_argument("--chunk-size", type=int, default=READING_IMPORT_CHUNK_SIZE)
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint of an unfinished import")
+    args = parser.parse_args()
+
+    from database.db import engine, Base, add_missing_columns
+    from database.migrations import run_migrations
+    Base.metadata.create_all(bind=engine)
+    add_missing_columns()
+    run_migrations()
+
+    db = SessionLocal()
+    try:
+        job = run_import(db, args.path, args.format, args.chunk_size, args.restart)
+        status = job_status(job)
+        for error in status["errors"]:
+            print(f"Row {error['row']}: {error['error']}")
+        print(f"Finished: {status['added']} added, {status['skipped']} skipped, {status['errorCount']} errors")
+    finally:
+        db.close()
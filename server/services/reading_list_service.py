@@ -1,11 +1,15 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy import bindparam, desc, update
 from models.models import ReadingMaterial, Tag, book_tags
-from typing import List, Optional, Dict, Any
+from services.repository import bulk_insert_ignore
+from typing import List, Optional, Dict, Any, Tuple
 import uuid
 from datetime import datetime
 import re
 
+# Rows per IN lookup / executemany batch, kept well under SQLite's bound parameter limit
+READING_LIST_BATCH_SIZE = 500
+
 def sanitize_id(text: str) -> str:
     """
     Create a safe ID from text input
@@ -33,7 +37,7 @@ def get_reading_materials(
     - cursor: Last material's ID (optional)
     - limit: Maximum number of materials to return
     """
-    query = db.query(ReadingMaterial)
+    query = db.query(ReadingMaterial).filter(ReadingMaterial.enabled.is_(True))
     
     # Apply filters
     if section and section.lower() != "all":
@@ -145,50 +149,271 @@ def add_reading_material(db: Session, material_data: Dict[str, Any]):
         db.rollback()
         raise
 
-def import_reading_list_from_csv(db: Session, csv_file_path: str):
+def _build_material_row(material_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert an input dict to a reading_materials row, raising ValueError for bad input
+    """
+    title = material_data.get("title") or ""
+    if not isinstance(title, str):
+        raise ValueError("title must be a string")
+    title = title.strip()
+    if not title:
+        raise ValueError("title is required")
+    
+    author = material_data.get("author") or "Unknown"
+    
+    return {
+        "id": sanitize_id(f"{title}_{author}"),
+        "title": title,
+        "author": author,
+        "description": material_data.get("description", ""),
+        "difficulty": material_data.get("difficulty", "beginner"),
+        "section": material_data.get("section", "general"),
+        "cover_url": material_data.get("cover_url", ""),
+        "pdf_url": material_data.get("pdf_url", ""),
+        "audio_url": material_data.get("audio_url", ""),
+        "external_url": material_data.get("external_url", ""),
+        "publication_year": str(material_data.get("publication_year", "") or ""),
+        "pages": int(material_data.get("pages") or 0),
+        "reading_time": int(material_data.get("reading_time") or 0)
+    }
+
+def _parse_material(material_data: Any) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Convert one input row to a reading_materials row and its distinct tag names,
+    raising ValueError for bad input
+    """
+    if not isinstance(material_data, dict):
+        raise ValueError(f"expected an object, got {type(material_data).__name__}")
+    
+    tag_names = material_data.get("tag_names") or []
+    if not isinstance(tag_names, list) or not all(name is None or isinstance(name, str) for name in tag_names):
+        raise ValueError("tag_names must be a list of strings")
+    
+    row = _build_material_row(material_data)
+    return row, list(dict.fromkeys(name.strip() for name in tag_names if name and name.strip()))
+
+def reading_material_id(material_data: Dict[str, Any]) -> Optional[str]:
+    """ID a material is stored under, or None if the entry has no title"""
+    title = (material_data.get("title") or "").strip()
+    if not title:
+        return None
+    return sanitize_id(f"{title}_{material_data.get('author') or 'Unknown'}")
+
+def _resolve_tags(db: Session, tag_names: List[str]) -> Dict[str, str]:
+    """
+    Map tag names to tag IDs, creating missing tags in one batched insert
+    """
+    tag_ids = {}
+    for start in range(0, len(tag_names), READING_LIST_BATCH_SIZE):
+        chunk = tag_names[start:start + READING_LIST_BATCH_SIZE]
+        tag_ids.update(db.query(Tag.name, Tag.id).filter(Tag.name.in_(chunk)).all())
+    
+    missing = [name for name in tag_names if name not in tag_ids]
+    if not missing:
+        return tag_ids
+    
+    # Names that sanitize to an existing ID share that tag, e.g. "Marxism" and "marxism"
+    candidate_ids = list({sanitize_id(name) for name in missing})
+    known_ids = set()
+    for start in range(0, len(candidate_ids), READING_LIST_BATCH_SIZE):
+        chunk = candidate_ids[start:start + READING_LIST_BATCH_SIZE]
+        known_ids.update(tag_id for (tag_id,) in db.query(Tag.id).filter(Tag.id.in_(chunk)).all())
+    
+    new_tags = []
+    for name in missing:
+        tag_id = sanitize_id(name)
+        if tag_id not in known_ids:
+            new_tags.append({"id": tag_id, "name": name})
+            known_ids.add(tag_id)
+        tag_ids[name] = tag_id
+    
+    if new_tags:
+        bulk_insert_ignore(db, Tag, new_tags, READING_LIST_BATCH_SIZE)
+    
+    return tag_ids
+
+def bulk_add_reading_materials(db: Session, materials: List[Dict[str, Any]], commit: bool = True) -> Dict[str, Any]:
     """
-    Import reading materials from a CSV file
+    Add many reading materials in a single transaction
+    Tags are resolved with one lookup and created in a batch, and materials and
+    their book_tags rows are written with executemany. Invalid rows are reported
+    instead of aborting the import.
+    - commit: commit when done; pass False to commit together with other changes
+    Returns {"added": int, "skipped": int, "errors": [{"row": index, "title": str, "error": str}]}
+    - skipped: rows whose material already exists or repeats an earlier row
     """
-    import csv
+    errors = []
+    rows = {}
+    row_tags = {}
+    
+    for index, material_data in enumerate(materials):
+        # A malformed row is reported on its own instead of failing the whole call
+        try:
+            row, tags = _parse_material(material_data)
+        except Exception as e:
+            title = material_data.get("title", "") if isinstance(material_data, dict) else ""
+            errors.append({"row": index, "title": title, "error": str(e)})
+            continue
+        
+        if row["id"] in rows:
+            continue
+        
+        rows[row["id"]] = row
+        row_tags[row["id"]] = tags
+    
+    # Materials that are already stored are left untouched
+    material_ids = list(rows)
+    existing_ids = set()
+    for start in range(0, len(material_ids), READING_LIST_BATCH_SIZE):
+        chunk = material_ids[start:start + READING_LIST_BATCH_SIZE]
+        existing_ids.update(
+            material_id for (material_id,) in
+            db.query(ReadingMaterial.id).filter(ReadingMaterial.id.in_(chunk)).all()
+        )
+    
+    new_rows = [row for material_id, row in rows.items() if material_id not in existing_ids]
+    result = {
+        "added": len(new_rows),
+        "skipped": len(materials) - len(errors) - len(new_rows),
+        "errors": errors
+    }
+    if not new_rows:
+        return result
     
     try:
-        with open(csv_file_path, 'r', encoding='utf-8') as file:
-            reader = csv.DictReader(file)
-            
-            for row in reader:
-                # Prepare material data
-                material_data = {
-                    "title": row.get("title", ""),
-                    "author": row.get("author", "Unknown"),
-                    "description": row.get("description", ""),
-                    "difficulty": row.get("difficulty", "beginner"),
-                    "section": row.get("section", "general"),
-                    "cover_url": row.get("cover_url", ""),
-                    "pdf_url": row.get("pdf_url", ""),
-                    "audio_url": row.get("audio_url", ""),
-                    "external_url": row.get("external_url", ""),
-                    "publication_year": row.get("publication_year", ""),
-                    "pages": int(row.get("pages", 0)) if row.get("pages", "").isdigit() else 0,
-                    "reading_time": int(row.get("reading_time", 0)) if row.get("reading_time", "").isdigit() else 0
-                }
-                
-                # Handle tags (assuming comma-separated tags in the CSV)
-                if "tags" in row and row["tags"]:
-                    material_data["tag_names"] = [tag.strip() for tag in row["tags"].split(",")]
-                
-                # Add material
-                add_reading_material(db, material_data)
-        
-        return True
+        tag_names = list(dict.fromkeys(name for row in new_rows for name in row_tags[row["id"]]))
+        tag_ids = _resolve_tags(db, tag_names)
+        
+        links = []
+        for row in new_rows:
+            linked = set()
+            for name in row_tags[row["id"]]:
+                tag_id = tag_ids[name]
+                if tag_id not in linked:
+                    linked.add(tag_id)
+                    links.append({"book_id": row["id"], "tag_id": tag_id})
+        
+        bulk_insert_ignore(db, ReadingMaterial, new_rows, READING_LIST_BATCH_SIZE)
+        
+        for start in range(0, len(links), READING_LIST_BATCH_SIZE):
+            db.execute(book_tags.insert(), links[start:start + READING_LIST_BATCH_SIZE])
+        
+        if commit:
+            db.commit()
+        return result
+    
+    except Exception as e:
+        print(f"Error bulk adding reading materials: {e}")
+        db.rollback()
+        raise
+
+def csv_row_to_material(row: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Convert a CSV row to the material dict accepted by bulk_add_reading_materials
+    """
+    material_data = {
+        "title": row.get("title", ""),
+        "author": row.get("author", "Unknown"),
+        "description": row.get("description", ""),
+        "difficulty": row.get("difficulty", "beginner"),
+        "section": row.get("section", "general"),
+        "cover_url": row.get("cover_url", ""),
+        "pdf_url": row.get("pdf_url", ""),
+        "audio_url": row.get("audio_url", ""),
+        "external_url": row.get("external_url", ""),
+        "publication_year": row.get("publication_year", ""),
+        "pages": int(row.get("pages", 0)) if (row.get("pages") or "").isdigit() else 0,
+        "reading_time": int(row.get("reading_time", 0)) if (row.get("reading_time") or "").isdigit() else 0
+    }
+    
+    # Handle tags (assuming comma-separated tags in the CSV)
+    if row.get("tags"):
+        material_data["tag_names"] = [tag.strip() for tag in row["tags"].split(",")]
+    
+    return material_data
+
+def json_row_to_material(row: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Accept the CSV "tags" column in JSON rows too, as a list or a comma-separated string
+    tag_names wins when a row has both
+    """
+    if "tags" in row and "tag_names" not in row:
+        tags = row["tags"]
+        tag_names = [tag.strip() for tag in tags.split(",")] if isinstance(tags, str) else tags
+        row = {**row, "tag_names": tag_names}
+    return row
+
+def update_reading_materials(db: Session, materials: List[Dict[str, Any]], commit: bool = True) -> Dict[str, Any]:
+    """
+    Overwrite stored materials with new details and tags, matched by the ID derived
+    from title and author; unknown materials are ignored
+    Returns {"updated": int, "errors": [{"row": index, "title": str, "error": str}]}
+    """
+    errors = []
+    rows = {}
+    row_tags = {}
+    
+    for index, material_data in enumerate(materials):
+        # A malformed row is reported on its own instead of failing the whole call
+        try:
+            row, tags = _parse_material(material_data)
+        except Exception as e:
+            title = material_data.get("title", "") if isinstance(material_data, dict) else ""
+            errors.append({"row": index, "title": title, "error": str(e)})
+            continue
+        
+        rows[row["id"]] = row
+        row_tags[row["id"]] = tags
+    
+    if not rows:
+        return {"updated": 0, "errors": errors}
+    
+    try:
+        material_ids = list(rows)
+        values = [{"_id": material_id, **rows[material_id]} for material_id in material_ids]
+        stmt = update(ReadingMaterial).where(ReadingMaterial.id == bindparam("_id")).values({
+            column: bindparam(column) for column in rows[material_ids[0]] if column != "id"
+        })
+        for start in range(0, len(values), READING_LIST_BATCH_SIZE):
+            db.connection().execute(stmt, values[start:start + READING_LIST_BATCH_SIZE])
+        
+        # Replace the tag links
+        tag_ids = _resolve_tags(db, list(dict.fromkeys(name for names in row_tags.values() for name in names)))
+        links = []
+        for start in range(0, len(material_ids), READING_LIST_BATCH_SIZE):
+            chunk = material_ids[start:start + READING_LIST_BATCH_SIZE]
+            db.execute(book_tags.delete().where(book_tags.c.book_id.in_(chunk)))
+        for material_id in material_ids:
+            for tag_id in dict.fromkeys(tag_ids[name] for name in row_tags[material_id]):
+                links.append({"book_id": material_id, "tag_id": tag_id})
+        for start in range(0, len(links), READING_LIST_BATCH_SIZE):
+            db.execute(book_tags.insert(), links[start:start + READING_LIST_BATCH_SIZE])
+        
+        if commit:
+            db.commit()
+        return {"updated": len(material_ids), "errors": errors}
     
     except Exception as e:
-        print(f"Error importing reading list from CSV: {e}")
-        return False
+        print(f"Error updating reading materials: {e}")
+        db.rollback()
+        raise
 
-def import_marxist_classics(db: Session):
+def import_reading_list_from_csv(db: Session, csv_file_path: str):
+    """
+    Import reading materials from a CSV file in chunks, resuming an interrupted import
+    Returns the finished ImportJob; file and database errors are raised
+    """
+    # Import here to avoid circular imports
+    from services.reading_list_import import run_import
+    
+    return run_import(db, csv_file_path, file_format="csv")
+
+def import_marxist_classics(db: Session, commit: bool = True):
     """
     Import a set of classic Marxist texts to the reading list
     This is a helper function to populate the database with initial data
+    - commit: commit when done; pass False to commit together with other changes
     """
     classics = [
         {
@@ -237,11 +462,8 @@ def import_marxist_classics(db: Session):
         }
     ]
     
-    for material_data in classics:
-        try:
-            add_reading_material(db, material_data)
-        except Exception as e:
-            print(f"Error adding {material_data['title']}: {e}")
-            continue
+    result = bulk_add_reading_materials(db, classics, commit=commit)
+    for error in result["errors"]:
+        print(f"Error adding {error['title']}: {error['error']}")
     
     return True
@@ -1,7 +1,19 @@
+from sqlalchemy import insert, or_, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from models.models import Channel, Video
+from models.models import Channel, Video, SOURCE_LABELS
 from typing import List, Optional
 import datetime
+import os
+
+# Videos up to this long are treated as Shorts when filtering
+YOUTUBE_SHORTS_MAX_SECONDS = int(os.getenv("YOUTUBE_SHORTS_MAX_SECONDS", "60"))
+
+# Rows per executemany batch and per IN (...) lookup; keeps bound parameters under SQLite's limit
+VIDEO_UPSERT_BATCH_SIZE = 500
+
+# Dialects with INSERT ... ON CONFLICT; others use the row-by-row fallbacks below
+ON_CONFLICT_DIALECTS = ("postgresql", "sqlite")
 
 def get_channels(db: Session, skip: int = 0, limit: int = 100):
     return db.query(Channel).offset(skip).limit(limit).all()
@@ -14,22 +26,27 @@ def create_channel(db: Session, channel_data: dict):
         id=channel_data["id"],
         title=channel_data["title"],
         section=channel_data["section"],
-        uploads_playlist_id=channel_data["uploads_playlist_id"]
+        uploads_playlist_id=channel_data["uploads_playlist_id"],
+        priority=channel_data.get("priority", 0),
+        poll_interval=channel_data.get("poll_interval")
     )
     db.add(db_channel)
     db.commit()
     db.refresh(db_channel)
     return db_channel
 
-def get_videos(db: Session, section: Optional[str] = None, skip: int = 0, limit: int = 20):
-    query = db.query(
-        Video,
-        Channel.title.label("channel_title"),
-        Channel.section
-    ).join(Channel)
+def exclude_shorts_filter(query):
+    """Drop videos known to be Shorts; videos not yet enriched are kept"""
+    return query.filter(or_(Video.duration.is_(None), Video.duration > YOUTUBE_SHORTS_MAX_SECONDS))
+
+def get_videos(db: Session, section: Optional[str] = None, skip: int = 0, limit: int = 20, exclude_shorts: bool = False):
+    query = db.query(Video, Video.channel_title, Video.section)
     
     if section and section.lower() != "all":
-        query = query.filter(Channel.section == section)
+        query = query.filter(Video.section == section)
+    
+    if exclude_shorts:
+        query = exclude_shorts_filter(query)
     
     return query.order_by(Video.published_at.desc()).offset(skip).limit(limit).all()
 
@@ -42,60 +59,169 @@ def create_video(db: Session, video_data: dict):
         published_at=video_data["published_at"],
         thumbnail_url=video_data["thumbnail_url"]
     )
+    for column, value in fill_source_labels(db, Video, [{"channel_id": db_video.channel_id}])[0].items():
+        setattr(db_video, column, value)
     db.add(db_video)
     db.commit()
     db.refresh(db_video)
     return db_video
 
-def update_videos_for_channel(db: Session, channel_id: str, videos_data: List[dict]):
-    # Get existing video IDs for this channel
-    existing_video_ids = set([
-        video_id for (video_id,) in 
-        db.query(Video.id).filter(Video.channel_id == channel_id).all()
-    ])
+def upsert_insert(db: Session, model):
+    """
+    Return a dialect-specific INSERT for the model that supports ON CONFLICT
+    Only for dialects in ON_CONFLICT_DIALECTS; bulk_insert_ignore and
+    bulk_upsert fall back to row-by-row writes for the others
+    """
+    dialect = db.get_bind().dialect.name
+    
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"ON CONFLICT is not supported for {dialect}")
+    
+    return insert(model)
+
+def bulk_insert_ignore(db: Session, model, rows: List[dict], batch_size: int = VIDEO_UPSERT_BATCH_SIZE, index_elements=None):
+    """
+    Insert rows, skipping the ones that conflict with stored rows, without committing
+    - index_elements: only ignore conflicts on these columns (default: any conflict)
+    Other dialects insert one row at a time, each in a savepoint, and skip rows
+    that violate a constraint
+    """
+    if not rows:
+        return
+    
+    if db.get_bind().dialect.name in ON_CONFLICT_DIALECTS:
+        stmt = upsert_insert(db, model).on_conflict_do_nothing(index_elements=index_elements)
+        for start in range(0, len(rows), batch_size):
+            db.execute(stmt, rows[start:start + batch_size])
+        return
+    
+    for row in rows:
+        try:
+            with db.begin_nested():
+                db.execute(insert(model.__table__), row)
+        except IntegrityError:
+            pass
+
+def bulk_upsert(db: Session, model, rows: List[dict], update_columns: List[str], batch_size: int = VIDEO_UPSERT_BATCH_SIZE):
+    """
+    Insert rows, or update update_columns of the stored row with the same primary key, without committing
+    Other dialects update each row by its primary key and insert it when no row matched
+    """
+    if not rows:
+        return
+    
+    primary_key = model.__table__.primary_key.columns
+    if db.get_bind().dialect.name in ON_CONFLICT_DIALECTS:
+        stmt = upsert_insert(db, model)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(primary_key),
+            set_={column: stmt.excluded[column] for column in update_columns}
+        )
+        for start in range(0, len(rows), batch_size):
+            db.execute(stmt, rows[start:start + batch_size])
+        return
     
-    # Process new videos
-    new_video_ids = set()
+    connection = db.connection()
+    for row in rows:
+        result = connection.execute(
+            update(model.__table__)
+            .where(*(column == row[column.key] for column in primary_key))
+            .values({column: row[column] for column in update_columns})
+        )
+        if result.rowcount == 0:
+            connection.execute(insert(model.__table__).values(row))
+
+def fill_source_labels(db: Session, content_model, rows: List[dict]) -> List[dict]:
+    """
+    Copy the section and title of each row's source onto content rows before they are written
+    - content_model: Video, RssArticle or SocialPost; rows reference their source by its foreign key
+    Rows whose source is not stored get empty labels. Returns the rows.
+    """
+    source_model, _, foreign_key, labels = next(entry for entry in SOURCE_LABELS if entry[1] is content_model)
+    
+    source_ids = list({row[foreign_key.key] for row in rows if row.get(foreign_key.key)})
+    columns = [getattr(source_model, attribute) for attribute in labels]
+    sources = {}
+    for start in range(0, len(source_ids), VIDEO_UPSERT_BATCH_SIZE):
+        chunk = source_ids[start:start + VIDEO_UPSERT_BATCH_SIZE]
+        for source_id, *values in db.query(source_model.id, *columns).filter(source_model.id.in_(chunk)).all():
+            sources[source_id] = dict(zip(labels.values(), values))
+    
+    empty = dict.fromkeys(labels.values())
+    for row in rows:
+        row.update(sources.get(row.get(foreign_key.key), empty))
+    return rows
+
+def update_videos_for_channel(db: Session, channel_id: str, videos_data: List[dict], commit: bool = True):
+    """
+    Insert or update a batch of videos for a channel in a single transaction
+    - videos_data: video dicts as returned by YouTubeService.get_playlist_videos
+    - commit: commit when done; pass False to fold several pages into one transaction
+    Returns the number of videos that were not in the database before
+    """
+    # De-duplicate by ID, keeping the last occurrence
+    rows = {}
     for video_data in videos_data:
-        new_video_ids.add(video_data["id"])
-        
-        # Check if video already exists
-        db_video = db.query(Video).filter(Video.id == video_data["id"]).first()
-        
-        if db_video:
-            # Update existing video
-            db_video.title = video_data["title"]
-            db_video.description = video_data["description"]
-            db_video.published_at = video_data["published_at"]
-            db_video.thumbnail_url = video_data["thumbnail_url"]
-        else:
-            # Create new video
-            create_video(db, video_data)
-    
-    # Optionally: Remove videos that no longer exist in the channel
-    # videos_to_delete = existing_video_ids - new_video_ids
-    # if videos_to_delete:
-    #     db.query(Video).filter(Video.id.in_(videos_to_delete)).delete(synchronize_session=False)
+        rows[video_data["id"]] = {
+            "id": video_data["id"],
+            "title": video_data["title"],
+            "description": video_data["description"],
+            "channel_id": video_data.get("channel_id") or channel_id,
+            "published_at": video_data["published_at"],
+            "thumbnail_url": video_data["thumbnail_url"]
+        }
     
-    db.commit()
+    if not rows:
+        return 0
+    
+    fill_source_labels(db, Video, list(rows.values()))
+    
+    # Single pre-fetch of the IDs we already have
+    existing_video_ids = set()
+    video_ids = list(rows)
+    for start in range(0, len(video_ids), VIDEO_UPSERT_BATCH_SIZE):
+        chunk = video_ids[start:start + VIDEO_UPSERT_BATCH_SIZE]
+        existing_video_ids.update(
+            video_id for (video_id,) in db.query(Video.id).filter(Video.id.in_(chunk)).all()
+        )
+    
+    # Batched INSERT ... ON CONFLICT DO UPDATE
+    bulk_upsert(db, Video, list(rows.values()), [
+        "title", "description", "published_at", "thumbnail_url", "section", "channel_title"
+    ])
+    
+    if commit:
+        db.commit()
+    
+    return len(rows) - len(existing_video_ids)
     
 
-def get_paginated_videos(db: Session, section: Optional[str] = None, cursor: Optional[str] = None, limit: int = 10):
+def get_paginated_videos(
+    db: Session,
+    section: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = 10,
+    exclude_shorts: bool = False
+):
     """
     Get videos with pagination
     - section: Filter by section (optional)
     - cursor: ID of the last video from previous page (optional)
     - limit: Number of videos to return
+    - exclude_shorts: Leave out videos no longer than YOUTUBE_SHORTS_MAX_SECONDS (optional)
     """
-    query = db.query(
-        Video,
-        Channel.title.label("channel_title"),
-        Channel.section
-    ).join(Channel)
+    query = db.query(Video, Video.channel_title, Video.section)
     
     # Filter by section if provided
     if section and section.lower() != "all":
-        query = query.filter(Channel.section == section)
+        query = query.filter(Video.section == section)
+    
+    if exclude_shorts:
+        query = exclude_shorts_filter(query)
     
     # Order by published date descending
     query = query.order_by(Video.published_at.desc())
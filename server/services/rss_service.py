@@ -1,12 +1,44 @@
 from sqlalchemy.orm import Session
 from models.models import RssFeed, RssArticle
+from database.db import run_in_session
+from services.feed_fetcher import fetch_feed, RSS_FETCH_CONCURRENCY
+from services.feed_parser import FEED_FIELDS, RSS_PARSE_WORKERS, normalize_entry, parse_feed_async
+from services.pipeline import Pipeline, Stage, db_writer, PIPELINE_PARSE_WORKERS, PIPELINE_WRITE_BATCH
+from services.repository import bulk_insert_ignore, fill_source_labels
 from typing import List, Optional, Dict, Any
 import feedparser
+import hashlib
 from datetime import datetime
 import uuid
 import re
 from urllib.parse import urlparse
 
+# Rows per executemany batch and per IN (...) lookup
+ARTICLE_BATCH_SIZE = 500
+
+# Conditional GET counters since process start
+# not_modified and unchanged are cache hits, changed is a miss
+feed_cache_stats = {
+    "not_modified": 0,
+    "unchanged": 0,
+    "changed": 0,
+    "errors": 0
+}
+
+def get_feed_cache_stats() -> Dict[str, Any]:
+    """
+    Return the conditional GET counters together with the overall hit ratio
+    """
+    hits = feed_cache_stats["not_modified"] + feed_cache_stats["unchanged"]
+    total = hits + feed_cache_stats["changed"]
+    
+    return {
+        **feed_cache_stats,
+        "hits": hits,
+        "misses": feed_cache_stats["changed"],
+        "hit_ratio": round(hits / total, 3) if total else None
+    }
+
 def sanitize_id(text: str) -> str:
     """
     Create a safe ID from text input
@@ -40,14 +72,10 @@ def get_rss_articles(db: Session, section: Optional[str] = None, cursor: Optiona
     - cursor: Last article's published_at timestamp (optional)
     - limit: Maximum number of articles to return
     """
-    query = db.query(
-        RssArticle,
-        RssFeed.title.label("feed_title"),
-        RssFeed.section
-    ).join(RssFeed)
+    query = db.query(RssArticle, RssArticle.feed_title, RssArticle.section)
     
     if section and section.lower() != "all":
-        query = query.filter(RssFeed.section == section)
+        query = query.filter(RssArticle.section == section)
     
     # Apply cursor pagination if provided
     if cursor:
@@ -89,94 +117,266 @@ def get_rss_articles(db: Session, section: Optional[str] = None, cursor: Optiona
         "next_cursor": next_cursor
     }
 
-async def fetch_and_update_rss_feeds(db: Session, feeds_config: List[Dict[str, Any]]):
+async def fetch_and_update_rss_feeds(feeds_config: List[Dict[str, Any]]) -> int:
     """
     Fetch articles from RSS feeds and update the database
+    Feeds flow through the RSS pipeline: downloads run concurrently, parsing
+    runs in worker processes, and the writer stores them in batched transactions
+    Returns the number of new articles
+    """
+    return await _run_rss_pipeline(feeds_config)
+
+async def update_rss_feed(feed_config: Dict[str, Any]) -> int:
+    """
+    Fetch a single RSS feed and store any new articles
+    A 304 response or a body identical to the last fetch skips parsing and all DB writes
+    Returns the number of new articles
+    """
+    return await _run_rss_pipeline([feed_config])
+
+def get_feed_validators(db: Session, urls: List[str]) -> Dict[str, Any]:
+    """The stored etag, last_modified and content_hash of each stored feed, by URL"""
+    validators = {}
+    for start in range(0, len(urls), ARTICLE_BATCH_SIZE):
+        validators.update(
+            (row.url, row) for row in
+            db.query(RssFeed.url, RssFeed.etag, RssFeed.last_modified, RssFeed.content_hash)
+            .filter(RssFeed.url.in_(urls[start:start + ARTICLE_BATCH_SIZE])).all()
+        )
+    return validators
+
+async def _run_rss_pipeline(feeds_config: List[Dict[str, Any]]) -> int:
+    """
+    Look up the validators of every feed in one query, then run the feeds through the pipeline
+    """
+    urls = [feed_config["url"] for feed_config in feeds_config if "url" in feed_config]
+    validators = await run_in_session(get_feed_validators, urls)
+    return sum(await rss_pipeline.run(
+        (feed_config, validators.get(feed_config.get("url"))) for feed_config in feeds_config
+    ))
+
+async def _fetch_feed_stage(item: tuple) -> Optional[Dict[str, Any]]:
+    """
+    Download a feed with a conditional GET, given its config and stored validators
+    Drops feeds that failed or did not change; an unchanged body is only passed
+    on when its validators need to be stored
     """
-    for feed_config in feeds_config:
-        try:
-            # Skip if URL is missing
-            if "url" not in feed_config:
-                print("Missing URL in RSS feed config")
-                continue
-            
-            # Parse the feed
-            parsed_feed = feedparser.parse(feed_config["url"])
-            
-            if not parsed_feed.feed:
-                print(f"Failed to parse feed: {feed_config['url']}")
-                continue
-            
-            # Get or create feed in database
-            feed_title = feed_config.get("title", parsed_feed.feed.get("title", "Unknown Feed"))
-            feed_id = sanitize_id(feed_title)
-            
-            db_feed = db.query(RssFeed).filter(RssFeed.id == feed_id).first()
-            
-            if not db_feed:
-                # Create new feed
-                db_feed = RssFeed(
-                    id=feed_id,
-                    title=feed_title,
-                    url=feed_config["url"],
-                    description=parsed_feed.feed.get("description", ""),
-                    section=feed_config.get("section", "general"),
-                    last_updated=datetime.utcnow()
-                )
-                db.add(db_feed)
-                db.commit()
-                db.refresh(db_feed)
-            else:
-                # Update existing feed
-                db_feed.last_updated = datetime.utcnow()
-                db.commit()
-            
-            # Process articles
-            for entry in parsed_feed.entries:
-                # Create a unique ID for the article
-                article_id = sanitize_id(entry.get("id", entry.get("link", "")))
-                
-                # Check if article already exists
-                existing_article = db.query(RssArticle).filter(RssArticle.id == article_id).first()
-                
-                if not existing_article:
-                    # Parse published date
-                    published_at = None
-                    if "published_parsed" in entry and entry.published_parsed:
-                        published_at = datetime(*entry.published_parsed[:6])
-                    else:
-                        published_at = datetime.utcnow()
-                    
-                    # Get image URL if available
-                    image_url = None
-                    if "media_content" in entry and entry.media_content:
-                        for media in entry.media_content:
-                            if "url" in media and media.get("medium", "") == "image":
-                                image_url = media["url"]
-                                break
-                    
-                    # Create new article
-                    new_article = RssArticle(
-                        id=article_id,
-                        feed_id=db_feed.id,
-                        title=entry.get("title", "Untitled"),
-                        link=entry.get("link", ""),
-                        author=entry.get("author", "Unknown"),
-                        published_at=published_at,
-                        summary=entry.get("summary", ""),
-                        content=entry.get("content", [{"value": ""}])[0].get("value", "") if "content" in entry else "",
-                        image_url=image_url
-                    )
-                    
-                    db.add(new_article)
-            
-            db.commit()
-            print(f"Updated RSS feed: {feed_title}")
-                
-        except Exception as e:
-            print(f"Error updating RSS feed {feed_config.get('url')}: {e}")
-            db.rollback()
-            continue
+    feed_config, known = item
+    
+    # Skip if URL is missing
+    if "url" not in feed_config:
+        print("Missing URL in RSS feed config")
+        return None
+    
+    # Download the feed without blocking the event loop
+    fetched = await fetch_feed(
+        feed_config["url"],
+        etag=known.etag if known else None,
+        last_modified=known.last_modified if known else None
+    )
+    if fetched["error"]:
+        feed_cache_stats["errors"] += 1
+        print(f"Failed to fetch feed {feed_config['url']}: {fetched['error']}")
+        return None
+    
+    if fetched["status"] == 304:
+        feed_cache_stats["not_modified"] += 1
+        return None
+    
+    content_hash = hashlib.sha256(fetched["content"]).hexdigest()
+    unchanged = bool(known) and known.content_hash == content_hash
+    if unchanged:
+        feed_cache_stats["unchanged"] += 1
+        # Keep validators fresh so the next request can be answered with a 304
+        if known.etag == fetched["etag"] and known.last_modified == fetched["last_modified"]:
+            return None
+    else:
+        feed_cache_stats["changed"] += 1
+    
+    return {
+        "config": feed_config,
+        "content": fetched["content"],
+        "etag": fetched["etag"],
+        "last_modified": fetched["last_modified"],
+        "content_hash": content_hash,
+        "unchanged": unchanged
+    }
+
+async def _parse_feed_stage(item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Parse the downloaded bytes in the process pool into feed details and article rows
+    """
+    content = item.pop("content")
+    if item["unchanged"]:
+        return item
+    
+    parsed = await parse_feed_async(content)
+    if not parsed:
+        print(f"Failed to parse feed: {item['config']['url']}")
+        return None
+    
+    feed, entries = parsed
+    item["feed"] = dict(zip(FEED_FIELDS, feed))
+    # The feed ID is only known once the writer has looked up the feed row
+    item["articles"] = [article_row(entry, None) for entry in entries]
+    return item
+
+async def _write_feed_stage(item: Dict[str, Any]) -> int:
+    return await db_writer.submit(store_feed, item)
+
+def store_feed(db: Session, item: Dict[str, Any]) -> int:
+    """
+    Store a parsed feed and its new articles, without committing
+    The validators are stored in the same transaction as the articles
+    Returns the number of new articles
+    """
+    feed_config = item["config"]
+    db_feed = db.query(RssFeed).filter(RssFeed.url == feed_config["url"]).first()
+    
+    if item["unchanged"]:
+        if db_feed:
+            db_feed.etag = item["etag"]
+            db_feed.last_modified = item["last_modified"]
+        return 0
+    
+    # Get or create feed in database
+    feed_title = feed_config.get("title", item["feed"]["title"])
+    feed_id = sanitize_id(feed_title)
+    
+    if not db_feed:
+        db_feed = db.query(RssFeed).filter(RssFeed.id == feed_id).first()
+    
+    if not db_feed:
+        # Create new feed
+        db_feed = RssFeed(
+            id=feed_id,
+            title=feed_title,
+            url=feed_config["url"],
+            description=item["feed"]["description"],
+            section=feed_config.get("section", "general"),
+            last_updated=datetime.utcnow()
+        )
+        db.add(db_feed)
+        db.flush()
+    else:
+        # Update existing feed
+        db_feed.last_updated = datetime.utcnow()
+    
+    # Remember the WebSub hub so the feed can be pushed to us
+    if item["feed"]["websub_hub"]:
+        db_feed.websub_hub = item["feed"]["websub_hub"]
+    if item["feed"]["websub_topic"]:
+        db_feed.websub_topic = item["feed"]["websub_topic"]
+    
+    # Process articles
+    for row in item["articles"]:
+        row["feed_id"] = db_feed.id
+    new_articles = insert_article_rows(db, item["articles"])
+    
+    db_feed.etag = item["etag"]
+    db_feed.last_modified = item["last_modified"]
+    db_feed.content_hash = item["content_hash"]
+    
+    print(f"Updated RSS feed: {feed_title} ({new_articles} new articles)")
+    return new_articles
+
+def build_article_row(entry, feed_id: str) -> Dict[str, Any]:
+    """
+    Convert a feedparser entry into an rss_articles row
+    """
+    return article_row(normalize_entry(entry), feed_id)
+
+def article_row(entry: tuple, feed_id: Optional[str]) -> Dict[str, Any]:
+    """
+    Convert a normalized entry tuple (see feed_parser.ENTRY_FIELDS) into an rss_articles row
+    """
+    guid, title, link, author, published_at, summary, content, image_url = entry
+    
+    return {
+        # Create a unique ID for the article
+        "id": sanitize_id(guid),
+        "feed_id": feed_id,
+        "title": title,
+        "link": link,
+        "author": author,
+        "published_at": published_at or datetime.utcnow(),
+        "summary": summary,
+        "content": content,
+        "image_url": image_url
+    }
+
+def insert_new_articles(db: Session, feed_id: str, entries) -> int:
+    """
+    Insert the entries that are not yet stored, without committing
+    Returns the number of articles inserted
+    """
+    return insert_article_rows(db, [build_article_row(entry, feed_id) for entry in entries])
+
+def insert_article_rows(db: Session, article_rows: List[Dict[str, Any]]) -> int:
+    """
+    Insert the article rows that are not yet stored, without committing
+    Existing IDs are looked up with a single IN query per batch and only the
+    missing rows are bulk-inserted
+    Returns the number of articles inserted
+    """
+    # De-duplicate by ID, keeping the first occurrence
+    rows = {}
+    for row in article_rows:
+        rows.setdefault(row["id"], row)
+    
+    if not rows:
+        return 0
+    
+    article_ids = list(rows)
+    existing_ids = set()
+    for start in range(0, len(article_ids), ARTICLE_BATCH_SIZE):
+        chunk = article_ids[start:start + ARTICLE_BATCH_SIZE]
+        existing_ids.update(
+            article_id for (article_id,) in db.query(RssArticle.id).filter(RssArticle.id.in_(chunk)).all()
+        )
+    
+    new_rows = [row for article_id, row in rows.items() if article_id not in existing_ids]
+    if not new_rows:
+        return 0
+    
+    fill_source_labels(db, RssArticle, new_rows)
+    
+    # Another writer may have stored an article in the meantime, so ignore conflicts
+    bulk_insert_ignore(db, RssArticle, new_rows, ARTICLE_BATCH_SIZE, index_elements=[RssArticle.id])
+    
+    return len(new_rows)
+
+# Download, parse and store; feeds with nothing new are dropped after the download
+rss_pipeline = Pipeline("rss", [
+    Stage("fetch", _fetch_feed_stage, workers=RSS_FETCH_CONCURRENCY),
+    Stage("parse", _parse_feed_stage, workers=max(PIPELINE_PARSE_WORKERS, RSS_PARSE_WORKERS)),
+    Stage("write", _write_feed_stage, workers=PIPELINE_WRITE_BATCH)
+])
+
+def ensure_rss_feed(db: Session, feed_config: Dict[str, Any]):
+    """
+    Create or update the feed row for a config entry without fetching it, without committing
+    The scheduler polls every feed row, so this is all a new feed needs
+    """
+    db_feed = db.query(RssFeed).filter(RssFeed.url == feed_config["url"]).first()
+    
+    if not db_feed:
+        db_feed = RssFeed(
+            id=sanitize_id(feed_config.get("title", feed_config["url"])),
+            title=feed_config.get("title", feed_config["url"]),
+            url=feed_config["url"],
+            description=feed_config.get("description", ""),
+            section=feed_config.get("section", "general")
+        )
+        db.add(db_feed)
+    
+    # Scheduling settings always follow the config
+    db_feed.section = feed_config.get("section", db_feed.section or "general")
+    db_feed.priority = feed_config.get("priority", 0)
+    db_feed.poll_interval = feed_config.get("interval")
+    db_feed.enabled = True
+    
+    return db_feed
 
 def add_rss_feed(db: Session, feed_data: Dict[str, Any]):
     """
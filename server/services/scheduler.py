@@ -0,0 +1,247 @@
+import asyncio
+import random
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+from database.db import run_in_session
+from models.models import ScheduledJob
+from services.pipeline import db_writer
+
+class Job:
+    """
+    A periodic task
+    - job_id: unique name, e.g. "youtube:<channel_id>" or "rss:<feed_id>"
+    - func: coroutine function called with no arguments
+    - interval: seconds between runs
+    - jitter: fraction of the interval added or subtracted at random
+    - priority: due jobs with a higher priority are started first
+    - adapt: optional coroutine function that receives the result of func and
+      returns the interval to use from now on, for sources that adapt their polling rate
+    """
+
+    def __init__(
+        self,
+        job_id: str,
+        func: Callable[[], Awaitable],
+        interval: float,
+        jitter: float = 0.1,
+        priority: int = 0,
+        adapt: Optional[Callable[[Any], Awaitable[float]]] = None
+    ):
+        self.id = job_id
+        self.func = func
+        self.interval = interval
+        self.jitter = jitter
+        self.priority = priority
+        self.adapt = adapt
+        self.next_run_at: Optional[datetime] = None
+
+    def next_run_after(self, now: datetime) -> datetime:
+        spread = self.interval * self.jitter
+        return now + timedelta(seconds=self.interval + random.uniform(-spread, spread))
+
+def _read_schedule(db):
+    return db.query(ScheduledJob.id, ScheduledJob.next_run_at, ScheduledJob.interval_seconds).all()
+
+def _store_schedule(
+    db,
+    job_id: str,
+    next_run_at: Optional[datetime],
+    interval_seconds: int,
+    last_run_at: Optional[datetime] = None,
+    last_status: Optional[str] = None
+):
+    """Write a job's schedule to scheduled_jobs, without committing"""
+    row = db.query(ScheduledJob).filter(ScheduledJob.id == job_id).first()
+    if not row:
+        row = ScheduledJob(id=job_id)
+        db.add(row)
+        # A later save of the same job in this transaction must find the row
+        db.flush()
+
+    row.next_run_at = next_run_at
+    row.interval_seconds = interval_seconds
+    if last_run_at:
+        row.last_run_at = last_run_at
+    if last_status:
+        row.last_status = last_status
+
+class Scheduler:
+    """
+    Runs jobs concurrently on independent intervals
+    A job never overlaps with itself, and next-run times are stored in the
+    scheduled_jobs table so a restart resumes the schedule instead of re-fetching everything
+    """
+
+    def __init__(self, max_concurrent: int = 4, tick: float = 5):
+        self.jobs: Dict[str, Job] = {}
+        self.running: Set[str] = set()
+        # References to the running job tasks, so they are not garbage collected mid-run
+        self._tasks: Set[asyncio.Task] = set()
+        # Jobs held back while run_exclusive waits for or runs its function
+        self._reserved: Set[str] = set()
+        self.max_concurrent = max_concurrent
+        self.tick = tick
+        self._wakeup: Optional[asyncio.Event] = None
+        # Stored (next_run_at, interval_seconds) of jobs not registered yet, see load_state
+        self._stored: Dict[str, Tuple[Optional[datetime], Optional[int]]] = {}
+
+    def add_job(self, job: Job):
+        """
+        Register or update a job
+        Keeps the current schedule of a job that is already registered, otherwise
+        resumes from the stored next-run time. Adaptive jobs also keep their
+        learned interval.
+        """
+        existing = self.jobs.get(job.id)
+        if existing:
+            job.next_run_at = existing.next_run_at
+            if job.adapt:
+                job.interval = existing.interval
+        else:
+            self._load_state(job)
+
+        self.jobs[job.id] = job
+
+    def remove_job(self, job_id: str):
+        self.jobs.pop(job_id, None)
+
+    def trigger(self, job_id: str):
+        """Run a job as soon as possible"""
+        job = self.jobs.get(job_id)
+        if job:
+            job.next_run_at = datetime.utcnow()
+            if self._wakeup:
+                self._wakeup.set()
+
+    def run_exclusive(self, job_id: str, func: Callable[[], Awaitable]) -> asyncio.Task:
+        """
+        Run func in the background in place of a run of job_id, e.g. a full
+        backfill of a channel that is also polled
+        Waits for a run of the job in progress to finish, and the job is not
+        started while func runs
+        """
+        task = asyncio.create_task(self._run_exclusive(job_id, func))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _run_exclusive(self, job_id: str, func: Callable[[], Awaitable]):
+        self._reserved.add(job_id)
+        try:
+            while job_id in self.running:
+                await asyncio.sleep(1)
+
+            self.running.add(job_id)
+            try:
+                await func()
+            finally:
+                self.running.discard(job_id)
+        except Exception as e:
+            print(f"Error running {job_id} outside its schedule: {e}")
+        finally:
+            self._reserved.discard(job_id)
+            if self._wakeup:
+                self._wakeup.set()
+
+    async def load_state(self):
+        """
+        Read the stored schedule of every job, before the jobs are registered
+        Jobs registered later resume from it, without a query each
+        """
+        rows = await run_in_session(_read_schedule)
+        self._stored = {job_id: (next_run_at, interval) for job_id, next_run_at, interval in rows}
+
+    def _load_state(self, job: Job):
+        """Restore a job's next run time, and its interval if adaptive, from the stored schedule"""
+        now = datetime.utcnow()
+        next_run_at, interval = self._stored.pop(job.id, (None, None))
+
+        if job.adapt and interval:
+            job.interval = interval
+
+        if next_run_at and next_run_at > now:
+            job.next_run_at = next_run_at
+        else:
+            # New or overdue jobs are spread over the jitter window instead of all firing at once
+            job.next_run_at = now + timedelta(seconds=random.uniform(0, job.interval * job.jitter))
+
+    async def _save(self, job: Job, last_run_at: Optional[datetime] = None, last_status: Optional[str] = None):
+        """
+        Store a job's schedule through the shared DB writer, batched with the
+        saves of other jobs and the ingestion writes
+        """
+        try:
+            await db_writer.submit(
+                _store_schedule, job.id, job.next_run_at, int(job.interval), last_run_at, last_status
+            )
+        except Exception as e:
+            print(f"Error saving schedule for job {job.id}: {e}")
+
+    async def _run_job(self, job: Job, limit: asyncio.Semaphore):
+        status = "ok"
+        try:
+            async with limit:
+                # Store the next run before this one, so a crash mid-run does not repeat it right away
+                await self._save(job)
+                started_at = datetime.utcnow()
+                result = await job.func()
+
+            if job.adapt:
+                interval = await job.adapt(result)
+                if interval != job.interval:
+                    job.interval = interval
+                    job.next_run_at = job.next_run_after(started_at)
+        except Exception as e:
+            status = f"error: {e}"
+            print(f"Error in scheduled job {job.id}: {e}")
+        finally:
+            self.running.discard(job.id)
+            await self._save(job, last_run_at=datetime.utcnow(), last_status=status[:255])
+
+    async def run(self):
+        """Run due jobs forever"""
+        self._wakeup = asyncio.Event()
+        limit = asyncio.Semaphore(self.max_concurrent)
+
+        while True:
+            now = datetime.utcnow()
+
+            # Start due jobs, highest priority first; the semaphore admits them in that order
+            due = [
+                job for job in self.jobs.values()
+                if job.id not in self.running and job.id not in self._reserved and job.next_run_at <= now
+            ]
+            for job in sorted(due, key=lambda job: job.priority, reverse=True):
+                self.running.add(job.id)
+                job.next_run_at = job.next_run_after(now)
+                task = asyncio.create_task(self._run_job(job, limit))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+            # Sleep until the next job is due, waking up early on trigger()
+            upcoming = [
+                job.next_run_at for job in self.jobs.values()
+                if job.id not in self.running and job.id not in self._reserved
+            ]
+            delay = self.tick
+            if upcoming:
+                delay = min(delay, max((min(upcoming) - datetime.utcnow()).total_seconds(), 0))
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def status(self):
+        """Schedule of every registered job, for the API"""
+        return [
+            {
+                "id": job.id,
+                "interval": job.interval,
+                "priority": job.priority,
+                "next_run_at": job.next_run_at.isoformat() if job.next_run_at else None,
+                "running": job.id in self.running
+            }
+            for job in sorted(self.jobs.values(), key=lambda job: job.next_run_at or datetime.max)
+        ]
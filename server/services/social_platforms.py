@@ -0,0 +1,116 @@
+import httpx
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+from services.http_client import get_http_client
+
+class PlatformAdapter:
+    """
+    Fetches new posts for one social media platform
+    Adapters return social_posts rows plus the checkpoint to pass as since_id next time
+    """
+
+    platform = ""
+
+    async def fetch_posts(
+        self,
+        account,
+        since_id: Optional[str],
+        limit: int
+    ) -> Tuple[List[Dict[str, Any]], Optional[str], Optional[str]]:
+        """
+        Return (posts, newest_id, platform_account_id) for an account
+        - since_id: newest post ID seen on the previous poll; only newer posts are returned
+        """
+        raise NotImplementedError
+
+class MastodonAdapter(PlatformAdapter):
+    """
+    Mastodon public API; works against any instance without authentication
+    The instance is taken from the account's profile_url, e.g. https://mastodon.social/@user
+    """
+
+    platform = "mastodon"
+
+    # Maximum page size for the statuses endpoint
+    MAX_LIMIT = 40
+
+    @staticmethod
+    def _instance(account) -> str:
+        parsed = urlparse(account.profile_url)
+        return f"{parsed.scheme}://{parsed.netloc}"
+
+    async def _lookup_account_id(self, client: httpx.AsyncClient, instance: str, username: str) -> str:
+        response = await client.get(f"{instance}/api/v1/accounts/lookup", params={"acct": username.lstrip("@")})
+        response.raise_for_status()
+        return response.json()["id"]
+
+    @staticmethod
+    def _to_row(account, status: Dict[str, Any]) -> Dict[str, Any]:
+        # Boosts carry the original post in "reblog"
+        original = status.get("reblog") or status
+        media = original.get("media_attachments") or []
+
+        return {
+            "id": f"{account.id}_{status['id']}",
+            "account_id": account.id,
+            "platform": account.platform,
+            "content": original.get("content", ""),
+            "posted_at": datetime.fromisoformat(status["created_at"].replace("Z", "+00:00")).replace(tzinfo=None),
+            "url": original.get("url") or status.get("uri", ""),
+            "media_url": (media[0].get("preview_url") or media[0].get("url", "")) if media else "",
+            "likes": original.get("favourites_count", 0),
+            "shares": original.get("reblogs_count", 0),
+            "comments": original.get("replies_count", 0)
+        }
+
+    @staticmethod
+    def _newest_id(statuses: List[Dict[str, Any]]) -> str:
+        # Status IDs are numeric strings; a longer ID is a larger number
+        return max((status["id"] for status in statuses), key=lambda status_id: (len(status_id), status_id))
+
+    async def fetch_posts(self, account, since_id, limit):
+        client = get_http_client()
+        instance = self._instance(account)
+
+        platform_account_id = account.platform_account_id
+        if not platform_account_id:
+            platform_account_id = await self._lookup_account_id(client, instance, account.username)
+
+        url = f"{instance}/api/v1/accounts/{platform_account_id}/statuses"
+        params = {"limit": min(limit, self.MAX_LIMIT), "exclude_replies": "true"}
+
+        if not since_id:
+            # First poll: only the latest page, without the account's history
+            response = await client.get(url, params=params)
+            response.raise_for_status()
+            statuses = response.json()
+        else:
+            # since_id would return the newest page and skip anything older than it,
+            # so walk forward from the checkpoint with min_id, oldest page first,
+            # until a page comes back empty or the per-poll limit is reached.
+            # Posts left over are newer than the new checkpoint and come next poll.
+            statuses = []
+            min_id = since_id
+            while len(statuses) < limit:
+                response = await client.get(url, params={**params, "min_id": min_id})
+                response.raise_for_status()
+                page = response.json()
+                if not page:
+                    break
+                statuses.extend(page)
+                min_id = self._newest_id(page)
+
+        posts = [self._to_row(account, status) for status in statuses]
+        # Stored together with the posts, so the checkpoint only moves past posts that were stored
+        newest_id = self._newest_id(statuses) if statuses else since_id
+
+        return posts, newest_id, platform_account_id
+
+# Platforms we can ingest from, keyed by SocialAccount.platform
+ADAPTERS: Dict[str, PlatformAdapter] = {
+    adapter.platform: adapter for adapter in (MastodonAdapter(),)
+}
+
+def get_adapter(platform: str) -> Optional[PlatformAdapter]:
+    return ADAPTERS.get((platform or "").lower())
@@ -1,10 +1,22 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import desc
+from database.db import run_in_session
 from models.models import SocialAccount, SocialPost
+from services.pipeline import Pipeline, Stage, db_writer, PIPELINE_WRITE_BATCH
+from services.repository import bulk_insert_ignore, fill_source_labels
+from services.social_platforms import get_adapter
 from typing import List, Optional, Dict, Any
+import os
 import uuid
 from datetime import datetime
 
+# Maximum number of accounts fetched at the same time
+SOCIAL_FETCH_CONCURRENCY = int(os.getenv("SOCIAL_FETCH_CONCURRENCY", "20"))
+# Maximum number of posts requested per account and poll
+SOCIAL_FETCH_LIMIT = int(os.getenv("SOCIAL_FETCH_LIMIT", "200"))
+# Rows per executemany batch and per IN (...) lookup
+SOCIAL_BATCH_SIZE = 500
+
 def get_social_posts(
     db: Session, 
     section: Optional[str] = None, 
@@ -19,16 +31,11 @@ def get_social_posts(
     - cursor: Last post's ID or posted_at timestamp (optional)
     - limit: Maximum number of posts to return
     """
-    query = db.query(
-        SocialPost,
-        SocialAccount.display_name.label("author"),
-        SocialAccount.avatar_url.label("author_image_url"),
-        SocialAccount.section
-    ).join(SocialAccount)
+    query = db.query(SocialPost, SocialPost.author, SocialPost.author_image_url, SocialPost.section)
     
     # Apply filters
     if section and section.lower() != "all":
-        query = query.filter(SocialAccount.section == section)
+        query = query.filter(SocialPost.section == section)
     
     if platform:
         query = query.filter(SocialPost.platform == platform)
@@ -86,7 +93,7 @@ def add_social_account(db: Session, account_data: Dict[str, Any]):
     """
     try:
         # Create account ID
-        account_id = f"{account_data['platform'].lower()}_{account_data['username']}"
+        account_id = social_account_id(account_data)
         
         # Check if account already exists
         existing_account = db.query(SocialAccount).filter(SocialAccount.id == account_id).first()
@@ -116,6 +123,33 @@ def add_social_account(db: Session, account_data: Dict[str, Any]):
         db.rollback()
         raise
 
+def social_account_id(account_data: Dict[str, Any]) -> str:
+    return f"{account_data['platform'].lower()}_{account_data['username']}"
+
+def ensure_social_account(db: Session, account_data: Dict[str, Any]):
+    """
+    Create or update the account row for a config entry, without committing
+    Profile details always follow the config; ingestion checkpoints are kept
+    """
+    account_id = social_account_id(account_data)
+    account = db.query(SocialAccount).filter(SocialAccount.id == account_id).first()
+    if not account:
+        account = SocialAccount(
+            id=account_id,
+            platform=account_data["platform"],
+            username=account_data["username"],
+            last_updated=datetime.utcnow()
+        )
+        db.add(account)
+    
+    account.display_name = account_data.get("display_name", account_data["username"])
+    account.profile_url = account_data["profile_url"]
+    account.avatar_url = account_data.get("avatar_url", "")
+    account.section = account_data.get("section", "general")
+    account.enabled = True
+    
+    return account
+
 def add_social_post(db: Session, post_data: Dict[str, Any]):
     """
     Add a new social media post to the database
@@ -142,6 +176,8 @@ def add_social_post(db: Session, post_data: Dict[str, Any]):
             shares=post_data.get("shares", 0),
             comments=post_data.get("comments", 0)
         )
+        for column, value in fill_source_labels(db, SocialPost, [{"account_id": new_post.account_id}])[0].items():
+            setattr(new_post, column, value)
         
         db.add(new_post)
         db.commit()
@@ -154,37 +190,108 @@ def add_social_post(db: Session, post_data: Dict[str, Any]):
         db.rollback()
         raise
 
-async def fetch_social_posts(db: Session, platform_api, account_id: str, limit: int = 20):
+def insert_social_posts(db: Session, posts: List[Dict[str, Any]]) -> int:
     """
-    Fetch recent posts from a social media platform API
-    This is a placeholder function - you would need to implement platform-specific APIs
+    Bulk-insert social posts, ignoring ones that are already stored, without committing
+    Returns the number of posts submitted
     """
-    try:
-        account = db.query(SocialAccount).filter(SocialAccount.id == account_id).first()
-        if not account:
-            raise ValueError(f"Account not found: {account_id}")
-        
-        # This is where you would call the specific platform API
-        # For example:
-        # if account.platform.lower() == 'twitter':
-        #     posts = await fetch_twitter_posts(platform_api, account.username, limit)
-        # elif account.platform.lower() == 'facebook':
-        #     posts = await fetch_facebook_posts(platform_api, account.username, limit)
-        
-        # For now, we'll just return a placeholder
-        posts = []
-        
-        # Save posts to database
-        for post_data in posts:
-            post_data["account_id"] = account_id
-            post_data["platform"] = account.platform
-            add_social_post(db, post_data)
-        
-        return posts
+    if not posts:
+        return 0
+    
+    fill_source_labels(db, SocialPost, posts)
+    bulk_insert_ignore(db, SocialPost, posts, SOCIAL_BATCH_SIZE, index_elements=[SocialPost.id])
+    
+    return len(posts)
+
+async def _fetch_account_posts(account, limit: int):
+    """
+    Fetch new posts for one account through its platform adapter
+    Returns (account, posts, newest_id, platform_account_id), or None if the platform is unsupported or the fetch failed
+    """
+    adapter = get_adapter(account.platform)
+    if not adapter:
+        return None
     
+    try:
+        posts, newest_id, platform_account_id = await adapter.fetch_posts(account, account.since_id, limit)
+        return account, posts, newest_id, platform_account_id
     except Exception as e:
-        print(f"Error fetching social posts for account {account_id}: {e}")
-        return []
+        print(f"Error fetching social posts for account {account.id}: {e}")
+        return None
+
+async def _fetch_posts_stage(item):
+    account, limit = item
+    result = await _fetch_account_posts(account, limit)
+    if not result:
+        return None
+    
+    # Only plain data is handed to the writer, which uses its own session
+    account, posts, newest_id, platform_account_id = result
+    return account.id, posts, newest_id, platform_account_id
+
+async def _write_posts_stage(item) -> int:
+    return await db_writer.submit(store_account_posts, *item)
+
+def store_account_posts(
+    db: Session,
+    account_id: str,
+    posts: List[Dict[str, Any]],
+    newest_id: Optional[str],
+    platform_account_id: Optional[str]
+) -> int:
+    """
+    Store the new posts of one account and advance its since_id checkpoint, without committing
+    Returns the number of new posts
+    """
+    account = db.query(SocialAccount).filter(SocialAccount.id == account_id).first()
+    if account:
+        account.since_id = newest_id
+        account.platform_account_id = platform_account_id
+        account.last_updated = datetime.utcnow()
+    
+    existing_ids = set()
+    post_ids = [post["id"] for post in posts]
+    for start in range(0, len(post_ids), SOCIAL_BATCH_SIZE):
+        chunk = post_ids[start:start + SOCIAL_BATCH_SIZE]
+        existing_ids.update(
+            post_id for (post_id,) in db.query(SocialPost.id).filter(SocialPost.id.in_(chunk)).all()
+        )
+    
+    new_posts = [post for post in posts if post["id"] not in existing_ids]
+    insert_social_posts(db, new_posts)
+    return len(new_posts)
+
+# Fetch and store; adapters return rows that are already normalized
+social_pipeline = Pipeline("social", [
+    Stage("fetch", _fetch_posts_stage, workers=SOCIAL_FETCH_CONCURRENCY),
+    Stage("write", _write_posts_stage, workers=PIPELINE_WRITE_BATCH)
+])
+
+def get_enabled_accounts(db: Session, account_ids: Optional[List[str]] = None) -> List[SocialAccount]:
+    query = db.query(SocialAccount).filter(SocialAccount.enabled.is_(True))
+    if account_ids is not None:
+        query = query.filter(SocialAccount.id.in_(account_ids))
+    return query.all()
+
+async def fetch_social_posts(account_ids: Optional[List[str]] = None, limit: int = SOCIAL_FETCH_LIMIT):
+    """
+    Fetch new posts for social media accounts and store them
+    - account_ids: accounts to fetch (optional, defaults to all enabled accounts)
+    - limit: maximum number of posts per account and poll
+    Accounts are fetched concurrently, at most SOCIAL_FETCH_CONCURRENCY at a time,
+    and each poll only asks for posts newer than the account's since_id checkpoint.
+    Posts are stored by the shared DB writer, in batched transactions.
+    Returns the number of new posts
+    """
+    accounts = await run_in_session(get_enabled_accounts, account_ids)
+    
+    unsupported = {account.platform for account in accounts if not get_adapter(account.platform)}
+    if unsupported:
+        print(f"No ingestion adapter for platforms: {', '.join(sorted(unsupported))}")
+    
+    return sum(await social_pipeline.run(
+        (account, limit) for account in accounts if get_adapter(account.platform)
+    ))
 
 # Example implementation for Twitter/X API (placeholder)
 async def fetch_twitter_posts(api_client, username: str, limit: int = 20):
@@ -208,27 +315,3 @@ async def fetch_twitter_posts(api_client, username: str, limit: int = 20):
         }
         for i in range(1, limit + 1)
     ]
-
-# Example implementation for Mastodon API (placeholder)
-async def fetch_mastodon_posts(api_client, username: str, limit: int = 20):
-    """
-    Fetch recent toots from a Mastodon account
-    This is a placeholder - you would need to implement the actual Mastodon API
-    """
-    # This would be replaced with actual Mastodon API calls
-    # Using a library like Mastodon.py
-    
-    # Placeholder data
-    return [
-        {
-            "id": f"toot_{i}_{username}",
-            "content": f"Example toot {i} from {username}",
-            "posted_at": datetime.utcnow(),
-            "url": f"https://mastodon.social/@{username}/{i}",
-            "likes": i * 8,
-            "shares": i * 3,
-            "comments": i * 1
-        }
-        for i in range(1, limit + 1)
-    ]
-    
\ No newline at end of file
@@ -0,0 +1,140 @@
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List
+from sqlalchemy import bindparam, or_, update
+from dotenv import load_dotenv
+from database.db import run_in_session
+from models.models import Video
+from services.pipeline import db_writer
+
+# Load environment variables
+load_dotenv()
+
+# videos.list accepts at most 50 IDs per call, each call costs one quota unit
+VIDEOS_LIST_BATCH_SIZE = 50
+# Statistics older than this are refreshed, in seconds
+YOUTUBE_STATS_MAX_AGE = int(os.getenv("YOUTUBE_STATS_MAX_AGE", "86400"))
+# Upper bound on videos.list calls per statistics refresh run
+YOUTUBE_STATS_MAX_CALLS = int(os.getenv("YOUTUBE_STATS_MAX_CALLS", "20"))
+# Upper bound on videos.list calls per new video enrichment run
+YOUTUBE_ENRICH_MAX_CALLS = int(os.getenv("YOUTUBE_ENRICH_MAX_CALLS", "20"))
+
+DETAIL_FIELDS = ("duration", "view_count", "live_status")
+
+def _store_details(db, batch: List[str], details: Dict[str, dict], now: datetime) -> int:
+    """
+    Write the fetched details that changed and bump the timestamp on the rest of the batch
+    Runs on the DB writer, which commits; returns the number of rows whose details changed
+    """
+    current: Dict[str, tuple] = {
+        row[0]: row[1:] for row in
+        db.query(Video.id, Video.duration, Video.view_count, Video.live_status)
+        .filter(Video.id.in_(batch)).all()
+    }
+
+    changed = []
+    for video_id, fetched in details.items():
+        values = tuple(fetched[field] for field in DETAIL_FIELDS)
+        if current.get(video_id) != values:
+            changed.append({"_id": video_id, "details_updated_at": now, **fetched})
+
+    if changed:
+        stmt = update(Video).where(Video.id == bindparam("_id")).values(
+            duration=bindparam("duration"),
+            view_count=bindparam("view_count"),
+            live_status=bindparam("live_status"),
+            details_updated_at=bindparam("details_updated_at")
+        )
+        db.connection().execute(stmt, changed)
+
+    # Unchanged and unavailable videos only get their timestamp bumped, in one statement
+    changed_ids = {row["_id"] for row in changed}
+    unchanged_ids = [video_id for video_id in batch if video_id not in changed_ids]
+    if unchanged_ids:
+        db.query(Video).filter(Video.id.in_(unchanged_ids)).update(
+            {Video.details_updated_at: now}, synchronize_session=False
+        )
+
+    return len(changed)
+
+async def _enrich_batches(youtube_service, video_ids: List[str]) -> int:
+    """
+    Fetch details for the given videos 50 at a time and write only what changed
+    Stops early once the quota runs low; returns the number of rows whose details changed
+    """
+    changed_total = 0
+
+    for start in range(0, len(video_ids), VIDEOS_LIST_BATCH_SIZE):
+        if youtube_service.quota.is_low():
+            print("YouTube quota low, leaving remaining videos for the next run")
+            break
+
+        batch = video_ids[start:start + VIDEOS_LIST_BATCH_SIZE]
+        details = await youtube_service.get_videos_details(batch)
+        if details is None:
+            # API error; leave the batch for the next run
+            continue
+
+        changed_total += await db_writer.submit(_store_details, batch, details, datetime.utcnow())
+
+    return changed_total
+
+def _unenriched_video_ids(db) -> List[str]:
+    """
+    Newest videos that have never been enriched, capped at one run's worth of calls
+    """
+    return [
+        video_id for (video_id,) in
+        db.query(Video.id).filter(Video.details_updated_at.is_(None))
+        .order_by(Video.published_at.desc())
+        .limit(YOUTUBE_ENRICH_MAX_CALLS * VIDEOS_LIST_BATCH_SIZE).all()
+    ]
+
+def _stale_video_ids(db) -> List[str]:
+    """
+    Videos whose statistics are stale or that are live or upcoming, oldest first
+    """
+    stale_before = datetime.utcnow() - timedelta(seconds=YOUTUBE_STATS_MAX_AGE)
+    return [
+        video_id for (video_id,) in
+        db.query(Video.id).filter(or_(
+            Video.details_updated_at < stale_before,
+            Video.live_status.in_(("live", "upcoming"))
+        ))
+        .order_by(Video.details_updated_at)
+        .limit(YOUTUBE_STATS_MAX_CALLS * VIDEOS_LIST_BATCH_SIZE).all()
+    ]
+
+async def enrich_new_videos(youtube_service) -> int:
+    """
+    Fetch duration, view count and live status for videos that have never been enriched
+    Skipped while the quota is low; returns the number of videos updated
+    """
+    if youtube_service.quota.is_low():
+        print("YouTube quota low, skipping new video enrichment")
+        return 0
+
+    video_ids = await run_in_session(_unenriched_video_ids)
+    if not video_ids:
+        return 0
+
+    changed = await _enrich_batches(youtube_service, video_ids)
+    print(f"Enriched {changed} of {len(video_ids)} new videos")
+    return changed
+
+async def refresh_video_statistics(youtube_service) -> int:
+    """
+    Refresh statistics for videos whose details are stale, plus any live or upcoming ones
+    Runs on a slower cadence than discovery and is skipped while the quota is low
+    """
+    if youtube_service.quota.is_low():
+        print("YouTube quota low, skipping video statistics refresh")
+        return 0
+
+    video_ids = await run_in_session(_stale_video_ids)
+    if not video_ids:
+        return 0
+
+    changed = await _enrich_batches(youtube_service, video_ids)
+    print(f"Refreshed statistics for {len(video_ids)} videos, {changed} changed")
+    return changed
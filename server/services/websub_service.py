@@ -0,0 +1,264 @@
+import asyncio
+import feedparser
+import hashlib
+import hmac
+import os
+import secrets
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+from database.db import run_in_session
+from models.models import Channel, RssFeed, Video, WebSubSubscription
+from services.http_client import get_http_client
+from services.pipeline import db_writer
+from services.repository import update_videos_for_channel
+from services.rss_service import insert_new_articles
+
+# Load environment variables
+load_dotenv()
+
+# Public URL of the callback route, e.g. https://example.org/api/websub/callback
+# WebSub is disabled when this is not set
+WEBSUB_CALLBACK_URL = os.getenv("WEBSUB_CALLBACK_URL", "").rstrip("/")
+# Hub used for YouTube channels
+WEBSUB_YOUTUBE_HUB = os.getenv("WEBSUB_YOUTUBE_HUB", "https://pubsubhubbub.appspot.com/subscribe")
+# Send every subscription to this hub instead, e.g. a local stand-in hub for testing
+WEBSUB_HUB_URL = os.getenv("WEBSUB_HUB_URL", "")
+# Requested lease length, and how long before expiry a lease is renewed (seconds)
+WEBSUB_LEASE_SECONDS = int(os.getenv("WEBSUB_LEASE_SECONDS", "432000"))
+WEBSUB_RENEW_MARGIN = int(os.getenv("WEBSUB_RENEW_MARGIN", "86400"))
+
+YOUTUBE_TOPIC_URL = "https://www.youtube.com/xml/feeds/videos.xml?channel_id={channel_id}"
+
+def websub_enabled() -> bool:
+    return bool(WEBSUB_CALLBACK_URL)
+
+def youtube_topic(channel_id: str) -> str:
+    return YOUTUBE_TOPIC_URL.format(channel_id=channel_id)
+
+def get_active_subscriptions(db: Session) -> Dict[str, WebSubSubscription]:
+    """Active, unexpired subscriptions keyed by "<source_type>:<source_id>" """
+    now = datetime.utcnow()
+    subscriptions = db.query(WebSubSubscription).filter(
+        WebSubSubscription.status == "active",
+        WebSubSubscription.lease_expires_at > now
+    ).all()
+    return {f"{sub.source_type}:{sub.source_id}": sub for sub in subscriptions}
+
+def get_subscription(db: Session, subscription_id: str) -> Optional[WebSubSubscription]:
+    return db.query(WebSubSubscription).filter(WebSubSubscription.id == subscription_id).first()
+
+def _prepare_subscription(db: Session, source_type: str, source_id: str, topic: str, hub: str, mode: str) -> Dict[str, str]:
+    """
+    Create or update the subscription row for a request to the hub, without committing
+    Returns the id, hub and secret the request is sent with
+    """
+    subscription_id = f"{source_type}_{source_id}"
+    sub = db.query(WebSubSubscription).filter(WebSubSubscription.id == subscription_id).first()
+    if not sub:
+        sub = WebSubSubscription(
+            id=subscription_id,
+            source_type=source_type,
+            source_id=source_id,
+            secret=secrets.token_hex(20)
+        )
+        db.add(sub)
+
+    sub.topic = topic
+    sub.hub = WEBSUB_HUB_URL or hub
+    if mode == "subscribe" and sub.status != "active":
+        sub.status = "pending"
+    # Only a verification for this mode is confirmed from now on
+    sub.pending_mode = mode
+    return {"id": sub.id, "hub": sub.hub, "secret": sub.secret}
+
+async def request_subscription(
+    source_type: str,
+    source_id: str,
+    topic: str,
+    hub: str,
+    mode: str = "subscribe"
+) -> Optional[str]:
+    """
+    Ask a hub to (un)subscribe our callback to a topic
+    The hub confirms asynchronously by calling the callback with a challenge, so
+    the pending request is committed through the DB writer before it is sent
+    Returns the subscription ID
+    """
+    if not websub_enabled():
+        return None
+
+    sub = await db_writer.submit(_prepare_subscription, source_type, source_id, topic, hub, mode)
+
+    client = get_http_client()
+    try:
+        response = await client.post(sub["hub"], data={
+            "hub.callback": f"{WEBSUB_CALLBACK_URL}/{sub['id']}",
+            "hub.mode": mode,
+            "hub.topic": topic,
+            "hub.secret": sub["secret"],
+            "hub.lease_seconds": str(WEBSUB_LEASE_SECONDS),
+            "hub.verify": "async"
+        })
+        if response.status_code not in (202, 204):
+            print(f"Hub rejected {mode} for {topic}: HTTP {response.status_code}")
+            await db_writer.submit(_clear_pending, sub["id"], mode)
+    except Exception as e:
+        print(f"Error sending WebSub {mode} for {topic}: {e}")
+        await db_writer.submit(_clear_pending, sub["id"], mode)
+
+    return sub["id"]
+
+def _clear_pending(db: Session, subscription_id: str, mode: str):
+    """Forget a request the hub did not accept, so it cannot be verified later, without committing"""
+    sub = get_subscription(db, subscription_id)
+    if sub and sub.pending_mode == mode:
+        sub.pending_mode = None
+
+def verify_intent(db: Session, subscription_id: str, mode: str, topic: str, lease_seconds: Optional[int]) -> bool:
+    """
+    Check a hub's verification request against the request we sent
+    Only the mode we asked for is confirmed, once; a hub may deny a pending
+    subscribe. Anything else is rejected and leaves the subscription untouched
+    Returns True when the challenge should be echoed back
+    """
+    sub = db.query(WebSubSubscription).filter(WebSubSubscription.id == subscription_id).first()
+    if not sub or sub.topic != topic or not sub.pending_mode:
+        return False
+
+    if mode == "denied":
+        if sub.pending_mode != "subscribe":
+            return False
+        sub.status = "denied"
+    elif mode != sub.pending_mode:
+        return False
+    elif mode == "subscribe":
+        sub.status = "active"
+        sub.lease_expires_at = datetime.utcnow() + timedelta(seconds=lease_seconds or WEBSUB_LEASE_SECONDS)
+    else:
+        sub.status = "unsubscribed"
+        sub.lease_expires_at = None
+
+    sub.pending_mode = None
+    db.commit()
+    return True
+
+def verify_signature(secret: str, body: bytes, signature_header: Optional[str]) -> bool:
+    """
+    Validate an X-Hub-Signature header ("<algorithm>=<hex digest>") against the body
+    """
+    if not signature_header or "=" not in signature_header:
+        return False
+
+    algorithm, signature = signature_header.split("=", 1)
+    if algorithm not in ("sha1", "sha256", "sha384", "sha512"):
+        return False
+
+    expected = hmac.new(secret.encode(), body, getattr(hashlib, algorithm)).hexdigest()
+    return hmac.compare_digest(expected, signature.strip().lower())
+
+def _youtube_entries_to_videos(entries, channel_id: str) -> List[Dict[str, Any]]:
+    """Convert YouTube push Atom entries to the video dicts used by the repository"""
+    videos = []
+    for entry in entries:
+        video_id = entry.get("yt_videoid")
+        if not video_id:
+            continue
+
+        published = entry.get("published_parsed")
+        videos.append({
+            "id": video_id,
+            "title": entry.get("title", ""),
+            # The push payload carries no description; the next sync fills it in
+            "description": "",
+            "channel_id": entry.get("yt_channelid", channel_id),
+            "published_at": datetime(*published[:6]) if published else datetime.utcnow(),
+            "thumbnail_url": f"https://i.ytimg.com/vi/{video_id}/hqdefault.jpg"
+        })
+    return videos
+
+async def handle_push(subscription_id: str, body: bytes) -> int:
+    """
+    Store the entries from a verified content distribution request
+    Returns the number of new items stored
+    """
+    loop = asyncio.get_running_loop()
+    parsed = await loop.run_in_executor(None, feedparser.parse, body)
+
+    try:
+        return await db_writer.submit(store_push, subscription_id, parsed.entries)
+    except Exception as e:
+        print(f"Error handling WebSub push for {subscription_id}: {e}")
+        return 0
+
+def store_push(db: Session, subscription_id: str, entries) -> int:
+    """
+    Store pushed entries for a subscription, without committing
+    Pushes for a subscription that is no longer active are dropped
+    Returns the number of new items
+    """
+    sub = db.query(WebSubSubscription).filter(WebSubSubscription.id == subscription_id).first()
+    if not sub or sub.status != "active":
+        return 0
+
+    sub.last_push_at = datetime.utcnow()
+    new_items = 0
+
+    if sub.source_type == "youtube":
+        videos = _youtube_entries_to_videos(entries, sub.source_id)
+        # Only insert videos we do not have yet, so a push never blanks out
+        # the description stored by a full sync
+        known_ids = {
+            video_id for (video_id,) in
+            db.query(Video.id).filter(Video.id.in_([video["id"] for video in videos])).all()
+        }
+        new_videos = [video for video in videos if video["id"] not in known_ids]
+        new_items = update_videos_for_channel(db, sub.source_id, new_videos, commit=False)
+    elif sub.source_type == "rss":
+        new_items = insert_new_articles(db, sub.source_id, entries)
+
+    print(f"WebSub push for {sub.source_type}:{sub.source_id}: {new_items} new items")
+    return new_items
+
+def _due_subscriptions(db: Session) -> List[tuple]:
+    """
+    (source_type, source_id, topic, hub) of every enabled channel and every enabled
+    feed that advertises a hub whose subscription is missing, inactive or expires
+    within WEBSUB_RENEW_MARGIN
+    """
+    renew_before = datetime.utcnow() + timedelta(seconds=WEBSUB_RENEW_MARGIN)
+    subscriptions = {
+        sub.id: sub for sub in db.query(WebSubSubscription).all()
+    }
+
+    def needs_renewal(subscription_id: str) -> bool:
+        sub = subscriptions.get(subscription_id)
+        return (
+            not sub
+            or sub.status != "active"
+            or not sub.lease_expires_at
+            or sub.lease_expires_at < renew_before
+        )
+
+    due = []
+    for channel in db.query(Channel).filter(Channel.enabled.is_(True)).all():
+        if needs_renewal(f"youtube_{channel.id}"):
+            due.append(("youtube", channel.id, youtube_topic(channel.id), WEBSUB_YOUTUBE_HUB))
+
+    for feed in db.query(RssFeed).filter(RssFeed.websub_hub.isnot(None), RssFeed.enabled.is_(True)).all():
+        if needs_renewal(f"rss_{feed.id}"):
+            due.append(("rss", feed.id, feed.websub_topic or feed.url, feed.websub_hub))
+    return due
+
+async def renew_subscriptions():
+    """
+    Subscribe every channel and every feed that advertises a hub, renewing
+    leases that expire within WEBSUB_RENEW_MARGIN
+    The due subscriptions are read first, so no session is held while the hubs answer
+    """
+    if not websub_enabled():
+        return
+
+    for source_type, source_id, topic, hub in await run_in_session(_due_subscriptions):
+        await request_subscription(source_type, source_id, topic, hub)
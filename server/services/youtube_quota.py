@@ -0,0 +1,249 @@
+import asyncio
+import os
+import time
+from datetime import datetime, timezone, timedelta
+from typing import Dict, Any, Optional, Tuple
+from dotenv import load_dotenv
+from sqlalchemy import update
+from database.db import run_in_session
+from models.models import YouTubeQuotaUsage
+from services.pipeline import db_writer
+from services.repository import bulk_insert_ignore
+
+# Load environment variables
+load_dotenv()
+
+# Daily unit budget for the YouTube Data API (the default project quota is 10,000)
+YOUTUBE_DAILY_QUOTA = int(os.getenv("YOUTUBE_DAILY_QUOTA", "10000"))
+# Remaining units below which syncs degrade (first pages only, high-priority channels only)
+YOUTUBE_QUOTA_LOW_WATERMARK = int(os.getenv("YOUTUBE_QUOTA_LOW_WATERMARK", "1000"))
+# Token bucket: sustained requests per second and burst size
+YOUTUBE_RATE_PER_SECOND = float(os.getenv("YOUTUBE_RATE_PER_SECOND", "2"))
+YOUTUBE_RATE_BURST = int(os.getenv("YOUTUBE_RATE_BURST", "5"))
+
+# Unit cost of each Data API method we call
+# https://developers.google.com/youtube/v3/determine_quota_cost
+YOUTUBE_API_COSTS = {
+    "channels.list": 1,
+    "playlistItems.list": 1,
+    "videos.list": 1
+}
+
+# The quota resets at midnight Pacific time. A fixed UTC-8 offset resets an hour
+# after the real reset during daylight saving time, which errs on the safe side.
+QUOTA_TIMEZONE = timezone(timedelta(hours=-8))
+
+class QuotaExceededError(Exception):
+    """Raised when a call would exceed the remaining daily YouTube quota"""
+    pass
+
+def _read_usage(db, quota_day) -> Optional[Tuple[int, bool]]:
+    """Return (used, exhausted) stored for a quota day, or None if it has no row yet"""
+    return db.query(YouTubeQuotaUsage.used, YouTubeQuotaUsage.exhausted).filter(
+        YouTubeQuotaUsage.quota_day == quota_day
+    ).first()
+
+def _create_usage(db, quota_day) -> Optional[Tuple[int, bool]]:
+    """
+    Create the usage row of a quota day unless another process already did, without committing
+    Returns the stored (used, exhausted)
+    """
+    bulk_insert_ignore(db, YouTubeQuotaUsage, [{"quota_day": quota_day, "used": 0, "exhausted": False}])
+    return _read_usage(db, quota_day)
+
+def _update_usage(db, quota_day, values: Dict[str, Any]):
+    """Apply changes to the usage row of a quota day, without committing"""
+    db.execute(
+        update(YouTubeQuotaUsage)
+        .where(YouTubeQuotaUsage.quota_day == quota_day)
+        .values(updated_at=datetime.utcnow(), **values)
+    )
+
+class QuotaManager:
+    """
+    Tracks YouTube Data API unit usage against a daily budget and
+    rate-limits calls with a token bucket
+    Units used are stored per quota day in youtube_quota_usage, so a restart
+    does not hand out the day's budget again; the per-method call counts are
+    kept in memory only
+    """
+
+    def __init__(self, daily_budget: int, low_watermark: int, rate_per_second: float, burst: int):
+        self.daily_budget = daily_budget
+        self.low_watermark = low_watermark
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+
+        self.used = 0
+        self.exhausted = False
+        self.calls: Dict[str, int] = {}
+        self.quota_day = self._current_day()
+        # Quota day whose stored usage has been read
+        self._loaded_day = None
+
+        self._tokens = float(burst)
+        self._last_refill = time.monotonic()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            daily_budget=YOUTUBE_DAILY_QUOTA,
+            low_watermark=YOUTUBE_QUOTA_LOW_WATERMARK,
+            rate_per_second=YOUTUBE_RATE_PER_SECOND,
+            burst=YOUTUBE_RATE_BURST
+        )
+
+    @staticmethod
+    def _current_day():
+        return datetime.now(QUOTA_TIMEZONE).date()
+
+    def _roll_day(self):
+        """Reset usage when the quota day changes"""
+        today = self._current_day()
+        if today != self.quota_day:
+            self.quota_day = today
+            self.used = 0
+            self.exhausted = False
+            self.calls = {}
+
+    async def load(self):
+        """
+        Read the stored usage of the current quota day, creating its row if needed
+        """
+        self._roll_day()
+        quota_day = self.quota_day
+        try:
+            usage = await run_in_session(_read_usage, quota_day)
+            if usage is None:
+                usage = await db_writer.submit(_create_usage, quota_day)
+        except Exception as e:
+            print(f"Could not load YouTube quota usage: {e}")
+            return
+
+        if quota_day != self.quota_day:
+            return
+        if usage is not None:
+            # Calls charged while the row was being read are already counted in memory
+            used, exhausted = usage
+            self.used = max(self.used, used or 0)
+            self.exhausted = self.exhausted or bool(exhausted)
+        self._loaded_day = quota_day
+
+    async def _ensure_loaded(self):
+        self._roll_day()
+        if self._loaded_day != self.quota_day:
+            await self.load()
+
+    async def _store(self, **values):
+        """Apply changes to the current quota day's row through the DB writer"""
+        try:
+            await db_writer.submit(_update_usage, self.quota_day, values)
+        except Exception as e:
+            print(f"Could not store YouTube quota usage: {e}")
+
+    async def mark_exhausted(self):
+        """
+        Treat the rest of the quota day as used up, after the API answered quotaExceeded
+        """
+        await self._ensure_loaded()
+        if self.exhausted:
+            return
+        self.exhausted = True
+        print(f"YouTube API reported the quota exceeded after {self.used} counted units")
+        await self._store(exhausted=True)
+
+    @property
+    def remaining(self) -> int:
+        self._roll_day()
+        if self.exhausted:
+            return 0
+        return max(self.daily_budget - self.used, 0)
+
+    def is_low(self) -> bool:
+        """True once the remaining budget drops below the low watermark"""
+        return self.remaining < self.low_watermark
+
+    def can_afford(self, method: str) -> bool:
+        return YOUTUBE_API_COSTS[method] <= self.remaining
+
+    async def acquire(self, method: str):
+        """
+        Charge a call against the daily budget, waiting for a rate-limit token first
+        Raises QuotaExceededError if the budget cannot cover the call
+        """
+        await self._ensure_loaded()
+        if not self.can_afford(method):
+            raise QuotaExceededError(
+                f"YouTube quota exhausted: {self.remaining} units left, {method} costs {YOUTUBE_API_COSTS[method]}"
+            )
+
+        # Token bucket; no await between the check and the decrement, so no lock is needed
+        while True:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate_per_second)
+            self._last_refill = now
+
+            if self._tokens >= 1:
+                self._tokens -= 1
+                break
+
+            await asyncio.sleep((1 - self._tokens) / self.rate_per_second)
+
+        # Re-check after waiting, another call may have used the last units
+        if not self.can_afford(method):
+            raise QuotaExceededError(f"YouTube quota exhausted while waiting to call {method}")
+
+        cost = YOUTUBE_API_COSTS[method]
+        self.used += cost
+        self.calls[method] = self.calls.get(method, 0) + 1
+        # Increment rather than overwrite, so concurrent calls and processes all count
+        await self._store(used=YouTubeQuotaUsage.used + cost)
+
+    def status(self) -> Dict[str, Any]:
+        """Current quota usage, for the API and logs"""
+        remaining = self.remaining
+        return {
+            "quota_day": self.quota_day.isoformat(),
+            "daily_budget": self.daily_budget,
+            "used": self.used,
+            "remaining": remaining,
+            "exhausted": self.exhausted,
+            "low": remaining < self.low_watermark,
+            "calls": dict(self.calls)
+        }
+
+# Process-wide quota shared by every YouTube client
+quota_manager = QuotaManager.from_env()
+
+class QuotaManagedYouTubeService:
+    """
+    Wrapper around AsyncYouTubeService that charges every call to the quota manager
+    """
+
+    def __init__(self, service, quota: QuotaManager = quota_manager):
+        self.service = service
+        self.quota = quota
+
+    async def _call(self, func, *args):
+        try:
+            return await func(*args)
+        except QuotaExceededError:
+            # Our count drifted from Google's; stop calling until the quota resets
+            await self.quota.mark_exhausted()
+            raise
+
+    async def get_channel_info(self, channel_id):
+        await self.quota.acquire("channels.list")
+        return await self._call(self.service.get_channel_info, channel_id)
+
+    async def get_channels_info(self, channel_ids):
+        await self.quota.acquire("channels.list")
+        return await self._call(self.service.get_channels_info, channel_ids)
+
+    async def get_playlist_videos(self, playlist_id, max_results=10, page_token=None):
+        await self.quota.acquire("playlistItems.list")
+        return await self._call(self.service.get_playlist_videos, playlist_id, max_results, page_token)
+
+    async def get_videos_details(self, video_ids):
+        await self.quota.acquire("videos.list")
+        return await self._call(self.service.get_videos_details, video_ids)
@@ -1,21 +1,175 @@
-from googleapiclient.discovery import build
+from googleapiclient import version as googleapiclient_version
 from googleapiclient.errors import HttpError
+from googleapiclient.http import build_http
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import hashlib
+import json
 import os
+import re
+import threading
+from datetime import datetime
 from dotenv import load_dotenv
+from services.youtube_quota import QuotaManagedYouTubeService, QuotaExceededError
 
 # Load environment variables
 load_dotenv()
 
+# Worker threads available for blocking YouTube API calls
+YOUTUBE_MAX_WORKERS = int(os.getenv("YOUTUBE_MAX_WORKERS", "4"))
+# Directory of the pruned discovery document, written on first use and read on every later start
+YOUTUBE_DISCOVERY_CACHE_DIR = os.getenv("YOUTUBE_DISCOVERY_CACHE_DIR") or os.path.join(
+    os.path.dirname(__file__), "..", ".cache"
+)
+
+# The only Data API methods we call; everything else is pruned from the discovery document
+YOUTUBE_API_METHODS = {
+    "channels": ["list"],
+    "playlistItems": ["list"],
+    "videos": ["list"]
+}
+
+# Error reasons the Data API returns with a 403 once the daily quota is used up
+QUOTA_ERROR_REASONS = {"quotaExceeded", "dailyLimitExceeded"}
+
+# httplib2.Http objects are not thread-safe, so each worker thread gets its own
+_thread_local = threading.local()
+
+def _thread_http():
+    if not hasattr(_thread_local, "http"):
+        _thread_local.http = build_http()
+    return _thread_local.http
+
+def _raise_if_quota_exceeded(error: HttpError):
+    """
+    Raise QuotaExceededError for a quotaExceeded response, which would
+    otherwise look like any other failed call to the callers
+    """
+    if error.resp.status != 403:
+        return
+    try:
+        errors = json.loads(error.content.decode("utf-8"))["error"].get("errors", [])
+        reasons = {item.get("reason") for item in errors}
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return
+    if reasons & QUOTA_ERROR_REASONS:
+        raise QuotaExceededError(f"YouTube API quota exceeded: {error.reason}") from error
+
+_DURATION_PATTERN = re.compile(r"P(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?")
+
+def parse_duration(value):
+    """Convert an ISO 8601 duration such as PT1H2M3S to seconds"""
+    if not value:
+        return None
+    
+    match = _DURATION_PATTERN.fullmatch(value)
+    if not match:
+        return None
+    
+    days, hours, minutes, seconds = (int(part) if part else 0 for part in match.groups())
+    return ((days * 24 + hours) * 60 + minutes) * 60 + seconds
+
+def _collect_refs(node, refs):
+    """Add the names of all schemas referenced by $ref anywhere in node"""
+    if isinstance(node, dict):
+        if "$ref" in node:
+            refs.add(node["$ref"])
+        for value in node.values():
+            _collect_refs(value, refs)
+    elif isinstance(node, list):
+        for value in node:
+            _collect_refs(value, refs)
+
+def prune_discovery_document(document):
+    """
+    Keep only the resources and methods in YOUTUBE_API_METHODS and the schemas they
+    reference, which makes the document a fraction of its size to parse and build
+    """
+    resources = {
+        name: {"methods": {method: document["resources"][name]["methods"][method] for method in methods}}
+        for name, methods in YOUTUBE_API_METHODS.items()
+    }
+    
+    # Follow $refs until no new schema is reached
+    schemas = document.get("schemas", {})
+    kept = set()
+    pending = set()
+    _collect_refs(resources, pending)
+    while pending:
+        name = pending.pop()
+        if name in kept or name not in schemas:
+            continue
+        kept.add(name)
+        _collect_refs(schemas[name], pending)
+    
+    return {**document, "resources": resources, "schemas": {name: schemas[name] for name in kept}}
+
+def discovery_cache_path() -> str:
+    """
+    Path of the cached discovery document
+    The name carries the google-api-python-client version, whose bundled
+    document it is derived from, and a hash of YOUTUBE_API_METHODS, so an
+    upgrade or a new method never reads a stale document
+    """
+    methods = hashlib.sha256(json.dumps(YOUTUBE_API_METHODS, sort_keys=True).encode()).hexdigest()[:12]
+    return os.path.join(
+        YOUTUBE_DISCOVERY_CACHE_DIR,
+        f"youtube.v3.{googleapiclient_version.__version__}.{methods}.json"
+    )
+
+def load_discovery_document():
+    """
+    Return the pruned YouTube discovery document as JSON text
+    It is derived from the copy bundled with google-api-python-client, so no
+    network request is made, and cached on disk for later starts
+    """
+    cache_path = discovery_cache_path()
+    try:
+        with open(cache_path, "r") as f:
+            return f.read()
+    except FileNotFoundError:
+        pass
+    
+    # Imported here so processes that never call the API skip loading the discovery machinery
+    from googleapiclient.discovery_cache import get_static_doc
+    
+    document = json.dumps(prune_discovery_document(json.loads(get_static_doc("youtube", "v3"))))
+    try:
+        os.makedirs(YOUTUBE_DISCOVERY_CACHE_DIR, exist_ok=True)
+        # Write to a temporary file first so a concurrent reader never sees half a document
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(document)
+        os.replace(tmp_path, cache_path)
+        
+        # Documents cached for another client version or method set are never read again
+        for name in os.listdir(YOUTUBE_DISCOVERY_CACHE_DIR):
+            if name.startswith("youtube.v3.") and name.endswith(".json") and name != os.path.basename(cache_path):
+                os.remove(os.path.join(YOUTUBE_DISCOVERY_CACHE_DIR, name))
+    except OSError as e:
+        print(f"Could not cache YouTube discovery document: {e}")
+    
+    return document
+
 class YouTubeService:
     def __init__(self):
-        api_service_name = "youtube"
-        api_version = "v3"
-        api_key = os.getenv("YOUTUBE_API_KEY")
-        
-        if not api_key:
-            raise ValueError("YouTube API key not found in environment variables")
-            
-        self.youtube = build(api_service_name, api_version, developerKey=api_key)
+        # The API client is built on first use, so importing and constructing
+        # this class works without an API key
+        self._youtube = None
+        self._lock = threading.Lock()
+    
+    @property
+    def youtube(self):
+        if self._youtube is None:
+            with self._lock:
+                if self._youtube is None:
+                    api_key = os.getenv("YOUTUBE_API_KEY")
+                    if not api_key:
+                        raise ValueError("YouTube API key not found in environment variables")
+                    
+                    from googleapiclient.discovery import build_from_document
+                    self._youtube = build_from_document(load_discovery_document(), developerKey=api_key)
+        return self._youtube
     
     def get_channel_info(self, channel_id):
         """Fetch channel information including the uploads playlist ID"""
@@ -24,7 +178,7 @@ class YouTubeService:
                 part="snippet,contentDetails",
                 id=channel_id
             )
-            response = request.execute()
+            response = request.execute(http=_thread_http())
             
             if not response.get("items"):
                 return None
@@ -36,6 +190,33 @@ class YouTubeService:
                 "uploads_playlist_id": channel_info["contentDetails"]["relatedPlaylists"]["uploads"]
             }
         except HttpError as e:
+            _raise_if_quota_exceeded(e)
+            print(f"An HTTP error occurred: {e}")
+            return None
+    
+    def get_channels_info(self, channel_ids):
+        """
+        Fetch channel information for up to 50 channels in one call
+        Returns a dict keyed by channel ID; unknown channels are missing from it
+        """
+        try:
+            request = self.youtube.channels().list(
+                part="snippet,contentDetails",
+                id=",".join(channel_ids),
+                maxResults=len(channel_ids)
+            )
+            response = request.execute(http=_thread_http())
+            
+            return {
+                item["id"]: {
+                    "id": item["id"],
+                    "title": item["snippet"]["title"],
+                    "uploads_playlist_id": item["contentDetails"]["relatedPlaylists"]["uploads"]
+                }
+                for item in response.get("items", [])
+            }
+        except HttpError as e:
+            _raise_if_quota_exceeded(e)
             print(f"An HTTP error occurred: {e}")
             return None
     
@@ -53,7 +234,7 @@ class YouTubeService:
                 request_params["pageToken"] = page_token
                 
             request = self.youtube.playlistItems().list(**request_params)
-            response = request.execute()
+            response = request.execute(http=_thread_http())
             
             videos = []
             for item in response.get("items", []):
@@ -73,7 +254,7 @@ class YouTubeService:
                     "id": video_id,
                     "title": snippet["title"],
                     "description": snippet["description"],
-                    "published_at": snippet["publishedAt"],
+                    "published_at": datetime.fromisoformat(snippet["publishedAt"].replace("Z", "+00:00")).replace(tzinfo=None),
                     "thumbnail_url": thumbnail_url,
                     "channel_id": snippet["channelId"]
                 })
@@ -82,6 +263,78 @@ class YouTubeService:
             return videos, response.get("nextPageToken")
             
         except HttpError as e:
+            _raise_if_quota_exceeded(e)
             print(f"An HTTP error occurred: {e}")
             return [], None
-            
\ No newline at end of file
+    
+    def get_videos_details(self, video_ids):
+        """
+        Fetch duration, view count and live status for up to 50 videos in one call
+        Returns a dict keyed by video ID; deleted or private videos are missing from it
+        """
+        try:
+            request = self.youtube.videos().list(
+                part="snippet,contentDetails,statistics",
+                id=",".join(video_ids),
+                maxResults=len(video_ids)
+            )
+            response = request.execute(http=_thread_http())
+            
+            details = {}
+            for item in response.get("items", []):
+                statistics = item.get("statistics", {})
+                details[item["id"]] = {
+                    "duration": parse_duration(item.get("contentDetails", {}).get("duration")),
+                    "view_count": int(statistics["viewCount"]) if "viewCount" in statistics else None,
+                    "live_status": item.get("snippet", {}).get("liveBroadcastContent", "none")
+                }
+            
+            return details
+        
+        except HttpError as e:
+            _raise_if_quota_exceeded(e)
+            print(f"An HTTP error occurred: {e}")
+            return None
+
+class AsyncYouTubeService:
+    """
+    Async facade over YouTubeService
+    The blocking googleapiclient calls run on a dedicated thread pool so they
+    never block the event loop that serves HTTP requests
+    """
+    
+    def __init__(self, service: YouTubeService, max_workers: int = YOUTUBE_MAX_WORKERS):
+        self.service = service
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="youtube")
+    
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+    
+    async def get_channel_info(self, channel_id):
+        return await self._run(self.service.get_channel_info, channel_id)
+    
+    async def get_channels_info(self, channel_ids):
+        return await self._run(self.service.get_channels_info, channel_ids)
+    
+    async def get_playlist_videos(self, playlist_id, max_results=10, page_token=None):
+        return await self._run(self.service.get_playlist_videos, playlist_id, max_results, page_token)
+    
+    async def get_videos_details(self, video_ids):
+        return await self._run(self.service.get_videos_details, video_ids)
+
+# Process-wide client shared by the API routes, the scheduler and the config loader
+_youtube_service = None
+_youtube_service_lock = threading.Lock()
+
+def get_youtube_service() -> QuotaManagedYouTubeService:
+    """
+    Return the shared quota-managed YouTube client, creating it on first use
+    """
+    global _youtube_service
+    
+    if _youtube_service is None:
+        with _youtube_service_lock:
+            if _youtube_service is None:
+                _youtube_service = QuotaManagedYouTubeService(AsyncYouTubeService(YouTubeService()))
+    return _youtube_service
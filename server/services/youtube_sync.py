@@ -0,0 +1,51 @@
+from services.pipeline import db_writer
+from services.repository import update_videos_for_channel
+
+# playlistItems.list maximum; a page costs the same quota regardless of size
+PLAYLIST_PAGE_SIZE = 50
+
+async def sync_channel_videos(
+    youtube_service,
+    channel_id: str,
+    uploads_playlist_id: str,
+    full: bool = False
+) -> int:
+    """
+    Fetch a channel's uploads playlist and store its videos
+    - youtube_service: a QuotaManagedYouTubeService
+    - full: walk the whole playlist (backfill / reconcile). Otherwise stop at the
+      first page that contains no new videos, since uploads are listed newest-first
+    When the daily quota runs low only the first page is fetched
+    Pages are stored through the shared DB writer, in transactions batched with
+    the other ingestion pipelines
+    Returns the number of new videos stored
+    """
+    new_videos = 0
+    page_token = None
+    pages = 0
+
+    while True:
+        videos, page_token = await youtube_service.get_playlist_videos(
+            uploads_playlist_id, PLAYLIST_PAGE_SIZE, page_token
+        )
+        pages += 1
+
+        page_new = await db_writer.submit(update_videos_for_channel, channel_id, videos, False)
+        new_videos += page_new
+
+        if not page_token:
+            break
+
+        # Incremental mode: everything from here on is already known
+        if not full and page_new == 0:
+            break
+
+        # Degrade gracefully rather than run out of quota mid-day
+        if youtube_service.quota.is_low():
+            print(f"YouTube quota low, stopping sync of channel {channel_id} after {pages} pages")
+            break
+
+    mode = "full" if full else "incremental"
+    print(f"Synced channel {channel_id} ({mode}): {new_videos} new videos from {pages} pages")
+
+    return new_videos
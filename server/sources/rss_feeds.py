@@ -1,24 +1,40 @@
-import feedparser
+import asyncio
 from typing import List, Dict, Any
+from services.feed_fetcher import fetch_feed
+from services.feed_parser import parse_feed_async
+
+async def _fetch_rss_feed(url: str) -> List[Dict[str, Any]]:
+    try:
+        fetched = await fetch_feed(url)
+        if fetched["error"]:
+            raise ValueError(fetched["error"])
+
+        # Parse in the process pool instead of on the event loop
+        parsed = await parse_feed_async(fetched["content"])
+        if not parsed:
+            raise ValueError("not a feed")
+
+        feed, entries = parsed
+        results = []
+        for guid, title, link, author, published_at, summary, content, image_url in entries[:5]:  # Get latest 5 entries
+            results.append({
+                "type": "rss",
+                "source": feed[0],
+                "title": title,
+                "link": link,
+                "published": published_at.isoformat() if published_at else "Unknown",
+                "summary": summary or "No summary available"
+            })
+        return results
+    except Exception as e:
+        print(f"Error fetching RSS from {url}: {e}")
+        return []
 
 async def fetch_rss_feeds(urls: List[str]) -> List[Dict[str, Any]]:
     """Fetch content from RSS feeds."""
     results = []
-    
-    for url in urls:
-        try:
-            feed = feedparser.parse(url)
-            for entry in feed.entries[:5]:  # Get latest 5 entries
-                results.append({
-                    "type": "rss",
-                    "source": feed.feed.title,
-                    "title": entry.title,
-                    "link": entry.link,
-                    "published": entry.get("published", "Unknown"),
-                    "summary": entry.get("summary", "No summary available")
-                })
-        except Exception as e:
-            print(f"Error fetching RSS from {url}: {e}")
-    
+
+    for entries in await asyncio.gather(*(_fetch_rss_feed(url) for url in urls)):
+        results.extend(entries)
+
     return results
-    
\ No newline at end of file
@@ -0,0 +1,169 @@
+"""
+End-to-end check of WebSub subscriptions against the stand-in hub
+
+Usage (from the server directory):
+    python -m tools.check_websub
+
+Serves the API and tools.websub_hub on local ports with a temporary
+database, subscribes a channel through the hub, publishes a video to it and
+unsubscribes again. Between the steps it sends forged verification requests
+that no request of ours asked for, which must be rejected without changing
+the subscription, and finally a signed push that must be refused once the
+subscription is no longer active. Exits with status 1 if any step fails.
+"""
+import asyncio
+import hashlib
+import hmac
+import os
+import socket
+import sys
+import tempfile
+from datetime import datetime
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+APP_PORT = free_port()
+HUB_PORT = free_port()
+TMP_DIR = tempfile.mkdtemp()
+# The service reads these at import time
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(TMP_DIR, 'websub.db')}"
+os.environ["WEBSUB_CALLBACK_URL"] = f"http://127.0.0.1:{APP_PORT}/api/websub/callback"
+os.environ["WEBSUB_HUB_URL"] = f"http://127.0.0.1:{HUB_PORT}/hub"
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+from database.db import Base, SessionLocal, engine
+from models.models import Channel, Video, WebSubSubscription
+from routes.api import router
+from services.http_client import close_http_client
+from services.websub_service import WEBSUB_YOUTUBE_HUB, request_subscription, youtube_topic
+from tools.websub_hub import create_hub
+
+CHANNEL_ID = "UC_websub_check"
+SUBSCRIPTION_ID = f"youtube_{CHANNEL_ID}"
+CALLBACK_URL = f"{os.environ['WEBSUB_CALLBACK_URL']}/{SUBSCRIPTION_ID}"
+PUSH_BODY = f"""<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns:yt="http://www.youtube.com/xml/schemas/2015" xmlns="http://www.w3.org/2005/Atom">
+  <entry>
+    <id>yt:video:websub_check_video</id>
+    <yt:videoId>websub_check_video</yt:videoId>
+    <yt:channelId>{CHANNEL_ID}</yt:channelId>
+    <title>Pushed video</title>
+    <published>2024-05-01T12:00:00+00:00</published>
+  </entry>
+</feed>"""
+
+failures = []
+
+def check(name: str, passed: bool):
+    print(f"{'ok' if passed else 'FAIL':<5} {name}")
+    if not passed:
+        failures.append(name)
+
+def subscription() -> WebSubSubscription:
+    db = SessionLocal()
+    try:
+        return db.query(WebSubSubscription).filter(WebSubSubscription.id == SUBSCRIPTION_ID).first()
+    finally:
+        db.close()
+
+def pushed_video_id(video_id: str):
+    db = SessionLocal()
+    try:
+        video = db.get(Video, video_id)
+        return video.id if video else None
+    finally:
+        db.close()
+
+async def wait_for(condition, timeout: float = 5) -> bool:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while asyncio.get_running_loop().time() < deadline:
+        if condition():
+            return True
+        await asyncio.sleep(0.05)
+    return False
+
+async def forge(client: httpx.AsyncClient, mode: str) -> int:
+    """A verification request that did not come from a request we sent"""
+    response = await client.get(CALLBACK_URL, params={
+        "hub.mode": mode,
+        "hub.topic": youtube_topic(CHANNEL_ID),
+        "hub.challenge": "forged",
+        "hub.lease_seconds": "99999999"
+    })
+    return response.status_code
+
+async def send_request(mode: str):
+    await request_subscription("youtube", CHANNEL_ID, youtube_topic(CHANNEL_ID), WEBSUB_YOUTUBE_HUB, mode=mode)
+
+async def push_directly(client: httpx.AsyncClient, secret: str) -> int:
+    """A correctly signed push sent straight to the callback, bypassing the hub"""
+    body = PUSH_BODY.replace("websub_check_video", "websub_late_video").encode()
+    signature = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    response = await client.post(CALLBACK_URL, content=body, headers={"X-Hub-Signature-256": f"sha256={signature}"})
+    return response.status_code
+
+async def run_checks():
+    async with httpx.AsyncClient() as client:
+        await send_request("subscribe")
+        check("hub verifies the subscribe we sent", await wait_for(lambda: subscription().status == "active"))
+        lease = subscription().lease_expires_at
+
+        for mode in ("subscribe", "unsubscribe", "denied"):
+            status = await forge(client, mode)
+            sub = subscription()
+            check(f"forged {mode} rejected while active",
+                  status == 404 and sub.status == "active" and sub.lease_expires_at == lease)
+
+        response = await client.post(f"http://127.0.0.1:{HUB_PORT}/publish", data={
+            "topic": youtube_topic(CHANNEL_ID),
+            "body": PUSH_BODY
+        })
+        check("hub delivers the push", response.json().get("delivered") == 1)
+
+        check("pushed video stored", await wait_for(lambda: pushed_video_id("websub_check_video") is not None))
+
+        await send_request("unsubscribe")
+        check("hub verifies the unsubscribe we sent", await wait_for(lambda: subscription().status == "unsubscribed"))
+
+        status = await forge(client, "subscribe")
+        sub = subscription()
+        check("forged subscribe rejected after unsubscribing",
+              status == 404 and sub.status == "unsubscribed" and sub.lease_expires_at is None)
+
+        status = await push_directly(client, sub.secret)
+        await asyncio.sleep(0.2)
+        check("push rejected after unsubscribing", status == 404 and pushed_video_id("websub_late_video") is None)
+
+async def main():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    db.add(Channel(id=CHANNEL_ID, title="WebSub check", section="general", uploads_playlist_id="uploads"))
+    db.commit()
+    db.close()
+
+    api = FastAPI()
+    api.include_router(router, prefix="/api")
+    servers = [
+        uvicorn.Server(uvicorn.Config(api, host="127.0.0.1", port=APP_PORT, log_level="warning")),
+        uvicorn.Server(uvicorn.Config(create_hub(), host="127.0.0.1", port=HUB_PORT, log_level="warning"))
+    ]
+    tasks = [asyncio.create_task(server.serve()) for server in servers]
+    await wait_for(lambda: all(server.started for server in servers))
+
+    try:
+        await run_checks()
+    finally:
+        for server in servers:
+            server.should_exit = True
+        await asyncio.gather(*tasks)
+        await close_http_client()
+        engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,114 @@
+"""
+Local stand-in WebSub hub, for trying push updates without a public callback URL
+
+Usage (from the server directory):
+    python -m tools.websub_hub [--port 8081]
+
+Point the server at it with WEBSUB_HUB_URL=http://127.0.0.1:8081/hub and
+WEBSUB_CALLBACK_URL=http://127.0.0.1:8000/api/websub/callback.
+- POST /hub: subscribe or unsubscribe a callback, verified asynchronously by
+  calling it with a challenge, as a real hub does
+- POST /publish: send a payload ("topic" and "body" form fields) to every
+  verified subscriber of the topic, signed with its secret
+- GET /subscriptions: the verified subscriptions
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import secrets
+from typing import Dict
+from urllib.parse import parse_qsl
+import httpx
+from fastapi import FastAPI, Request, Response
+
+async def read_form(request: Request) -> Dict[str, str]:
+    """Decode a form-encoded body without depending on python-multipart"""
+    return dict(parse_qsl((await request.body()).decode()))
+
+def create_hub() -> FastAPI:
+    app = FastAPI(title="Stand-in WebSub hub")
+    # Verified subscriptions keyed by (callback, topic)
+    subscriptions: Dict[tuple, dict] = {}
+    tasks = set()
+
+    async def verify(mode: str, callback: str, topic: str, secret: str, lease_seconds: int):
+        challenge = secrets.token_hex(16)
+        async with httpx.AsyncClient() as client:
+            try:
+                response = await client.get(callback, params={
+                    "hub.mode": mode,
+                    "hub.topic": topic,
+                    "hub.challenge": challenge,
+                    "hub.lease_seconds": str(lease_seconds)
+                })
+            except httpx.HTTPError as e:
+                print(f"hub: could not verify {mode} of {callback}: {e}")
+                return
+
+        if response.status_code != 200 or response.text != challenge:
+            print(f"hub: {callback} did not confirm {mode} (HTTP {response.status_code})")
+            return
+
+        key = (callback, topic)
+        if mode == "subscribe":
+            subscriptions[key] = {"callback": callback, "topic": topic, "secret": secret, "lease_seconds": lease_seconds}
+        else:
+            subscriptions.pop(key, None)
+        print(f"hub: verified {mode} of {callback} to {topic}")
+
+    @app.post("/hub", status_code=202)
+    async def subscribe(request: Request):
+        form = await read_form(request)
+        mode = form.get("hub.mode")
+        callback = form.get("hub.callback")
+        topic = form.get("hub.topic")
+        if mode not in ("subscribe", "unsubscribe") or not callback or not topic:
+            return Response(status_code=400)
+        secret = form.get("hub.secret", "")
+        lease_seconds = int(form.get("hub.lease_seconds") or 432000)
+
+        # Verify after answering, like a hub with hub.verify=async
+        task = asyncio.create_task(verify(mode, callback, topic, secret, lease_seconds))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        return Response(status_code=202)
+
+    @app.post("/publish")
+    async def publish(request: Request):
+        form = await read_form(request)
+        topic = form.get("topic")
+        payload = form.get("body", "").encode()
+        delivered = 0
+        async with httpx.AsyncClient() as client:
+            for sub in list(subscriptions.values()):
+                if sub["topic"] != topic:
+                    continue
+                signature = hmac.new(sub["secret"].encode(), payload, hashlib.sha256).hexdigest()
+                response = await client.post(sub["callback"], content=payload, headers={
+                    "Content-Type": "application/atom+xml",
+                    "X-Hub-Signature-256": f"sha256={signature}"
+                })
+                delivered += response.status_code < 300
+        return {"delivered": delivered}
+
+    @app.get("/subscriptions")
+    async def read_subscriptions():
+        return [
+            {key: value for key, value in sub.items() if key != "secret"}
+            for sub in subscriptions.values()
+        ]
+
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    args = parser.parse_args()
+
+    import uvicorn
+    uvicorn.run(create_hub(), host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    main()